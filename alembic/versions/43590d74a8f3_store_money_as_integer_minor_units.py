@@ -0,0 +1,66 @@
+"""store wallet balance and transaction amount as integer minor units
+
+Revision ID: 43590d74a8f3
+Revises: 81c0d95bb364
+Create Date: 2026-10-18 09:12:41.220318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '43590d74a8f3'
+down_revision: Union[str, None] = '81c0d95bb364'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Rows converted per committed batch
+BATCH_SIZE = 10000
+
+# (table, column) pairs holding money
+MONEY_COLUMNS = [('wallet', 'balance'), ('transaction', 'amount')]
+
+
+def backfill_in_batches(table_name, source, target, convert):
+    table = sa.table(table_name, sa.column('id'), sa.column(source), sa.column(target))
+    values = {target: sa.func.coalesce(convert(table.c[source]), 0)}
+
+    # Walk the primary key, so each batch starts where the previous one ended instead of rescanning converted rows.
+    # Commit every batch so a large table is never locked by one long transaction
+    last_id = None
+    while True:
+        with op.get_context().autocommit_block():
+            bind = op.get_bind()
+            after_last = [table.c.id > last_id] if last_id is not None else []
+            upper_id = bind.execute(
+                sa.select(table.c.id).where(*after_last).order_by(table.c.id).offset(BATCH_SIZE - 1).limit(1)
+            ).scalar()
+            up_to_upper = [table.c.id <= upper_id] if upper_id is not None else []
+            bind.execute(table.update().where(*after_last, *up_to_upper).values(values))
+        if upper_id is None:
+            break
+        last_id = upper_id
+
+
+def upgrade() -> None:
+    for table_name, column in MONEY_COLUMNS:
+        op.add_column(table_name, sa.Column(f'{column}_minor', sa.BigInteger(), nullable=True))
+        backfill_in_batches(table_name, column, f'{column}_minor', lambda value: sa.func.round(value * 100))
+        op.drop_column(table_name, column)
+        op.alter_column(table_name, f'{column}_minor', new_column_name=column, nullable=False)
+
+    op.alter_column('wallet', 'balance', server_default='0')
+
+
+def downgrade() -> None:
+    for table_name, column in MONEY_COLUMNS:
+        op.add_column(table_name, sa.Column(f'{column}_major', sa.Float(), nullable=True))
+        backfill_in_batches(table_name, column, f'{column}_major', lambda value: value / 100.0)
+        op.drop_column(table_name, column)
+        op.alter_column(table_name, f'{column}_major', new_column_name=column,
+                        nullable=table_name == 'wallet')
+
+    op.alter_column('wallet', 'balance', server_default=None)
@@ -0,0 +1,27 @@
+"""add transaction history keyset indexes
+
+Revision ID: 476b39e82254
+Revises: 43590d74a8f3
+Create Date: 2026-10-18 10:03:17.582114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '476b39e82254'
+down_revision: Union[str, None] = '43590d74a8f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_transaction_wallet_id_created_at_id', 'transaction', ['wallet_id', 'created_at', 'id'])
+    op.create_index('ix_transaction_created_at_id', 'transaction', ['created_at', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_transaction_created_at_id', table_name='transaction')
+    op.drop_index('ix_transaction_wallet_id_created_at_id', table_name='transaction')
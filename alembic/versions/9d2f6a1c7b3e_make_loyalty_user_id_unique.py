@@ -0,0 +1,42 @@
+"""make loyalty user_id unique
+
+Revision ID: 9d2f6a1c7b3e
+Revises: 476b39e82254
+Create Date: 2026-10-18 11:41:06.318470
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d2f6a1c7b3e'
+down_revision: Union[str, None] = '476b39e82254'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Fold duplicate loyalty records of a user into their oldest record
+    op.execute("""
+        UPDATE loyalty SET points = totals.points
+        FROM (
+            SELECT MIN(id) AS id, SUM(points) AS points FROM loyalty
+            WHERE user_id IS NOT NULL GROUP BY user_id HAVING COUNT(*) > 1
+        ) AS totals
+        WHERE loyalty.id = totals.id
+    """)
+    op.execute("""
+        DELETE FROM loyalty
+        WHERE user_id IS NOT NULL
+          AND id NOT IN (SELECT MIN(id) FROM loyalty WHERE user_id IS NOT NULL GROUP BY user_id)
+    """)
+
+    op.drop_index('ix_loyalty_user_id', table_name='loyalty')
+    op.create_index('ix_loyalty_user_id', 'loyalty', ['user_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_loyalty_user_id', table_name='loyalty')
+    op.create_index('ix_loyalty_user_id', 'loyalty', ['user_id'])
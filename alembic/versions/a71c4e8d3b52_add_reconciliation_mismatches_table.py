@@ -0,0 +1,40 @@
+"""add reconciliation mismatches table
+
+Revision ID: a71c4e8d3b52
+Revises: f3b7d2e9a614
+Create Date: 2026-10-18 14:47:09.582631
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a71c4e8d3b52'
+down_revision: Union[str, None] = 'f3b7d2e9a614'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'reconciliation_mismatches',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('run_id', sa.String(), nullable=False),
+        sa.Column('wallet_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('wallet_balance', sa.BigInteger(), nullable=False),
+        sa.Column('ledger_balance', sa.BigInteger(), nullable=False),
+        sa.Column('difference', sa.BigInteger(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['wallet_id'], ['wallet.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_reconciliation_mismatches_run_id', 'reconciliation_mismatches', ['run_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_reconciliation_mismatches_run_id', table_name='reconciliation_mismatches')
+    op.drop_table('reconciliation_mismatches')
@@ -0,0 +1,40 @@
+"""add outbox event retry columns
+
+Revision ID: b4f9e2c7a815
+Revises: e8d3a6c4f105
+Create Date: 2026-10-18 19:05:41.218364
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4f9e2c7a815'
+down_revision: Union[str, None] = 'e8d3a6c4f105'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('outbox_events', sa.Column('next_attempt_at', sa.DateTime(), nullable=True))
+    op.add_column('outbox_events', sa.Column('dead_lettered_at', sa.DateTime(), nullable=True))
+
+    # Dead lettered events are never read again, so the pending index leaves them out
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_outbox_events_pending', table_name='outbox_events', postgresql_concurrently=True)
+        op.create_index('ix_outbox_events_pending', 'outbox_events', ['id'], postgresql_concurrently=True,
+                        postgresql_where=sa.text('dispatched_at IS NULL AND dead_lettered_at IS NULL'),
+                        sqlite_where=sa.text('dispatched_at IS NULL AND dead_lettered_at IS NULL'))
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_outbox_events_pending', table_name='outbox_events', postgresql_concurrently=True)
+        op.create_index('ix_outbox_events_pending', 'outbox_events', ['id'], postgresql_concurrently=True,
+                        postgresql_where=sa.text('dispatched_at IS NULL'), sqlite_where=sa.text('dispatched_at IS NULL'))
+
+    op.drop_column('outbox_events', 'dead_lettered_at')
+    op.drop_column('outbox_events', 'next_attempt_at')
@@ -0,0 +1,91 @@
+"""add double entry postings and ledger account balances
+
+Revision ID: b96e2f4a7c18
+Revises: a71c4e8d3b52
+Create Date: 2026-10-18 15:31:46.208417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b96e2f4a7c18'
+down_revision: Union[str, None] = 'a71c4e8d3b52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+posting_direction = sa.Enum('debit', 'credit', name='posting_direction')
+
+
+def backfill_postings():
+    transaction = sa.table('transaction', sa.column('id'), sa.column('wallet_id'), sa.column('amount'),
+                           sa.column('type'), sa.column('source'), sa.column('created_at'))
+    postings = sa.table('postings', sa.column('journal_id'), sa.column('account'), sa.column('direction'),
+                        sa.column('amount'), sa.column('created_at'))
+    balances = sa.table('ledger_account_balances', sa.column('account'), sa.column('shard'), sa.column('balance'),
+                        sa.column('updated_at'))
+
+    # Same counterparties the application posts to
+    counterparty = sa.case(
+        (transaction.c.source == 'TRANSFER', 'system:transfers'),
+        (transaction.c.source == 'LOYALTY_REDEMPTION', 'system:loyalty'),
+        (transaction.c.type.in_(['debit', 'refund']), 'system:payments'),
+        else_='system:top_ups',
+    )
+    wallet_account = sa.literal('wallet:') + sa.cast(transaction.c.wallet_id, sa.String)
+    wallet_direction = sa.case((transaction.c.type == 'debit', 'debit'), else_='credit')
+    counterparty_direction = sa.case((transaction.c.type == 'debit', 'credit'), else_='debit')
+
+    for account, direction in [(wallet_account, wallet_direction), (counterparty, counterparty_direction)]:
+        op.execute(postings.insert().from_select(
+            ['journal_id', 'account', 'direction', 'amount', 'created_at'],
+            sa.select(transaction.c.id, account, sa.cast(direction, posting_direction), transaction.c.amount,
+                      transaction.c.created_at)
+            .where(transaction.c.type.in_(['credit', 'debit', 'refund']))
+        ))
+
+    signed_amount = sa.case((postings.c.direction == 'credit', postings.c.amount), else_=-postings.c.amount)
+    op.execute(balances.insert().from_select(
+        ['account', 'shard', 'balance', 'updated_at'],
+        sa.select(postings.c.account, sa.literal(0), sa.func.sum(signed_amount), sa.func.now())
+        .group_by(postings.c.account)
+    ))
+
+
+def upgrade() -> None:
+    op.create_table(
+        'postings',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('journal_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('account', sa.String(), nullable=False),
+        sa.Column('direction', posting_direction, nullable=False),
+        sa.Column('amount', sa.BigInteger(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['journal_id'], ['transaction.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_postings_journal_id', 'postings', ['journal_id'])
+    op.create_index('ix_postings_account_created_at', 'postings', ['account', 'created_at'])
+
+    op.create_table(
+        'ledger_account_balances',
+        sa.Column('account', sa.String(), nullable=False),
+        sa.Column('shard', sa.Integer(), nullable=False),
+        sa.Column('balance', sa.BigInteger(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('account', 'shard')
+    )
+
+    backfill_postings()
+
+
+def downgrade() -> None:
+    op.drop_table('ledger_account_balances')
+    op.drop_index('ix_postings_account_created_at', table_name='postings')
+    op.drop_index('ix_postings_journal_id', table_name='postings')
+    op.drop_table('postings')
+    posting_direction.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,38 @@
+"""add transaction sequence column for the change feed
+
+Revision ID: c2f5e8b1d937
+Revises: d4c8a1f6e293
+Create Date: 2026-10-18 17:05:38.114962
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2f5e8b1d937'
+down_revision: Union[str, None] = 'd4c8a1f6e293'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing rows are numbered by the sequencer, oldest first
+    op.add_column('transaction', sa.Column('sequence', sa.BigInteger(), nullable=True))
+
+    # CONCURRENTLY keeps the table writable while the indexes build, it cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index('ix_transaction_sequence', 'transaction', ['sequence'], unique=True,
+                        postgresql_concurrently=True)
+        op.create_index('ix_transaction_unsequenced', 'transaction', ['created_at', 'id'],
+                        postgresql_where=sa.text('sequence IS NULL'), sqlite_where=sa.text('sequence IS NULL'),
+                        postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_transaction_unsequenced', table_name='transaction', postgresql_concurrently=True)
+        op.drop_index('ix_transaction_sequence', table_name='transaction', postgresql_concurrently=True)
+    op.drop_column('transaction', 'sequence')
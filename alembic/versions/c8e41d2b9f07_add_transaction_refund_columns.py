@@ -0,0 +1,34 @@
+"""add transaction refund columns
+
+Revision ID: c8e41d2b9f07
+Revises: 9d2f6a1c7b3e
+Create Date: 2026-10-18 12:26:53.904117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8e41d2b9f07'
+down_revision: Union[str, None] = '9d2f6a1c7b3e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('transaction', sa.Column('original_transaction_id', postgresql.UUID(as_uuid=True), nullable=True))
+    op.add_column('transaction', sa.Column('refunded_amount', sa.BigInteger(), server_default='0', nullable=False))
+    op.create_foreign_key('fk_transaction_original_transaction_id', 'transaction', 'transaction',
+                          ['original_transaction_id'], ['id'])
+    op.create_index('ix_transaction_original_transaction_id', 'transaction', ['original_transaction_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_transaction_original_transaction_id', table_name='transaction')
+    op.drop_constraint('fk_transaction_original_transaction_id', 'transaction', type_='foreignkey')
+    op.drop_column('transaction', 'refunded_amount')
+    op.drop_column('transaction', 'original_transaction_id')
@@ -0,0 +1,39 @@
+"""add outbox events table
+
+Revision ID: d4c8a1f6e293
+Revises: b96e2f4a7c18
+Create Date: 2026-10-18 16:20:13.905124
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4c8a1f6e293'
+down_revision: Union[str, None] = 'b96e2f4a7c18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'outbox_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('event_type', sa.String(), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('dispatched_at', sa.DateTime(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_outbox_events_pending', 'outbox_events', ['id'],
+                    postgresql_where=sa.text('dispatched_at IS NULL'), sqlite_where=sa.text('dispatched_at IS NULL'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_outbox_events_pending', table_name='outbox_events')
+    op.drop_table('outbox_events')
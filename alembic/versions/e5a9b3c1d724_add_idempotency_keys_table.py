@@ -0,0 +1,41 @@
+"""add idempotency keys table
+
+Revision ID: e5a9b3c1d724
+Revises: c8e41d2b9f07
+Create Date: 2026-10-18 13:08:22.417905
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a9b3c1d724'
+down_revision: Union[str, None] = 'c8e41d2b9f07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'idempotency_keys',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('scope', sa.String(), nullable=False),
+        sa.Column('key', sa.String(), nullable=False),
+        sa.Column('request_hash', sa.String(), nullable=False),
+        sa.Column('status_code', sa.Integer(), nullable=True),
+        sa.Column('response', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_idempotency_keys_expires_at', 'idempotency_keys', ['expires_at'])
+    op.create_index('ix_idempotency_keys_scope_key', 'idempotency_keys', ['scope', 'key'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_idempotency_keys_scope_key', table_name='idempotency_keys')
+    op.drop_index('ix_idempotency_keys_expires_at', table_name='idempotency_keys')
+    op.drop_table('idempotency_keys')
@@ -0,0 +1,60 @@
+"""tune wallet and transaction indexes
+
+Revision ID: e8d3a6c4f105
+Revises: c2f5e8b1d937
+Create Date: 2026-10-18 17:48:12.530871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8d3a6c4f105'
+down_revision: Union[str, None] = 'c2f5e8b1d937'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Indexes the primary keys, the unique constraints or the composite indexes below already cover.
+# The idx_ ones come from the raw sql in queries/, so they only exist on some databases.
+REDUNDANT_INDEXES = [
+    ('ix_wallet_id', 'wallet', ['id']),
+    ('idx_wallet_id', 'wallet', ['id']),
+    ('idx_wallet_user_phone_number', 'wallet', ['user_phone_number']),
+    ('ix_transaction_id', 'transaction', ['id']),
+    ('idx_transaction_id', 'transaction', ['id']),
+    ('ix_transaction_wallet_id', 'transaction', ['wallet_id']),
+    ('idx_transaction_wallet_id', 'transaction', ['wallet_id']),
+    ('ix_transaction_wallet_id_created_at_id', 'transaction', ['wallet_id', 'created_at', 'id']),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY keeps the tables writable while the indexes build, it cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index('ix_wallet_active_id', 'wallet', ['id'], postgresql_concurrently=True,
+                        postgresql_where=sa.text('is_deleted = false'), sqlite_where=sa.text('is_deleted = false'))
+        # INCLUDE lets balance sums run index only, history pages still fetch the full rows
+        op.create_index('ix_transaction_wallet_history', 'transaction', ['wallet_id', 'created_at', 'id'],
+                        postgresql_include=['type', 'amount'], postgresql_concurrently=True)
+        op.create_index('ix_transaction_type_created_at_id', 'transaction', ['type', 'created_at', 'id'],
+                        postgresql_concurrently=True)
+        op.create_index('ix_transaction_source_created_at_id', 'transaction', ['source', 'created_at', 'id'],
+                        postgresql_concurrently=True)
+
+        for name, table, _ in REDUNDANT_INDEXES:
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in REDUNDANT_INDEXES:
+            if name.startswith('ix_'):
+                op.create_index(name, table, columns, postgresql_concurrently=True)
+
+        op.drop_index('ix_transaction_source_created_at_id', table_name='transaction', postgresql_concurrently=True)
+        op.drop_index('ix_transaction_type_created_at_id', table_name='transaction', postgresql_concurrently=True)
+        op.drop_index('ix_transaction_wallet_history', table_name='transaction', postgresql_concurrently=True)
+        op.drop_index('ix_wallet_active_id', table_name='wallet', postgresql_concurrently=True)
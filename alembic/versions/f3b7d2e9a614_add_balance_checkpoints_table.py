@@ -0,0 +1,40 @@
+"""add balance checkpoints table
+
+Revision ID: f3b7d2e9a614
+Revises: e5a9b3c1d724
+Create Date: 2026-10-18 14:02:51.736204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b7d2e9a614'
+down_revision: Union[str, None] = 'e5a9b3c1d724'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'balance_checkpoints',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('wallet_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('as_of', sa.DateTime(), nullable=False),
+        sa.Column('balance', sa.BigInteger(), nullable=False),
+        sa.Column('last_transaction_created_at', sa.DateTime(), nullable=True),
+        sa.Column('last_transaction_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['wallet_id'], ['wallet.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_balance_checkpoints_wallet_id_as_of', 'balance_checkpoints', ['wallet_id', 'as_of'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_balance_checkpoints_wallet_id_as_of', table_name='balance_checkpoints')
+    op.drop_table('balance_checkpoints')
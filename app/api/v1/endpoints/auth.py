@@ -16,7 +16,7 @@ router = APIRouter(prefix="/auth", tags=["Authentication"])
 # Create new user
 @router.post("/create", status_code=status.HTTP_201_CREATED, response_model=MessageResponse)
 async def new_user(db: db_dependency, user: UserRequest):
-    code, response = create_new_user(user, db)
+    code, response = await create_new_user(user, db)
     if code != 201:
         raise HTTPException(status_code=code, detail=response["message"])
     return response
@@ -25,7 +25,7 @@ async def new_user(db: db_dependency, user: UserRequest):
 # Authenticate user
 @router.post("/token", status_code=status.HTTP_200_OK, response_model=AuthTokenResponse)
 async def authenticate(form_data: Annotated[OAuth2PasswordRequestForm, Depends()], db: db_dependency):
-    code, response = authenticate_user(form_data, db)
+    code, response = await authenticate_user(form_data, db)
     if code != 200:
         raise HTTPException(status_code=code, detail=response["message"])
     return response
@@ -33,7 +33,7 @@ async def authenticate(form_data: Annotated[OAuth2PasswordRequestForm, Depends()
 
 @router.get("/me", status_code=status.HTTP_200_OK, response_model=CurrentUserResponse)
 async def current_user(token: Annotated[str, Depends(oauth2_bearer)], db: db_dependency):
-    code, response = get_current_user(token, db)
+    code, response = await get_current_user(token, db)
     if code != 200:
         raise HTTPException(status_code=code, detail=response["message"])
     return response
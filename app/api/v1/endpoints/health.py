@@ -1,5 +1,13 @@
 from fastapi import APIRouter
 
+from app.core.executor import blocking_executor, password_executor
+from app.crud.crud_auth import principal_cache
+from app.crud.crud_wallet import wallet_cache
+from app.db.group_commit import group_committer
+from app.db.outbox import outbox_dispatcher
+from app.db.pool import pool_status
+from app.db.session import engine
+
 router = APIRouter(prefix="/health", tags=["Health check"])
 
 
@@ -8,3 +16,32 @@ router = APIRouter(prefix="/health", tags=["Health check"])
 def check_health():
     return {"status": "System Healthy"}
 
+
+# Blocking executor saturation
+@router.get("/executor")
+def check_executor():
+    return {**blocking_executor.stats(), "password": password_executor.stats()}
+
+
+# Connection pool statistics
+@router.get("/db-pool")
+def check_db_pool():
+    return pool_status(engine.sync_engine.pool)
+
+
+# In-process cache statistics
+@router.get("/caches")
+def check_caches():
+    return {"principals": principal_cache.stats(), "wallets": wallet_cache.stats()}
+
+
+# Write coalescing statistics
+@router.get("/group-commit")
+def check_group_commit():
+    return group_committer.stats()
+
+
+# Outbox delivery statistics
+@router.get("/outbox")
+def check_outbox():
+    return outbox_dispatcher.stats()
@@ -0,0 +1,18 @@
+from fastapi import APIRouter, HTTPException
+from starlette import status
+
+from app.core.dependency import user_dependency, read_db_dependency
+from app.crud.crud_ledger import trial_balance
+from app.schemas.LedgerSchemas import TrialBalanceResponse
+from app.utilities.extract_user_info import get_user_info
+
+router = APIRouter(prefix="/ledger", tags=["Ledger"])
+
+
+@router.get("/trial-balance", status_code=status.HTTP_200_OK, response_model=TrialBalanceResponse)
+async def read_trial_balance(user: user_dependency, db: read_db_dependency):
+    code, response = await trial_balance(db, get_user_info(user))
+
+    if code != 200:
+        raise HTTPException(status_code=code, detail=response.get("message"))
+    return response
@@ -1,21 +1,61 @@
-from typing import List
+from datetime import datetime
+from decimal import Decimal
+from typing import Annotated, List
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from starlette import status
 
-from app.core.dependency import db_dependency, user_dependency
+from app.core.config import settings
+from app.core.dependency import db_dependency, user_dependency, read_db_dependency
+from app.crud.crud_change_feed import transaction_changes
+from app.crud.crud_idempotency import idempotent_mutation
+from app.db.group_commit import execute_mutation
 from app.crud.crud_transaction import top_wallet, transaction_all_history, transaction_by_id, transaction_user_history, \
-    debit_wallet
+    debit_wallet, export_transactions, top_wallets, debit_wallets, transfer_funds, refund_transaction
+from app.enums.ExportFormatEnum import ExportFormatEnum
+from app.enums.TransactionEnum import TransactionEnum
 from app.schemas.MessageResponseSchema import MessageResponse
-from app.schemas.TransactionSchemas import TransactionRequest, TransactionResponse
+from app.schemas.TransactionSchemas import TransactionRequest, TransactionResponse, BulkTransactionRequest, \
+    BulkTransactionResponse, BulkDebitRequest, TransferRequest, RefundRequest, TransactionChangesResponse, TransactionFilters
 from app.utilities.extract_user_info import get_user_info
 
 router = APIRouter(prefix="/transactions", tags=["Manage Transactions"])
 
+# Response header carrying the cursor of the next history page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+EXPORT_MEDIA_TYPES = {ExportFormatEnum.NDJSON: "application/x-ndjson", ExportFormatEnum.CSV: "text/csv"}
+
+
+# Query parameters filtering the history pages and the export
+def transaction_filter_params(wallet_id: str = Query(None), created_from: datetime = Query(None),
+                              created_to: datetime = Query(None),
+                              transaction_type: TransactionEnum = Query(None, alias="type"),
+                              source: str = Query(None), amount_min: Decimal = Query(None, ge=0, decimal_places=2),
+                              amount_max: Decimal = Query(None, ge=0, decimal_places=2)):
+    return TransactionFilters(wallet_id=wallet_id, created_from=created_from, created_to=created_to,
+                              type=transaction_type, source=source, amount_min=amount_min, amount_max=amount_max)
+
+
+filters_dependency = Annotated[TransactionFilters, Depends(transaction_filter_params)]
+
 
 @router.post("/top-wallet", status_code=status.HTTP_201_CREATED, response_model=MessageResponse)
-async def top_up_user_wallet(db: db_dependency, user: user_dependency, request: TransactionRequest):
-    code, response = top_wallet(db, get_user_info(user), request)
+async def top_up_user_wallet(db: db_dependency, user: user_dependency, request: TransactionRequest,
+                             idempotency_key: str = Header(None, alias="Idempotency-Key", max_length=255)):
+    code, response = await execute_mutation(db, idempotent_mutation, get_user_info(user), idempotency_key,
+                                            "top-wallet", request, top_wallet)
+
+    if code != 200:
+        raise HTTPException(status_code=code, detail=response.get("message"))
+    return response
+
+
+@router.post("/top-wallet/bulk", status_code=status.HTTP_200_OK, response_model=BulkTransactionResponse)
+async def bulk_top_up_user_wallets(db: db_dependency, user: user_dependency, request: BulkTransactionRequest):
+    code, response = await top_wallets(db, get_user_info(user), request.transactions)
 
     if code != 200:
         raise HTTPException(status_code=code, detail=response.get("message"))
@@ -23,8 +63,38 @@ async def top_up_user_wallet(db: db_dependency, user: user_dependency, request:
 
 
 @router.post("/debit-wallet", status_code=status.HTTP_201_CREATED, response_model=MessageResponse)
-async def debit_user_wallet(db: db_dependency, user: user_dependency, request: TransactionRequest):
-    code, response = debit_wallet(db, get_user_info(user), request)
+async def debit_user_wallet(db: db_dependency, user: user_dependency, request: TransactionRequest,
+                            idempotency_key: str = Header(None, alias="Idempotency-Key", max_length=255)):
+    code, response = await execute_mutation(db, idempotent_mutation, get_user_info(user), idempotency_key,
+                                            "debit-wallet", request, debit_wallet)
+
+    if code != 200:
+        raise HTTPException(status_code=code, detail=response.get("message"))
+    return response
+
+
+@router.post("/debit-wallet/bulk", status_code=status.HTTP_200_OK, response_model=BulkTransactionResponse)
+async def bulk_debit_user_wallets(db: db_dependency, user: user_dependency, request: BulkDebitRequest):
+    code, response = await debit_wallets(db, get_user_info(user), request.transactions, request.mode)
+
+    if code != 200:
+        raise HTTPException(status_code=code, detail=response.get("message"))
+    return response
+
+
+@router.post("/transfer", status_code=status.HTTP_201_CREATED, response_model=MessageResponse)
+async def transfer_between_wallets(db: db_dependency, user: user_dependency, request: TransferRequest):
+    code, response = await transfer_funds(db, get_user_info(user), request)
+
+    if code != 200:
+        raise HTTPException(status_code=code, detail=response.get("message"))
+    return response
+
+
+@router.post("/{transaction_id}/refund", status_code=status.HTTP_201_CREATED, response_model=MessageResponse)
+async def refund_user_transaction(transaction_id: str, db: db_dependency, user: user_dependency,
+                                  request: RefundRequest):
+    code, response = await refund_transaction(db, get_user_info(user), transaction_id, request)
 
     if code != 200:
         raise HTTPException(status_code=code, detail=response.get("message"))
@@ -32,8 +102,40 @@ async def debit_user_wallet(db: db_dependency, user: user_dependency, request: T
 
 
 @router.get("/", status_code=status.HTTP_200_OK, response_model=List[TransactionResponse])
-async def read_all_transactions(user: user_dependency, db: db_dependency, limit: int = 10, offset: int = 0):
-    code, response = transaction_all_history(db, get_user_info(user), limit, offset)
+async def read_all_transactions(user: user_dependency, db: read_db_dependency, http_response: Response,
+                                filters: filters_dependency, limit: int = Query(10, gt=0),
+                                offset: int = Query(0, ge=0), cursor: str = Query(None)):
+    code, response = await transaction_all_history(db, get_user_info(user), limit, offset, cursor, filters)
+
+    if code != 200:
+        raise HTTPException(status_code=code, detail=response.get("message"))
+    if response["next_cursor"]:
+        http_response.headers[NEXT_CURSOR_HEADER] = response["next_cursor"]
+    return response["transactions"]
+
+
+@router.get("/export", status_code=status.HTTP_200_OK, response_class=StreamingResponse)
+async def export_all_transactions(user: user_dependency, db: read_db_dependency,
+                                  filters: filters_dependency,
+                                  export_format: ExportFormatEnum = Query(ExportFormatEnum.NDJSON, alias="format")):
+    code, response = await export_transactions(db, get_user_info(user), export_format, filters)
+
+    if code != 200:
+        raise HTTPException(status_code=code, detail=response.get("message"))
+
+    # The rows are streamed after the handler returns, so the session is closed once the body is sent
+    return StreamingResponse(
+        response,
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="transactions.{export_format.value}"'},
+        background=BackgroundTask(db.close),
+    )
+
+
+@router.get("/changes", status_code=status.HTTP_200_OK, response_model=TransactionChangesResponse)
+async def read_transaction_changes(user: user_dependency, db: read_db_dependency, after: int = Query(0, ge=0),
+                                   limit: int = Query(100, gt=0, le=settings.change_feed_max_limit)):
+    code, response = await transaction_changes(db, get_user_info(user), after, limit)
 
     if code != 200:
         raise HTTPException(status_code=code, detail=response.get("message"))
@@ -42,7 +144,7 @@ async def read_all_transactions(user: user_dependency, db: db_dependency, limit:
 
 @router.get("/{transaction_id}", status_code=status.HTTP_200_OK, response_model=TransactionResponse)
 async def read_transaction_by_id(transaction_id: str, db: db_dependency, user: user_dependency):
-    code, response = transaction_by_id(db, get_user_info(user), transaction_id)
+    code, response = await transaction_by_id(db, get_user_info(user), transaction_id)
 
     if code != 200:
         raise HTTPException(status_code=code, detail=response.get("message"))
@@ -50,9 +152,15 @@ async def read_transaction_by_id(transaction_id: str, db: db_dependency, user: u
 
 
 @router.get("/user/{user_id}", status_code=status.HTTP_200_OK, response_model=List[TransactionResponse])
-async def read_user_transactions(user_id: str, db: db_dependency, user: user_dependency, limit: int = 10, offset: int = 0):
-    code, response = transaction_user_history(db, get_user_info(user), user_id, limit, offset)
+async def read_user_transactions(user_id: str, db: read_db_dependency, user: user_dependency,
+                                 http_response: Response, filters: filters_dependency,
+                                 limit: int = Query(10, gt=0), offset: int = Query(0, ge=0),
+                                 cursor: str = Query(None)):
+    code, response = await transaction_user_history(db, get_user_info(user), user_id, limit, offset, cursor,
+                                                    filters)
 
     if code != 200:
         raise HTTPException(status_code=code, detail=response.get("message"))
-    return response
+    if response["next_cursor"]:
+        http_response.headers[NEXT_CURSOR_HEADER] = response["next_cursor"]
+    return response["transactions"]
@@ -0,0 +1,61 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Bounded in-process cache that evicts the least recently used entry.
+
+    Entries expire ``ttl`` seconds after they were stored, so a value changed
+    by another process is never served for longer than that.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        if self.max_size <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
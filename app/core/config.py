@@ -1,11 +1,51 @@
+from typing import List
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
     database_url: str
+    database_replica_urls: List[str] = []
+    read_your_writes_seconds: float = 0
     secret_key: str
     algorithm: str
     access_token_expire_minutes: int
+    blocking_pool_size: int = 8
+    password_hash_workers: int = 0
+    bcrypt_rounds: int = 12
+    principal_cache_size: int = 1024
+    principal_cache_ttl_seconds: float = 60
+    wallet_cache_size: int = 10000
+    wallet_cache_ttl_seconds: float = 5
+    group_commit_enabled: bool = False
+    group_commit_window_ms: float = 2
+    group_commit_max_batch: int = 100
+    idempotency_key_ttl_seconds: int = 86400
+    idempotency_cache_size: int = 10000
+    idempotency_cache_ttl_seconds: float = 300
+    idempotency_sweep_interval_seconds: float = 300
+    balance_checkpoint_interval_seconds: float = 3600
+    balance_checkpoint_lag_seconds: float = 300
+    ledger_system_account_shards: int = 16
+    outbox_webhook_url: str = ""
+    outbox_webhook_timeout_seconds: float = 10
+    outbox_file_path: str = ""
+    outbox_batch_size: int = 100
+    outbox_poll_interval_seconds: float = 1
+    outbox_max_attempts: int = 10
+    outbox_retry_backoff_seconds: float = 1
+    outbox_retry_max_backoff_seconds: float = 300
+    change_feed_sequencer_interval_seconds: float = 1
+    change_feed_max_limit: int = 1000
+    reconciliation_chunk_size: int = 1000
+    bulk_transaction_max_items: int = 50000
+    bulk_transaction_chunk_size: int = 1000
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_pool_use_lifo: bool = False
 
     model_config = SettingsConfigDict(env_file=".env")
 
@@ -2,12 +2,13 @@ from typing import Annotated
 
 from fastapi import Depends
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.crud.crud_auth import get_current_user
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
 
 
-db_dependency = Annotated[Session, Depends(get_db)]
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
+read_db_dependency = Annotated[AsyncSession, Depends(get_read_db)]
 user_dependency = Annotated[dict, Depends(get_current_user)]
 
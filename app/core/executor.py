@@ -0,0 +1,126 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from app.core.config import settings
+
+
+class BoundedExecutor:
+    """Sized thread pool for blocking calls made from async route handlers.
+
+    Keeps track of how many calls are waiting for a worker and how long they
+    waited, so pool saturation is visible before latency collapses.
+    """
+
+    def __init__(self, max_workers: int, name: str):
+        self.name = name
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def _call(self, submitted_at: float, fn, args, kwargs):
+        waited = time.perf_counter() - submitted_at
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+
+    def _forget_cancelled(self, future):
+        # A call cancelled before a worker picked it up never runs _call
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+
+    # Run a blocking function on the pool and wait for its result
+    async def run(self, fn, *args, **kwargs):
+        with self._lock:
+            self._queued += 1
+        future = self._executor.submit(self._call, time.perf_counter(), fn, args, kwargs)
+        future.add_done_callback(self._forget_cancelled)
+        return await asyncio.wrap_future(future)
+
+    def stats(self):
+        with self._lock:
+            started = self._running + self._completed
+            return {
+                "name": self.name,
+                "max_workers": self.max_workers,
+                "queued": self._queued,
+                "running": self._running,
+                "completed": self._completed,
+                "avg_wait_ms": round(self._total_wait / started * 1000, 3) if started else 0.0,
+                "max_wait_ms": round(self._max_wait * 1000, 3),
+            }
+
+
+class ProcessExecutor:
+    """Process pool for CPU bound calls, such as bcrypt, that would otherwise
+    compete for the GIL with the event loop.
+
+    Workers are spawned on first use. Functions and arguments must be picklable.
+    """
+
+    def __init__(self, max_workers: int, name: str):
+        self.name = name
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    def _finished(self, _future):
+        with self._lock:
+            self._pending -= 1
+            self._completed += 1
+
+    # Run a function in a worker process and wait for its result
+    async def run(self, fn, *args):
+        executor = self._get_executor()
+        with self._lock:
+            self._pending += 1
+        future = executor.submit(fn, *args)
+        future.add_done_callback(self._finished)
+        return await asyncio.wrap_future(future)
+
+    # Stop the workers, a later call starts a new pool
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "name": self.name,
+                "max_workers": self.max_workers,
+                "started": self._executor is not None,
+                "pending": self._pending,
+                "completed": self._completed,
+            }
+
+
+blocking_executor = BoundedExecutor(settings.blocking_pool_size, "blocking")
+password_executor = ProcessExecutor(settings.password_hash_workers, "password")
@@ -10,7 +10,9 @@ ALGORITHM = settings.algorithm
 SECRET_KEY = settings.secret_key
 EXPIRATION_TIME = settings.access_token_expire_minutes
 
-bcrypt_password = CryptContext(schemes="bcrypt", deprecated="auto")
+# Hashes made with fewer rounds than configured are upgraded on the next successful login
+bcrypt_password = CryptContext(schemes="bcrypt", deprecated="auto",
+                               bcrypt__rounds=settings.bcrypt_rounds, bcrypt__min_rounds=settings.bcrypt_rounds)
 
 
 # Encrypt password
@@ -23,6 +25,11 @@ def validate_password(password: str, hash_password: str):
     return bcrypt_password.verify(password, hash_password)
 
 
+# Validate password, returning a new hash when the stored one uses outdated settings
+def verify_and_update_password(password: str, hash_password: str):
+    return bcrypt_password.verify_and_update(password, hash_password)
+
+
 # Create token
 def create_token(username: str, user_id: int, role: str):
     encoded = {"user": username, "id": user_id, "role": role}
@@ -3,10 +3,13 @@ from typing import Annotated
 
 from fastapi import Depends
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import TTLCache
 from app.core.config import settings
-from app.core.security import encrypt_password, validate_password, create_token, decode_token
+from app.core.executor import password_executor
+from app.core.security import encrypt_password, verify_and_update_password, create_token, decode_token
 from app.db.session import get_db
 from app.models.User import User
 from app.schemas.UserSchemas import UserRequest
@@ -17,31 +20,50 @@ EXPIRATION_TIME = settings.access_token_expire_minutes
 
 oauth2_bearer = OAuth2PasswordBearer(tokenUrl="/auth/token", scheme_name="JWT")
 
+# Users already looked up by get_current_user, keyed by username
+principal_cache = TTLCache(settings.principal_cache_size, settings.principal_cache_ttl_seconds)
+
+
+# Drop a cached principal after its role or active state changed
+def invalidate_principal(username: str):
+    principal_cache.invalidate(username)
+
+
+async def load_principal(db: AsyncSession, username: str):
+    principal = principal_cache.get(username)
+    if principal is None:
+        user = await db.scalar(select(User).where(User.username == username))
+        if user is None:
+            return None
+        principal = {"user_id": user.id, "role": user.role, "is_active": user.is_active}
+        principal_cache.set(username, principal)
+    return principal
+
 
 # Create new user
-def create_new_user(user_to_be_created: UserRequest, db: Session):
+async def create_new_user(user_to_be_created: UserRequest, db: AsyncSession):
     new_user = User(
         username=user_to_be_created.username,
         email=user_to_be_created.email,
         phone_number=user_to_be_created.phone_number,
-        hash_password=encrypt_password(user_to_be_created.password),
+        hash_password=await password_executor.run(encrypt_password, user_to_be_created.password),
         role=user_to_be_created.role,
         is_active=True
     )
 
     db.add(new_user)
-    db.commit()
+    await db.commit()
     return 201, {"message": "User created successfully"}
 
 
 # Get current user
-def get_current_user(token: Annotated[str, Depends(oauth2_bearer)], db: Annotated[Session, Depends(get_db)]):
+async def get_current_user(token: Annotated[str, Depends(oauth2_bearer)], db: Annotated[AsyncSession, Depends(get_db)]):
     try:
         token_data = decode_token(token)
         if token_data.get("expires_at") < datetime.now(timezone.utc).timestamp():
             return 401, {"message": "token expired"}
-        username = db.query(User).filter(User.username == token_data.get('username')).first()
-        if username is None:
+        principal = await load_principal(db, token_data.get('username'))
+        if principal is None:
             return 401, {"message": "Invalid token"}
         return 200, {"username": token_data.get("username"), "user_id": token_data.get("user_id"), "role": token_data.get("role")}
     except ValueError:
@@ -49,13 +71,19 @@ def get_current_user(token: Annotated[str, Depends(oauth2_bearer)], db: Annotate
 
 
 # Authenticate user
-def authenticate_user(form_data: OAuth2PasswordRequestForm, db: Session):
-    user = db.query(User).filter(User.email == form_data.username).first()
+async def authenticate_user(form_data: OAuth2PasswordRequestForm, db: AsyncSession):
+    user = await db.scalar(select(User).where(User.email == form_data.username))
     if user is None:
         return 404, {"message": "User not found"}
 
-    if not validate_password(form_data.password, user.hash_password):
+    valid, new_hash = await password_executor.run(verify_and_update_password, form_data.password, user.hash_password)
+    if not valid:
         return 401, {"message": "Wrong Credentials"}
 
+    # Rehash passwords stored with outdated bcrypt settings
+    if new_hash is not None:
+        user.hash_password = new_hash
+        await db.commit()
+
     token = create_token(user.username, user.id, user.role)
     return 200, {"access_token": token, "token_type": "bearer"}
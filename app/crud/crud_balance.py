@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Union
+
+from sqlalchemy import DateTime, and_, case, func, insert, literal, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.crud_wallet import is_admin_or_wallet_owner, no_read_permission
+from app.models.BalanceCheckpoint import BalanceCheckpoint
+from app.models.Transaction import Transaction
+from app.models.Wallet import Wallet
+from app.utilities.local_time import local_time
+from app.utilities.money import from_minor_units
+
+logger = logging.getLogger(__name__)
+
+# Advisory lock making sure a single checkpointer writes checkpoints at a time on PostgreSQL
+CHECKPOINTER_LOCK_KEY = 7340019
+
+# Amount a transaction moved the wallet balance by, credits and refunds add to it and debits take from it
+signed_amount = case(
+    (Transaction.type.in_(["credit", "refund"]), Transaction.amount),
+    (Transaction.type == "debit", -Transaction.amount),
+    else_=0,
+)
+
+
+async def nearest_checkpoint(db: AsyncSession, wallet_id: uuid.UUID, at: datetime):
+    return await db.scalar(
+        select(BalanceCheckpoint)
+        .where(BalanceCheckpoint.wallet_id == wallet_id, BalanceCheckpoint.as_of <= at)
+        .order_by(BalanceCheckpoint.as_of.desc())
+        .limit(1)
+    )
+
+
+# Balance of a wallet at a timestamp, from the nearest checkpoint plus the transactions made after it
+async def balance_at(db: AsyncSession, wallet_id: uuid.UUID, at: datetime):
+    checkpoint = await nearest_checkpoint(db, wallet_id, at)
+
+    query = select(func.coalesce(func.sum(signed_amount), 0)).where(
+        Transaction.wallet_id == wallet_id, Transaction.created_at <= at)
+    if checkpoint is not None and checkpoint.last_transaction_id is not None:
+        query = query.where(tuple_(Transaction.created_at, Transaction.id) >
+                            tuple_(checkpoint.last_transaction_created_at, checkpoint.last_transaction_id))
+
+    balance = (checkpoint.balance if checkpoint is not None else 0) + await db.scalar(query)
+    return balance, checkpoint
+
+
+# New checkpoints at a timestamp for the wallets in (lower, upper] that have transactions after their latest
+# checkpoint. Each balance is that checkpoint plus the transactions after its marker, in one pass over them
+def new_checkpoints_query(as_of: datetime, lower: Union[uuid.UUID, None], upper: Union[uuid.UUID, None]):
+    def wallet_range(wallet_id):
+        conditions = []
+        if lower is not None:
+            conditions.append(wallet_id > lower)
+        if upper is not None:
+            conditions.append(wallet_id <= upper)
+        return conditions
+
+    latest = select(
+        BalanceCheckpoint.wallet_id,
+        BalanceCheckpoint.balance,
+        BalanceCheckpoint.last_transaction_created_at,
+        BalanceCheckpoint.last_transaction_id,
+        func.row_number().over(partition_by=BalanceCheckpoint.wallet_id,
+                               order_by=(BalanceCheckpoint.as_of.desc(), BalanceCheckpoint.id.desc()))
+        .label("position"),
+    ).where(BalanceCheckpoint.as_of <= as_of, *wallet_range(BalanceCheckpoint.wallet_id)).subquery()
+
+    changes = (
+        select(
+            Transaction.wallet_id,
+            Transaction.created_at,
+            Transaction.id,
+            func.coalesce(latest.c.balance, 0).label("checkpoint_balance"),
+            func.sum(signed_amount).over(partition_by=Transaction.wallet_id).label("change"),
+            func.row_number().over(partition_by=Transaction.wallet_id,
+                                   order_by=(Transaction.created_at.desc(), Transaction.id.desc()))
+            .label("position"),
+        )
+        .outerjoin(latest, and_(latest.c.wallet_id == Transaction.wallet_id, latest.c.position == 1))
+        .where(
+            Transaction.created_at <= as_of,
+            *wallet_range(Transaction.wallet_id),
+            or_(latest.c.last_transaction_id.is_(None),
+                tuple_(Transaction.created_at, Transaction.id) >
+                tuple_(latest.c.last_transaction_created_at, latest.c.last_transaction_id)),
+        )
+        .subquery()
+    )
+
+    # The newest transaction of each wallet becomes the marker of its checkpoint
+    return select(
+        changes.c.wallet_id,
+        literal(as_of, DateTime),
+        changes.c.checkpoint_balance + changes.c.change,
+        changes.c.created_at,
+        changes.c.id,
+        literal(datetime.now(), DateTime),
+    ).where(changes.c.position == 1)
+
+
+# Record the balance at a timestamp of every wallet with transactions since its last checkpoint
+async def create_balance_checkpoints(db: AsyncSession, as_of: datetime, batch_size: int = 1000):
+    created = 0
+    lower = None
+    while True:
+        # Checkpoints written while waiting for the lock are seen by the query, so wallets are never checkpointed twice
+        if db.get_bind().dialect.name == "postgresql":
+            await db.execute(select(func.pg_advisory_xact_lock(CHECKPOINTER_LOCK_KEY)))
+
+        upper_query = select(Wallet.id).order_by(Wallet.id).offset(batch_size - 1).limit(1)
+        if lower is not None:
+            upper_query = upper_query.where(Wallet.id > lower)
+        upper = await db.scalar(upper_query)
+
+        created += (await db.execute(insert(BalanceCheckpoint).from_select(
+            ["wallet_id", "as_of", "balance", "last_transaction_created_at", "last_transaction_id", "created_at"],
+            new_checkpoints_query(as_of, lower, upper),
+        ))).rowcount
+
+        # Commit every batch of wallets so the job never holds one long transaction
+        await db.commit()
+        if upper is None:
+            return created
+        lower = upper
+
+
+# Checkpoint every wallet periodically, leaving out the last few seconds whose transactions may not be committed yet
+async def run_balance_checkpointer(session_factory, interval: float, lag: float):
+    while True:
+        await asyncio.sleep(interval)
+        as_of = datetime.now() - timedelta(seconds=lag)
+        try:
+            async with session_factory() as db:
+                created = await create_balance_checkpoints(db, as_of)
+            logger.info("Created %s balance checkpoints as of %s", created, as_of.isoformat())
+        except Exception:
+            logger.exception("Creating balance checkpoints failed")
+
+
+# Read the balance of a wallet at a timestamp
+async def read_wallet_balance_at(db: AsyncSession, user: dict, wallet_id: str, at: Union[datetime, None] = None):
+    try:
+        wallet_id = uuid.UUID(str(wallet_id))
+    except ValueError:
+        return 404, {"message": "User wallet not found"}
+
+    wallet = await db.scalar(select(Wallet).where(Wallet.id == wallet_id, Wallet.is_deleted == False))
+
+    if wallet is None:
+        return 404, {"message": "User wallet not found"}
+
+    if not is_admin_or_wallet_owner(user, wallet.user_id):
+        return 401, {"message": no_read_permission}
+
+    at = local_time(at) if at is not None else datetime.now()
+    balance, checkpoint = await balance_at(db, wallet.id, at)
+
+    return 200, {
+        "wallet_id": str(wallet.id),
+        "at": at.isoformat(timespec='milliseconds') + 'Z',
+        "balance": from_minor_units(balance),
+        "checkpoint_as_of": checkpoint.as_of.isoformat(timespec='milliseconds') + 'Z' if checkpoint else None,
+    }
@@ -0,0 +1,73 @@
+import asyncio
+import logging
+
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.crud_transaction import transaction_to_response
+from app.models.Transaction import Transaction
+from app.utilities.check_role import check_admin_user
+
+logger = logging.getLogger(__name__)
+
+# Advisory lock making sure a single sequencer numbers rows at a time on PostgreSQL
+SEQUENCER_LOCK_KEY = 7340021
+
+
+# Number committed transactions that have no sequence yet, oldest first, and return how many were numbered.
+# Only committed rows are visible here, so a reader never sees a sequence before a smaller one is committed.
+async def assign_sequence_numbers(db: AsyncSession, batch_size: int = 10000):
+    if db.get_bind().dialect.name == "postgresql":
+        await db.execute(select(func.pg_advisory_xact_lock(SEQUENCER_LOCK_KEY)))
+
+    last_sequence = await db.scalar(select(func.coalesce(func.max(Transaction.sequence), 0)))
+    transaction_ids = (await db.scalars(
+        select(Transaction.id)
+        .where(Transaction.sequence.is_(None))
+        .order_by(Transaction.created_at, Transaction.id)
+        .limit(batch_size)
+    )).all()
+
+    if transaction_ids:
+        transaction_table = Transaction.__table__
+        # Numbering is not a change to the transaction, so updated_at keeps its value
+        await db.execute(
+            update(transaction_table)
+            .where(transaction_table.c.id == bindparam("transaction_id"))
+            .values(sequence=bindparam("sequence"), updated_at=transaction_table.c.updated_at),
+            [{"transaction_id": transaction_id, "sequence": sequence}
+             for sequence, transaction_id in enumerate(transaction_ids, last_sequence + 1)]
+        )
+    await db.commit()
+    return len(transaction_ids)
+
+
+async def run_transaction_sequencer(session_factory, interval: float):
+    while True:
+        try:
+            async with session_factory() as db:
+                numbered = await assign_sequence_numbers(db)
+        except Exception:
+            logger.exception("Numbering transactions for the change feed failed")
+            numbered = 0
+        # Catch up on a backlog without waiting
+        if not numbered:
+            await asyncio.sleep(interval)
+
+
+# Transactions numbered after a sequence number, in sequence order
+async def transaction_changes(db: AsyncSession, user: dict, after: int = 0, limit: int = 100):
+    if check_admin_user(user) is None:
+        return 403, {"message": "Unauthorized access"}
+
+    transactions = (await db.scalars(
+        select(Transaction)
+        .where(Transaction.sequence > after)
+        .order_by(Transaction.sequence)
+        .limit(limit)
+    )).all()
+
+    return 200, {
+        "changes": [transaction_to_response(transaction) for transaction in transactions],
+        "next_after": transactions[-1].sequence if transactions else after,
+    }
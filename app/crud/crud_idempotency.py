@@ -0,0 +1,129 @@
+import asyncio
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta
+
+from pydantic import BaseModel
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.db.group_commit import DeferredCommitSession, after_commit
+from app.models.IdempotencyKey import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+# Finished responses, keyed by (scope, key), in front of the idempotency_keys table
+idempotency_cache = TTLCache(settings.idempotency_cache_size, settings.idempotency_cache_ttl_seconds)
+
+
+def request_fingerprint(request: BaseModel):
+    return hashlib.sha256(request.model_dump_json().encode()).hexdigest()
+
+
+# Answer a repeated key from what the first request stored
+def replay(stored: tuple, request_hash: str):
+    stored_hash, status_code, response = stored
+    if stored_hash != request_hash:
+        return 422, {"message": "Idempotency-Key was already used with a different request"}
+    if status_code is None:
+        return 409, {"message": "A request with this Idempotency-Key is still in progress"}
+    return status_code, response
+
+
+async def find_stored_response(db: AsyncSession, scope: str, key: str):
+    cached = idempotency_cache.get((scope, key))
+    if cached is not None and cached[3] > datetime.now():
+        return cached[:3]
+
+    row = await db.scalar(select(IdempotencyKey).where(
+        IdempotencyKey.scope == scope, IdempotencyKey.key == key, IdempotencyKey.expires_at > datetime.now()))
+    if row is None:
+        return None
+
+    response = json.loads(row.response) if row.response is not None else None
+    if row.status_code is not None:
+        idempotency_cache.set((scope, key), (row.request_hash, row.status_code, response, row.expires_at))
+    return row.request_hash, row.status_code, response
+
+
+# Run a balance mutation at most once per Idempotency-Key
+async def run_idempotently(db: AsyncSession, user: dict, key: str, operation_name: str, request: BaseModel,
+                           operation):
+    if not key:
+        return await operation(db)
+
+    scope = f"{user.get('user_id')}:{operation_name}"
+    request_hash = request_fingerprint(request)
+
+    stored = await find_stored_response(db, scope, key)
+    if stored is not None:
+        return replay(stored, request_hash)
+
+    # Reserve the key in the operation's own transaction, a concurrent duplicate waits on the unique index
+    expires_at = datetime.now() + timedelta(seconds=settings.idempotency_key_ttl_seconds)
+    db.add(IdempotencyKey(scope=scope, key=key, request_hash=request_hash, expires_at=expires_at))
+    try:
+        await db.flush()
+    except IntegrityError:
+        await db.rollback()
+        stored = await find_stored_response(db, scope, key)
+        if stored is None:
+            return 409, {"message": "A request with this Idempotency-Key is still in progress"}
+        return replay(stored, request_hash)
+
+    # The operation's commits only flush, so its writes, the key and the stored response commit together
+    session = DeferredCommitSession(db)
+    code, response = await operation(session)
+
+    # Rejected operations commit nothing, so the key is released and can be retried
+    if code >= 400:
+        await db.rollback()
+        return code, response
+
+    await db.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+        .values(status_code=code, response=json.dumps(response))
+    )
+    await db.commit()
+    for callback in session.post_commit:
+        after_commit(db, callback)
+    after_commit(db, idempotency_cache.set, (scope, key), (request_hash, code, response, expires_at))
+    return code, response
+
+
+# Run a crud mutation taking (db, user, request) at most once per Idempotency-Key, the key is reserved and its
+# response stored in the same transaction as the mutation, also when it runs in a group commit
+async def idempotent_mutation(db: AsyncSession, user: dict, key: str, operation_name: str, request: BaseModel,
+                              mutation):
+    return await run_idempotently(db, user, key, operation_name, request,
+                                  lambda session: mutation(session, user, request))
+
+
+# Delete expired keys in batches, so a large backlog never holds one long transaction
+async def sweep_expired_keys(db: AsyncSession, batch_size: int = 1000):
+    swept = 0
+    while True:
+        expired = select(IdempotencyKey.id).where(IdempotencyKey.expires_at <= datetime.now()).limit(batch_size)
+        deleted = (await db.execute(delete(IdempotencyKey).where(IdempotencyKey.id.in_(expired.scalar_subquery())))
+                   ).rowcount
+        await db.commit()
+        swept += deleted
+        if deleted < batch_size:
+            return swept
+
+
+async def run_expired_keys_sweeper(session_factory, interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with session_factory() as db:
+                swept = await sweep_expired_keys(db)
+            if swept:
+                logger.info("Swept %s expired idempotency keys", swept)
+        except Exception:
+            logger.exception("Sweeping expired idempotency keys failed")
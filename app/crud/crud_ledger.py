@@ -0,0 +1,85 @@
+import random
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import case, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.upsert import UPSERT_INSERTS
+from app.enums.LedgerAccountEnum import LedgerAccountEnum
+from app.models.LedgerAccountBalance import LedgerAccountBalance
+from app.models.Posting import Posting
+from app.utilities.check_role import check_admin_user
+from app.utilities.money import from_minor_units
+
+WALLET_ACCOUNT_PREFIX = "wallet:"
+
+
+def wallet_account(wallet_id):
+    return f"{WALLET_ACCOUNT_PREFIX}{wallet_id}"
+
+
+# Running total row an account change goes to, system accounts spread theirs over several shards
+def account_shard(account: str):
+    if account.startswith(WALLET_ACCOUNT_PREFIX):
+        return 0
+    return random.randrange(max(settings.ledger_system_account_shards, 1))
+
+
+# Add a signed amount to the running total of each account in one upsert, in account order so writers never deadlock
+async def apply_account_changes(db: AsyncSession, changes: dict):
+    dialect_insert = UPSERT_INSERTS[db.get_bind().dialect.name]
+    statement = dialect_insert(LedgerAccountBalance).values([
+        {"account": account, "shard": account_shard(account), "balance": change}
+        for account, change in sorted(changes.items())
+    ])
+    await db.execute(statement.on_conflict_do_update(
+        index_elements=[LedgerAccountBalance.account, LedgerAccountBalance.shard],
+        set_={"balance": LedgerAccountBalance.balance + statement.excluded.balance, "updated_at": datetime.now()},
+    ))
+
+
+# Write the postings of each journal (transaction id, wallet id, counterparty, amount), the caller commits.
+# A positive amount credits the wallet and debits the counterparty, a negative one the other way round.
+async def post_journals(db: AsyncSession, journals: list):
+    postings = []
+    changes = defaultdict(int)
+    for journal_id, wallet_id, counterparty, amount in journals:
+        account = wallet_account(wallet_id)
+        wallet_direction, counterparty_direction = ("credit", "debit") if amount > 0 else ("debit", "credit")
+        postings.append({"journal_id": journal_id, "account": account, "direction": wallet_direction,
+                         "amount": abs(amount)})
+        postings.append({"journal_id": journal_id, "account": counterparty.value, "direction": counterparty_direction,
+                         "amount": abs(amount)})
+        changes[account] += amount
+        changes[counterparty.value] -= amount
+
+    if postings:
+        # The transactions must exist before postings can reference them
+        await db.flush()
+        await db.execute(insert(Posting), postings)
+        await apply_account_changes(db, changes)
+
+
+# Running totals of every system account and of all wallets together, from the account totals alone
+async def trial_balance(db: AsyncSession, user: dict):
+    if check_admin_user(user) is None:
+        return 403, {"message": "Unauthorized access"}
+
+    group = case(
+        (LedgerAccountBalance.account.startswith(WALLET_ACCOUNT_PREFIX), "wallets"),
+        else_=LedgerAccountBalance.account,
+    )
+    totals = dict((await db.execute(
+        select(group, func.sum(LedgerAccountBalance.balance)).group_by(group)
+    )).all())
+
+    accounts = {account.value: totals.get(account.value, 0) for account in LedgerAccountEnum}
+    accounts["wallets"] = totals.get("wallets", 0)
+    return 200, {
+        "accounts": {account: from_minor_units(balance) for account, balance in accounts.items()},
+        # Every journal balances out, so anything but zero means postings were lost
+        "total": from_minor_units(sum(totals.values())),
+    }
+
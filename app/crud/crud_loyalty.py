@@ -1,16 +1,28 @@
-from sqlalchemy.orm import Session
-
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.crud_ledger import post_journals
+from app.crud.crud_outbox import add_events, outbox_event
+from app.crud.crud_wallet import invalidate_wallet
+from app.db.group_commit import after_commit
+from app.enums.LedgerAccountEnum import LedgerAccountEnum
+from app.enums.OutboxEventEnum import OutboxEventEnum
 from app.models.Loyalty import Loyalty
 from app.models.Transaction import Transaction
 from app.models.Wallet import Wallet
 from app.schemas.LoyaltySchemas import LoyaltyRedeemSchema
 from app.utilities.check_role import check_admin_user
+from app.utilities.money import to_minor_units, from_minor_units
 
 # Define a conversion rate
 # POINTS_TO_CASH_RATE = 0.01  # 1 point = $0.01
 # MINIMUM_REDEEM_POINTS = 100  # Minimum points to redeem
 
-POINTS_TO_CASH_RATE = 0.01  # 1 point = $0.01
+POINTS_TO_CASH_RATE = Decimal("0.01")  # 1 point = $0.01
 MINIMUM_REDEEM_POINTS = 10  # Minimum points to redeem
 
 
@@ -29,11 +41,11 @@ def is_admin_or_user_owner(user: dict, user_id: int):
 
 
 # Read all loyalties
-def read_all_loyalties(db: Session, user: dict, limit, offset):
+async def read_all_loyalties(db: AsyncSession, user: dict, limit, offset):
     if check_admin_user(user) is None:
         return 401, {"message": "You do not have enough permission to read loyalties"}
 
-    loyalties = db.query(Loyalty).offset(offset).limit(limit).all()
+    loyalties = (await db.scalars(select(Loyalty).offset(offset).limit(limit))).all()
 
     loyalties_response = [
         {
@@ -49,11 +61,11 @@ def read_all_loyalties(db: Session, user: dict, limit, offset):
 
 
 # Read user loyalty
-def read_user_loyalty(db: Session, user: dict, user_id: int):
+async def read_user_loyalty(db: AsyncSession, user: dict, user_id: int):
     if not is_admin_or_user_owner(user, user_id):
         return 401, {"message": "You do not have enough permission to read this loyalty"}
 
-    loyalty = db.query(Loyalty).filter(Loyalty.user_id == user_id).first()
+    loyalty = await db.scalar(select(Loyalty).where(Loyalty.user_id == user_id))
 
     if loyalty is None:
         return 404, {"message": "Loyalty not found"}
@@ -68,12 +80,9 @@ def read_user_loyalty(db: Session, user: dict, user_id: int):
     return 200, loyalty_response
 
 
-# Redeem loyalty points
-def redeem_loyalty_points(db: Session, user: dict, loyalty_redeem: LoyaltyRedeemSchema):
-    if not is_admin_or_user_owner(user, loyalty_redeem.user_id):
-        return 401, {"message": "You do not have enough permission to redeem loyalty points"}
-
-    loyalty = db.query(Loyalty).filter(Loyalty.user_id == loyalty_redeem.user_id).first()
+# Explain why a conditional redemption did not match the loyalty record
+async def redeem_rejection(db: AsyncSession, loyalty_redeem: LoyaltyRedeemSchema):
+    loyalty = await db.scalar(select(Loyalty).where(Loyalty.user_id == loyalty_redeem.user_id))
 
     if loyalty is None:
         return 404, {"message": "Loyalty not found"}
@@ -81,31 +90,63 @@ def redeem_loyalty_points(db: Session, user: dict, loyalty_redeem: LoyaltyRedeem
     if loyalty.points < MINIMUM_REDEEM_POINTS:
         return 400, {"message": f"Minimum points to redeem is {MINIMUM_REDEEM_POINTS}"}
 
-    if loyalty.points < loyalty_redeem.quantity:
-        return 400, {"message": "Insufficient points to redeem"}
+    return 400, {"message": "Insufficient points to redeem"}
 
-    # Calculate cash equivalent
-    cash_equivalent = loyalty_redeem.quantity * POINTS_TO_CASH_RATE
 
-    # Deduct points
-    loyalty.points -= loyalty_redeem.quantity
+# Redeem loyalty points
+async def redeem_loyalty_points(db: AsyncSession, user: dict, loyalty_redeem: LoyaltyRedeemSchema):
+    if not is_admin_or_user_owner(user, loyalty_redeem.user_id):
+        return 401, {"message": "You do not have enough permission to redeem loyalty points"}
+
+    # Deduct points in the database, only when enough points are left
+    loyalty_id = await db.scalar(
+        update(Loyalty)
+        .where(
+            Loyalty.user_id == loyalty_redeem.user_id,
+            Loyalty.points >= MINIMUM_REDEEM_POINTS,
+            Loyalty.points >= loyalty_redeem.quantity,
+        )
+        .values(points=Loyalty.points - loyalty_redeem.quantity, updated_at=datetime.now())
+        .returning(Loyalty.id)
+    )
+
+    if loyalty_id is None:
+        return await redeem_rejection(db, loyalty_redeem)
+
+    # Calculate cash equivalent
+    cash_equivalent = to_minor_units(loyalty_redeem.quantity * POINTS_TO_CASH_RATE)
 
     # Top up wallet
+    credited_wallet = (await db.execute(
+        update(Wallet)
+        .where(Wallet.user_id == loyalty_redeem.user_id)
+        .values(balance=Wallet.balance + cash_equivalent, updated_at=datetime.now())
+        .returning(Wallet.id, Wallet.user_id, Wallet.user_phone_number)
+    )).first()
 
-    wallet = db.query(Wallet).filter(Wallet.user_id == loyalty.user_id).first()
-    wallet.balance += cash_equivalent
+    if credited_wallet is None:
+        await db.rollback()
+        return 404, {"message": "Wallet not found"}
 
     transaction = Transaction(
+        id=uuid.uuid4(),
         type="credit",
         amount=cash_equivalent,
-        wallet_id=wallet.id,
+        wallet_id=credited_wallet.id,
         source="LOYALTY_REDEMPTION",
         description="Top up wallet from loyalty points redemption",
     )
 
-    db.add(loyalty)
-    db.add(wallet)
     db.add(transaction)
-    db.commit()
-
-    return 201, {"message": f"Points redeemed successfully. Cash equivalent: ${cash_equivalent}"}
+    await post_journals(db, [(transaction.id, credited_wallet.id, LedgerAccountEnum.LOYALTY, cash_equivalent)])
+    await add_events(db, [outbox_event(OutboxEventEnum.LOYALTY_REDEEMED, {
+        "transaction_id": str(transaction.id),
+        "wallet_id": str(credited_wallet.id),
+        "user_id": loyalty_redeem.user_id,
+        "points": loyalty_redeem.quantity,
+        "amount": from_minor_units(cash_equivalent),
+    })])
+    await db.commit()
+    after_commit(db, invalidate_wallet, *credited_wallet)
+
+    return 201, {"message": f"Points redeemed successfully. Cash equivalent: ${from_minor_units(cash_equivalent)}"}
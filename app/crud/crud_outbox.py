@@ -0,0 +1,28 @@
+import json
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.enums.OutboxEventEnum import OutboxEventEnum
+from app.models.OutboxEvent import OutboxEvent
+from app.utilities.money import from_minor_units
+
+
+def outbox_event(event_type: OutboxEventEnum, payload: dict):
+    return {"event_type": event_type.value, "payload": json.dumps(payload)}
+
+
+# Event of a transaction that moved money in or out of a wallet
+def transaction_event(event_type: OutboxEventEnum, transaction_id, wallet_id, amount: int, source):
+    return outbox_event(event_type, {
+        "transaction_id": str(transaction_id),
+        "wallet_id": str(wallet_id),
+        "amount": from_minor_units(amount),
+        "source": source,
+    })
+
+
+# Queue events in the caller's transaction, they are only dispatched once it commits
+async def add_events(db: AsyncSession, events: list):
+    if events:
+        await db.execute(insert(OutboxEvent), events)
@@ -0,0 +1,68 @@
+import uuid
+from typing import Union
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.crud_balance import signed_amount
+from app.models.ReconciliationMismatch import ReconciliationMismatch
+from app.models.Transaction import Transaction
+from app.models.Wallet import Wallet
+
+LOW_BITS = (1 << 96) - 1
+
+
+# Split the wallet id space into (lower, upper] ranges of equal size, random wallet ids spread evenly over them
+def wallet_id_ranges(partitions: int):
+    # Bounds end in f digits, so SQLite never compares them to its UUID typed column as numbers
+    bounds = [uuid.UUID(int=((index << 128) // partitions) | LOW_BITS) for index in range(1, partitions)]
+    return list(zip([None] + bounds, bounds + [None]))
+
+
+# Balance and ledger sum of the next chunk of wallets in id order, read in one statement so both see the same snapshot
+def reconciliation_chunk_query(lower: Union[uuid.UUID, None], upper: Union[uuid.UUID, None],
+                               after: Union[uuid.UUID, None], chunk_size: int):
+    wallets = select(Wallet.id, Wallet.balance).order_by(Wallet.id).limit(chunk_size)
+    if after is not None or lower is not None:
+        wallets = wallets.where(Wallet.id > (after or lower))
+    if upper is not None:
+        wallets = wallets.where(Wallet.id <= upper)
+    wallets = wallets.subquery()
+
+    # Summed by the database, only one row per wallet is sent back
+    ledger = (
+        select(Transaction.wallet_id, func.sum(signed_amount).label("balance"))
+        .where(Transaction.wallet_id.in_(select(wallets.c.id)))
+        .group_by(Transaction.wallet_id)
+        .subquery()
+    )
+    return (
+        select(wallets.c.id, wallets.c.balance, func.coalesce(ledger.c.balance, 0))
+        .select_from(wallets.outerjoin(ledger, ledger.c.wallet_id == wallets.c.id))
+        .order_by(wallets.c.id)
+    )
+
+
+# Compare the balance of every wallet in a range with its transaction history, recording each mismatch under the run
+async def reconcile_wallets(db: AsyncSession, run_id: str, lower: Union[uuid.UUID, None] = None,
+                            upper: Union[uuid.UUID, None] = None, chunk_size: int = 1000):
+    wallets = 0
+    mismatches = 0
+    after = None
+    while True:
+        rows = (await db.execute(reconciliation_chunk_query(lower, upper, after, chunk_size))).all()
+        if not rows:
+            return {"run_id": run_id, "wallets": wallets, "mismatches": mismatches}
+
+        mismatched = [
+            ReconciliationMismatch(run_id=run_id, wallet_id=wallet_id, wallet_balance=wallet_balance,
+                                   ledger_balance=ledger_balance, difference=wallet_balance - ledger_balance)
+            for wallet_id, wallet_balance, ledger_balance in rows
+            if wallet_balance != ledger_balance
+        ]
+        db.add_all(mismatched)
+        await db.commit()
+
+        wallets += len(rows)
+        mismatches += len(mismatched)
+        after = rows[-1][0]
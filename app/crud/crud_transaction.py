@@ -1,46 +1,80 @@
-from sqlalchemy.orm import Session
-
+import csv
+import io
+import json
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import List, Union
+
+from sqlalchemy import bindparam, insert, select, update, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.crud.crud_ledger import post_journals
 from app.crud.crud_loyalty import POINTS_TO_CASH_RATE
+from app.crud.crud_outbox import add_events, outbox_event, transaction_event
+from app.crud.crud_wallet import invalidate_wallet
+from app.db.group_commit import after_commit
+from app.db.upsert import UPSERT_INSERTS
+from app.enums.BulkModeEnum import BulkModeEnum
+from app.enums.ExportFormatEnum import ExportFormatEnum
+from app.enums.LedgerAccountEnum import LedgerAccountEnum
+from app.enums.OutboxEventEnum import OutboxEventEnum
 from app.models.Loyalty import Loyalty
 from app.models.Transaction import Transaction
 from app.models.Wallet import Wallet
-from app.schemas.TransactionSchemas import TransactionRequest
+from app.schemas.TransactionSchemas import TransactionRequest, TransferRequest, RefundRequest, TransactionFilters
 from app.utilities.check_role import check_admin_user
+from app.utilities.local_time import local_time
+from app.utilities.money import from_minor_units, to_minor_units
+from app.utilities.pagination import encode_cursor, decode_cursor
 
+# Source of both legs of a transfer between wallets
+TRANSFER_SOURCE = "TRANSFER"
 
 
 # top up wallet
-def top_wallet(db: Session, user: dict, request: TransactionRequest):
+async def top_wallet(db: AsyncSession, user: dict, request: TransactionRequest):
     if check_admin_user(user) is None:
         return 403, {"message": "Unauthorized access"}
 
-    wallet_to_be_credited = db.query(Wallet).filter(Wallet.user_phone_number == request.destination).first()
+    # Credit the balance in the database so concurrent top ups never overwrite each other
+    credited_wallet = (await db.execute(
+        update(Wallet)
+        .where(Wallet.user_phone_number == request.destination, Wallet.is_deleted == False)
+        .values(balance=Wallet.balance + request.amount_minor, updated_at=datetime.now())
+        .returning(Wallet.id, Wallet.user_id, Wallet.user_phone_number)
+    )).first()
 
-    if not wallet_to_be_credited or wallet_to_be_credited.is_deleted:
+    if credited_wallet is None:
         return 404, {"message": "Wallet not found"}
 
-    wallet_to_be_credited.balance += request.amount
-
     transaction = Transaction(
+        id=uuid.uuid4(),
         type="credit",
-        amount=request.amount,
-        wallet_id=wallet_to_be_credited.id,
+        amount=request.amount_minor,
+        wallet_id=credited_wallet.id,
         source=request.source,
         description=f"Top up wallet by System Admin: {user.get('username')}",
     )
 
-    db.add(wallet_to_be_credited)
     db.add(transaction)
-    db.commit()
+    await post_journals(db, [(transaction.id, credited_wallet.id, LedgerAccountEnum.TOP_UPS, request.amount_minor)])
+    await add_events(db, [transaction_event(OutboxEventEnum.WALLET_TOPPED_UP, transaction.id, credited_wallet.id,
+                                            request.amount_minor, request.source)])
+    await db.commit()
+    after_commit(db, invalidate_wallet, *credited_wallet)
     return 200, {"message": "Wallet topped up successfully"}
 
 
-# debit wallet
-def debit_wallet(db: Session, user: dict, request: TransactionRequest):
-    if check_admin_user(user) is None:
-        return 403, {"message": "Unauthorized access"}
+# Loyalty points earned by a debit
+def loyalty_points(request: TransactionRequest):
+    return int(request.amount * POINTS_TO_CASH_RATE)
+
 
-    wallet_to_be_debited = db.query(Wallet).filter(Wallet.user_phone_number == request.destination).first()
+# Explain why a conditional debit did not match the wallet
+async def debit_rejection(db: AsyncSession, user: dict, request: TransactionRequest):
+    wallet_to_be_debited = await db.scalar(select(Wallet).where(Wallet.user_phone_number == request.destination))
 
     if not wallet_to_be_debited or wallet_to_be_debited.is_deleted:
         return 404, {"message": "Wallet not found"}
@@ -51,66 +85,454 @@ def debit_wallet(db: Session, user: dict, request: TransactionRequest):
     if wallet_to_be_debited.is_blocked:
         return 403, {"message": "Wallet is blocked"}
 
-    if wallet_to_be_debited.balance < request.amount:
-        return 400, {"message": "Insufficient balance"}
+    return 400, {"message": "Insufficient balance"}
+
+
+# Add loyalty points to each user in one upsert, creating their loyalty record on first accrual
+async def accrue_loyalty_points(db: AsyncSession, points_by_user: dict):
+    dialect_insert = UPSERT_INSERTS[db.get_bind().dialect.name]
+    statement = dialect_insert(Loyalty).values([
+        {"user_id": user_id, "points": points} for user_id, points in sorted(points_by_user.items())
+    ])
+    await db.execute(statement.on_conflict_do_update(
+        index_elements=[Loyalty.user_id],
+        set_={"points": Loyalty.points + statement.excluded.points, "updated_at": datetime.now()},
+    ))
+
+
+# debit wallet
+async def debit_wallet(db: AsyncSession, user: dict, request: TransactionRequest):
+    if check_admin_user(user) is None:
+        return 403, {"message": "Unauthorized access"}
+
+    # Debit only when every check passes, the balance check runs against the locked row
+    debited_wallet = (await db.execute(
+        update(Wallet)
+        .where(
+            Wallet.user_phone_number == request.destination,
+            Wallet.is_deleted == False,
+            Wallet.is_blocked == False,
+            Wallet.user_id != user.get("user_id"),
+            Wallet.balance >= request.amount_minor,
+        )
+        .values(balance=Wallet.balance - request.amount_minor, updated_at=datetime.now())
+        .returning(Wallet.id, Wallet.user_id, Wallet.user_phone_number)
+    )).first()
 
-    wallet_to_be_debited.balance -= request.amount
+    if debited_wallet is None:
+        return await debit_rejection(db, user, request)
 
     transaction = Transaction(
+        id=uuid.uuid4(),
         type="debit",
-        amount=request.amount,
-        wallet_id=wallet_to_be_debited.id,
+        amount=request.amount_minor,
+        wallet_id=debited_wallet.id,
         source=request.source,
         description=f"Debit wallet by System Admin: {user.get('username')}",
     )
 
-    user_loyalty = db.query(Loyalty).filter(Loyalty.user_id == wallet_to_be_debited.user_id).first()
+    await accrue_loyalty_points(db, {debited_wallet.user_id: loyalty_points(request)})
 
-    if user_loyalty:
-        user_loyalty.points += request.amount * POINTS_TO_CASH_RATE
-        db.add(user_loyalty)
-    else:
-        new_loyalty = Loyalty(
-            user_id=wallet_to_be_debited.user_id,
-            points=request.amount * POINTS_TO_CASH_RATE
-        )
-        db.add(new_loyalty)
-
-    db.add(wallet_to_be_debited)
     db.add(transaction)
-    db.commit()
+    await post_journals(db, [(transaction.id, debited_wallet.id, LedgerAccountEnum.PAYMENTS, -request.amount_minor)])
+    await add_events(db, [transaction_event(OutboxEventEnum.WALLET_DEBITED, transaction.id, debited_wallet.id,
+                                            request.amount_minor, request.source)])
+    await db.commit()
+    after_commit(db, invalidate_wallet, *debited_wallet)
     return 200, {"message": "Wallet debited successfully"}
 
 
-# get all transactions
-def transaction_all_history(db: Session, user: dict, limit: int = 10, offset: int = 0):
+
+# Split a batch into the chunks that are committed one database transaction at a time
+def chunked(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield start, items[start:start + size]
+
+
+def bulk_result(index: int, request: TransactionRequest, status_code: int, message: str):
+    return {"index": index, "destination": request.destination, "status_code": status_code, "message": message}
+
+
+def bulk_summary(results: list):
+    succeeded = sum(1 for result in results if result["status_code"] == 200)
+    return {"succeeded": succeeded, "failed": len(results) - succeeded, "results": results}
+
+
+# Lock the wallets of the given phone numbers in id order, so concurrent batches cannot deadlock
+async def lock_wallets_by_phone_number(db: AsyncSession, phone_numbers: set):
+    wallets = (await db.execute(
+        select(Wallet.id, Wallet.user_id, Wallet.user_phone_number, Wallet.balance, Wallet.is_blocked)
+        .where(Wallet.user_phone_number.in_(phone_numbers), Wallet.is_deleted == False)
+        .order_by(Wallet.id)
+        .with_for_update()
+    )).all()
+    return {wallet.user_phone_number: wallet for wallet in wallets}
+
+
+# Add a signed amount to each wallet balance in one executemany
+async def apply_balance_changes(db: AsyncSession, changes: dict):
+    wallet_table = Wallet.__table__
+    await db.execute(
+        update(wallet_table)
+        .where(wallet_table.c.id == bindparam("wallet_id"))
+        .values(balance=wallet_table.c.balance + bindparam("change"), updated_at=datetime.now()),
+        [{"wallet_id": wallet_id, "change": change} for wallet_id, change in sorted(changes.items())]
+    )
+
+
+def invalidate_wallets(wallets):
+    for wallet in wallets:
+        invalidate_wallet(wallet.id, wallet.user_id, wallet.user_phone_number)
+
+
+# Credit one chunk of top ups, the caller commits
+async def top_wallets_chunk(db: AsyncSession, user: dict, start: int, requests: List[TransactionRequest]):
+    wallets = await lock_wallets_by_phone_number(db, {request.destination for request in requests})
+
+    changes = defaultdict(int)
+    transactions = []
+    results = []
+    for index, request in enumerate(requests, start):
+        wallet = wallets.get(request.destination)
+        if wallet is None:
+            results.append(bulk_result(index, request, 404, "Wallet not found"))
+            continue
+
+        changes[wallet.id] += request.amount_minor
+        transactions.append({
+            "id": uuid.uuid4(),
+            "type": "credit",
+            "amount": request.amount_minor,
+            "wallet_id": wallet.id,
+            "source": request.source,
+            "description": f"Top up wallet by System Admin: {user.get('username')}",
+        })
+        results.append(bulk_result(index, request, 200, "Wallet topped up successfully"))
+
+    if transactions:
+        await apply_balance_changes(db, changes)
+        await db.execute(insert(Transaction), transactions)
+        await post_journals(db, [(transaction["id"], transaction["wallet_id"], LedgerAccountEnum.TOP_UPS,
+                                  transaction["amount"]) for transaction in transactions])
+        await add_events(db, [transaction_event(OutboxEventEnum.WALLET_TOPPED_UP, transaction["id"],
+                                                transaction["wallet_id"], transaction["amount"], transaction["source"])
+                              for transaction in transactions])
+    return results, wallets.values()
+
+
+# top up many wallets, committing every chunk of the batch separately
+async def top_wallets(db: AsyncSession, user: dict, requests: List[TransactionRequest]):
     if check_admin_user(user) is None:
         return 403, {"message": "Unauthorized access"}
 
-    transactions = db.query(Transaction).offset(offset).limit(limit).all()
+    results = []
+    for start, chunk in chunked(requests, settings.bulk_transaction_chunk_size):
+        chunk_results, wallets = await top_wallets_chunk(db, user, start, chunk)
+        await db.commit()
+        invalidate_wallets(wallets)
+        results.extend(chunk_results)
+
+    return 200, bulk_summary(results)
+
+
+# Run the checks of debit_wallet against a locked wallet and the balance left by earlier debits of the batch
+def bulk_debit_rejection(user: dict, wallet, request: TransactionRequest, balance: int):
+    if wallet is None:
+        return 404, "Wallet not found"
+
+    if wallet.user_id == user.get("user_id"):
+        return 400, "You cannot debit your own wallet"
+
+    if wallet.is_blocked:
+        return 403, "Wallet is blocked"
+
+    if balance < request.amount_minor:
+        return 400, "Insufficient balance"
+
+    return None
+
+
+# Debit one chunk of the batch, the caller commits or rolls back
+async def debit_wallets_chunk(db: AsyncSession, user: dict, start: int, requests: List[TransactionRequest]):
+    wallets = await lock_wallets_by_phone_number(db, {request.destination for request in requests})
+    balances = {wallet.id: wallet.balance for wallet in wallets.values()}
+
+    changes = defaultdict(int)
+    points_by_user = defaultdict(int)
+    transactions = []
+    results = []
+    for index, request in enumerate(requests, start):
+        wallet = wallets.get(request.destination)
+        rejection = bulk_debit_rejection(user, wallet, request, balances.get(wallet.id) if wallet else 0)
+        if rejection is not None:
+            results.append(bulk_result(index, request, *rejection))
+            continue
+
+        balances[wallet.id] -= request.amount_minor
+        changes[wallet.id] -= request.amount_minor
+        points_by_user[wallet.user_id] += loyalty_points(request)
+        transactions.append({
+            "id": uuid.uuid4(),
+            "type": "debit",
+            "amount": request.amount_minor,
+            "wallet_id": wallet.id,
+            "source": request.source,
+            "description": f"Debit wallet by System Admin: {user.get('username')}",
+        })
+        results.append(bulk_result(index, request, 200, "Wallet debited successfully"))
+
+    if transactions:
+        await apply_balance_changes(db, changes)
+        await db.execute(insert(Transaction), transactions)
+        await post_journals(db, [(transaction["id"], transaction["wallet_id"], LedgerAccountEnum.PAYMENTS,
+                                  -transaction["amount"]) for transaction in transactions])
+        await add_events(db, [transaction_event(OutboxEventEnum.WALLET_DEBITED, transaction["id"],
+                                                transaction["wallet_id"], transaction["amount"], transaction["source"])
+                              for transaction in transactions])
+        await accrue_loyalty_points(db, points_by_user)
+    return results, wallets.values()
+
+
+# debit many wallets, either committing every chunk that passed its checks or nothing at all
+async def debit_wallets(db: AsyncSession, user: dict, requests: List[TransactionRequest],
+                        mode: BulkModeEnum = BulkModeEnum.BEST_EFFORT):
+    if check_admin_user(user) is None:
+        return 403, {"message": "Unauthorized access"}
+
+    results = []
+    touched_wallets = []
+    for start, chunk in chunked(requests, settings.bulk_transaction_chunk_size):
+        chunk_results, wallets = await debit_wallets_chunk(db, user, start, chunk)
+        if mode == BulkModeEnum.BEST_EFFORT:
+            await db.commit()
+            invalidate_wallets(wallets)
+        else:
+            touched_wallets.extend(wallets)
+        results.extend(chunk_results)
+
+    if mode == BulkModeEnum.ALL_OR_NOTHING:
+        if all(result["status_code"] == 200 for result in results):
+            await db.commit()
+            invalidate_wallets(touched_wallets)
+        else:
+            await db.rollback()
+            for result in results:
+                if result["status_code"] == 200:
+                    result.update(status_code=424, message="Not applied, another debit in the batch failed")
+
+    return 200, bulk_summary(results)
+
+
+# Move money between two wallets in one database transaction
+async def transfer_funds(db: AsyncSession, user: dict, request: TransferRequest):
+    if request.source == request.destination:
+        return 400, {"message": "You cannot transfer to the same wallet"}
+
+    # Both rows are locked in wallet id order, whichever direction the money moves
+    wallets = await lock_wallets_by_phone_number(db, {request.source, request.destination})
+    source_wallet = wallets.get(request.source)
+    destination_wallet = wallets.get(request.destination)
+
+    if source_wallet is None:
+        return 404, {"message": "Wallet not found"}
+
+    if check_admin_user(user) is None and source_wallet.user_id != user.get("user_id"):
+        return 403, {"message": "Unauthorized access"}
+
+    if destination_wallet is None:
+        return 404, {"message": "Destination wallet not found"}
 
-    transactions_response = [
+    if source_wallet.is_blocked or destination_wallet.is_blocked:
+        return 403, {"message": "Wallet is blocked"}
+
+    if source_wallet.balance < request.amount_minor:
+        return 400, {"message": "Insufficient balance"}
+
+    await apply_balance_changes(db, {source_wallet.id: -request.amount_minor,
+                                     destination_wallet.id: request.amount_minor})
+    debit_id, credit_id = uuid.uuid4(), uuid.uuid4()
+    await db.execute(insert(Transaction), [
         {
-            "id": str(transaction.id),
-            "wallet_id": str(transaction.wallet_id),
-            "amount": transaction.amount,
-            "type": transaction.type,
-            "description": transaction.description,
-            "source": transaction.source,
-            "created_at": transaction.created_at.isoformat(timespec='milliseconds') + 'Z',
-            "updated_at": transaction.updated_at.isoformat(timespec='milliseconds') + 'Z'
-        } for transaction in transactions
-    ]
+            "id": debit_id,
+            "type": "debit",
+            "amount": request.amount_minor,
+            "wallet_id": source_wallet.id,
+            "source": TRANSFER_SOURCE,
+            "description": f"Transfer to {request.destination} by {user.get('username')}",
+        },
+        {
+            "id": credit_id,
+            "type": "credit",
+            "amount": request.amount_minor,
+            "wallet_id": destination_wallet.id,
+            "source": TRANSFER_SOURCE,
+            "description": f"Transfer from {request.source} by {user.get('username')}",
+        },
+    ])
+    await post_journals(db, [
+        (debit_id, source_wallet.id, LedgerAccountEnum.TRANSFERS, -request.amount_minor),
+        (credit_id, destination_wallet.id, LedgerAccountEnum.TRANSFERS, request.amount_minor),
+    ])
+    await add_events(db, [outbox_event(OutboxEventEnum.TRANSFER_COMPLETED, {
+        "debit_transaction_id": str(debit_id),
+        "credit_transaction_id": str(credit_id),
+        "source_wallet_id": str(source_wallet.id),
+        "destination_wallet_id": str(destination_wallet.id),
+        "amount": from_minor_units(request.amount_minor),
+    })])
+    await db.commit()
+    after_commit(db, invalidate_wallets, wallets.values())
+    return 200, {"message": "Transfer completed successfully"}
+
+
+# Explain why a conditional refund did not match the original transaction
+async def refund_rejection(db: AsyncSession, transaction_id: uuid.UUID):
+    original = await db.scalar(select(Transaction).where(Transaction.id == transaction_id))
+
+    if original is None:
+        return 404, {"message": "Transaction not found"}
+
+    if original.type != "debit":
+        return 400, {"message": "Only debit transactions can be refunded"}
+
+    if original.source == TRANSFER_SOURCE:
+        return 400, {"message": "Transfers cannot be refunded"}
+
+    return 400, {"message": "Refund exceeds the amount left to refund"}
+
+
+# Refund part or all of a debit back to its wallet
+async def refund_transaction(db: AsyncSession, user: dict, transaction_id: str, request: RefundRequest):
+    if check_admin_user(user) is None:
+        return 403, {"message": "Unauthorized access"}
 
-    return 200, transactions_response
+    try:
+        transaction_id = uuid.UUID(transaction_id)
+    except ValueError:
+        return 404, {"message": "Transaction not found"}
+
+    # The counter on the original row caps refunds, concurrent refunds of one debit queue on its row lock.
+    # The debit leg of a transfer is not refundable, the receiver keeps the money it was paid with
+    wallet_id = await db.scalar(
+        update(Transaction)
+        .where(
+            Transaction.id == transaction_id,
+            Transaction.type == "debit",
+            Transaction.source.is_distinct_from(TRANSFER_SOURCE),
+            Transaction.refunded_amount + request.amount_minor <= Transaction.amount,
+        )
+        .values(refunded_amount=Transaction.refunded_amount + request.amount_minor, updated_at=datetime.now())
+        .returning(Transaction.wallet_id)
+    )
+
+    if wallet_id is None:
+        return await refund_rejection(db, transaction_id)
+
+    credited_wallet = (await db.execute(
+        update(Wallet)
+        .where(Wallet.id == wallet_id, Wallet.is_deleted == False)
+        .values(balance=Wallet.balance + request.amount_minor, updated_at=datetime.now())
+        .returning(Wallet.id, Wallet.user_id, Wallet.user_phone_number)
+    )).first()
+
+    if credited_wallet is None:
+        await db.rollback()
+        return 404, {"message": "Wallet not found"}
+
+    refund = Transaction(
+        id=uuid.uuid4(),
+        type="refund",
+        amount=request.amount_minor,
+        wallet_id=credited_wallet.id,
+        source="REFUND",
+        description=request.description or f"Refund by System Admin: {user.get('username')}",
+        original_transaction_id=transaction_id,
+    )
+
+    db.add(refund)
+    await post_journals(db, [(refund.id, credited_wallet.id, LedgerAccountEnum.PAYMENTS, request.amount_minor)])
+    await add_events(db, [outbox_event(OutboxEventEnum.TRANSACTION_REFUNDED, {
+        "transaction_id": str(refund.id),
+        "original_transaction_id": str(transaction_id),
+        "wallet_id": str(credited_wallet.id),
+        "amount": from_minor_units(request.amount_minor),
+    })])
+    await db.commit()
+    after_commit(db, invalidate_wallet, *credited_wallet)
+    return 200, {"message": "Transaction refunded successfully"}
+
+
+# Build the response of a transaction
+def transaction_to_response(transaction: Transaction):
+    return {
+        "id": str(transaction.id),
+        "wallet_id": str(transaction.wallet_id),
+        "amount": from_minor_units(transaction.amount),
+        "type": transaction.type,
+        "description": transaction.description,
+        "source": transaction.source,
+        "original_transaction_id": str(transaction.original_transaction_id)
+        if transaction.original_transaction_id else None,
+        "refunded_amount": from_minor_units(transaction.refunded_amount or 0),
+        "sequence": transaction.sequence,
+        "created_at": transaction.created_at.isoformat(timespec='milliseconds') + 'Z',
+        "updated_at": transaction.updated_at.isoformat(timespec='milliseconds') + 'Z'
+    }
+
+
+# Read one page of transactions, newest first, continuing after the cursor when one is given
+async def read_transaction_page(db: AsyncSession, query, limit: int, offset: int, cursor: Union[str, None]):
+    query = query.order_by(Transaction.created_at.desc(), Transaction.id.desc())
+
+    if cursor:
+        created_at, transaction_id = decode_cursor(cursor)
+        query = query.where(tuple_(Transaction.created_at, Transaction.id) < tuple_(created_at, transaction_id))
+    else:
+        query = query.offset(offset)
+
+    # Fetch one extra row to know whether another page follows
+    transactions = (await db.scalars(query.limit(limit + 1))).all()
+    has_more = len(transactions) > limit
+    transactions = transactions[:limit]
+
+    last = transactions[-1] if has_more and transactions else None
+    return {
+        "transactions": [transaction_to_response(transaction) for transaction in transactions],
+        "next_cursor": encode_cursor(last.created_at, last.id) if last else None,
+    }
+
+
+# get all transactions
+async def transaction_all_history(db: AsyncSession, user: dict, limit: int = 10, offset: int = 0,
+                                  cursor: Union[str, None] = None, filters: Union[TransactionFilters, None] = None):
+    if check_admin_user(user) is None:
+        return 403, {"message": "Unauthorized access"}
+
+    try:
+        conditions = transaction_filters(filters)
+    except ValueError as error:
+        return 400, {"message": str(error)}
+
+    try:
+        page = await read_transaction_page(db, select(Transaction).where(*conditions), limit, offset, cursor)
+    except ValueError:
+        return 400, {"message": "Invalid cursor"}
+
+    return 200, page
 
 
 # get user transactions
-def transaction_user_history(db: Session, user: dict, user_id: str, limit: int = 10, offset: int = 0):
+async def transaction_user_history(db: AsyncSession, user: dict, user_id: str, limit: int = 10, offset: int = 0,
+                                   cursor: Union[str, None] = None, filters: Union[TransactionFilters, None] = None):
     if check_admin_user(user) is None:
         return 403, {"message": "Unauthorized access"}
 
-    user_wallet = db.query(Wallet).filter(Wallet.user_id == user_id).first()
+    try:
+        conditions = transaction_filters(filters)
+    except ValueError as error:
+        return 400, {"message": str(error)}
+
+    user_wallet = await db.scalar(select(Wallet).where(Wallet.user_id == user_id))
 
     if not user_wallet or user_wallet.is_deleted:
         return 404, {"message": "User wallet"}
@@ -118,45 +540,115 @@ def transaction_user_history(db: Session, user: dict, user_id: str, limit: int =
     if user_wallet.is_blocked:
         return 403, {"message": "User wallet is blocked"}
 
-    transactions = (db.query(Transaction).filter(Transaction.wallet_id == user_wallet.id).offset(offset).limit(limit)
-                    .all())
+    try:
+        page = await read_transaction_page(
+            db, select(Transaction).where(Transaction.wallet_id == user_wallet.id, *conditions), limit, offset, cursor)
+    except ValueError:
+        return 400, {"message": "Invalid cursor"}
+
+    return 200, page
+
+
+# Build the filter conditions of a transaction query, raising ValueError when the filters are invalid.
+# Wallet, type and source compare equal and created_at is a range, so each lines up with an index on
+# (column, created_at, id) and pages stay in index order. The amount range is checked on the rows those select.
+def transaction_filters(filters: Union[TransactionFilters, None]):
+    conditions = []
+    if filters is None:
+        return conditions
+
+    created_from = local_time(filters.created_from) if filters.created_from else None
+    created_to = local_time(filters.created_to) if filters.created_to else None
+    if created_from and created_to and created_from > created_to:
+        raise ValueError("created_from must not be after created_to")
+    if filters.amount_min is not None and filters.amount_max is not None and filters.amount_min > filters.amount_max:
+        raise ValueError("amount_min must not be greater than amount_max")
+
+    if filters.wallet_id:
+        try:
+            conditions.append(Transaction.wallet_id == uuid.UUID(filters.wallet_id))
+        except ValueError:
+            raise ValueError("Invalid wallet id")
+    if created_from:
+        conditions.append(Transaction.created_at >= created_from)
+    if created_to:
+        conditions.append(Transaction.created_at < created_to)
+    if filters.type:
+        conditions.append(Transaction.type == filters.type.value)
+    if filters.source:
+        conditions.append(Transaction.source == filters.source)
+    if filters.amount_min is not None:
+        conditions.append(Transaction.amount >= to_minor_units(filters.amount_min))
+    if filters.amount_max is not None:
+        conditions.append(Transaction.amount <= to_minor_units(filters.amount_max))
+    return conditions
+
+
+# Render a chunk of transactions as newline delimited json
+def render_ndjson(rows: list, include_header: bool):
+    return "".join(json.dumps(row) + "\n" for row in rows)
+
+
+# Render a chunk of transactions as csv
+def render_csv(rows: list, include_header: bool):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    if include_header:
+        writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+EXPORT_FIELDS = ["id", "wallet_id", "amount", "type", "description", "source", "original_transaction_id", "refunded_amount",
+                 "sequence", "created_at", "updated_at"]
+EXPORT_RENDERERS = {ExportFormatEnum.NDJSON: render_ndjson, ExportFormatEnum.CSV: render_csv}
+EXPORT_CHUNK_SIZE = 1000
+
+
+# Stream the matching transactions in chunks read from a server side cursor
+async def stream_transactions(db: AsyncSession, conditions: list, export_format: ExportFormatEnum):
+    render = EXPORT_RENDERERS[export_format]
+    query = (
+        select(Transaction)
+        .where(*conditions)
+        .order_by(Transaction.created_at, Transaction.id)
+        .execution_options(yield_per=EXPORT_CHUNK_SIZE)
+    )
+
+    result = await db.stream_scalars(query)
+    include_header = True
+    async for transactions in result.partitions():
+        yield render([transaction_to_response(transaction) for transaction in transactions], include_header)
+        include_header = False
+
+    # Still emit the csv header for an empty export
+    if include_header and export_format == ExportFormatEnum.CSV:
+        yield render([], True)
 
-    transactions_response = [
-        {
-            "id": str(transaction.id),
-            "wallet_id": str(transaction.wallet_id),
-            "amount": transaction.amount,
-            "type": transaction.type,
-            "description": transaction.description,
-            "source": transaction.source,
-            "created_at": transaction.created_at.isoformat(timespec='milliseconds') + 'Z',
-            "updated_at": transaction.updated_at.isoformat(timespec='milliseconds') + 'Z'
-        } for transaction in transactions
-    ]
 
-    return 200, transactions_response
+# export transactions
+async def export_transactions(db: AsyncSession, user: dict, export_format: ExportFormatEnum,
+                              filters: Union[TransactionFilters, None] = None):
+    if check_admin_user(user) is None:
+        return 403, {"message": "Unauthorized access"}
+
+    try:
+        conditions = transaction_filters(filters)
+    except ValueError as error:
+        return 400, {"message": str(error)}
+
+    return 200, stream_transactions(db, conditions, export_format)
 
 
 # get transaction by id
-def transaction_by_id(db: Session, user: dict, transaction_id: str):
+async def transaction_by_id(db: AsyncSession, user: dict, transaction_id: str):
     print(f"transaction_id: {transaction_id}")
     if check_admin_user(user) is None:
         return 403, {"message": "Unauthorized access"}
 
-    transaction = db.query(Transaction).filter(Transaction.id == transaction_id).first()
+    transaction = await db.scalar(select(Transaction).where(Transaction.id == transaction_id))
 
     if not transaction:
         return 404, {"message": "Transaction not found"}
 
-    transaction_response = {
-        "id": str(transaction.id),
-        "wallet_id": str(transaction.wallet_id),
-        "amount": transaction.amount,
-        "type": transaction.type,
-        "description": transaction.description,
-        "source": transaction.source,
-        "created_at": transaction.created_at.isoformat(timespec='milliseconds') + 'Z',
-        "updated_at": transaction.updated_at.isoformat(timespec='milliseconds') + 'Z'
-    }
-
-    return 200, transaction_response
+    return 200, transaction_to_response(transaction)
@@ -1,5 +1,8 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.executor import password_executor
+from app.crud.crud_auth import invalidate_principal
 from app.core.security import encrypt_password
 from app.models.User import User
 from app.models.Wallet import Wallet
@@ -9,10 +12,10 @@ from app.utilities.read_user import get_user
 
 
 # Get all users
-def get_all_users(db: Session, user: dict):
+async def get_all_users(db: AsyncSession, user: dict):
     if check_admin_user(user) is None:
         return 401, {"message": "You do not have enough permission to view users"}
-    users = db.query(User).all()
+    users = (await db.scalars(select(User))).all()
     return 200, [{
         "id": user.id,
         "username": user.username,
@@ -26,14 +29,14 @@ def get_all_users(db: Session, user: dict):
 
 
 # Create new user
-def create_user(user_to_be_created: UserRequest, db: Session, user: dict):
+async def create_user(user_to_be_created: UserRequest, db: AsyncSession, user: dict):
     if check_admin_user(user) is None:
         return 401, {"message": "You do not have enough permission to create users"}
-    if db.query(User).filter(User.email == user_to_be_created.email).first():
+    if await db.scalar(select(User).where(User.email == user_to_be_created.email)):
         return 400, {"message": "User with the associated email already exist"}
-    if db.query(User).filter(User.phone_number == user_to_be_created.phone_number).first():
+    if await db.scalar(select(User).where(User.phone_number == user_to_be_created.phone_number)):
         return 400, {"message": "User with the associated phone number already exist"}
-    if db.query(User).filter(User.username == user_to_be_created.username).first():
+    if await db.scalar(select(User).where(User.username == user_to_be_created.username)):
         return 400, {"message": "User with the associated username already exist"}
 
     # Create the new user object
@@ -41,18 +44,19 @@ def create_user(user_to_be_created: UserRequest, db: Session, user: dict):
         username=user_to_be_created.username,
         email=user_to_be_created.email,
         phone_number=user_to_be_created.phone_number,
-        hash_password=encrypt_password(user_to_be_created.password),
+        hash_password=await password_executor.run(encrypt_password, user_to_be_created.password),
         role=user_to_be_created.role,
         is_active=True
     )
 
     # Add the user to the session
     db.add(new_user)
-    db.flush()  # Flush the session to assign an ID to new_user without committing to the DB yet
+    await db.flush()  # Flush the session to assign an ID to new_user without committing to the DB yet
 
     # Check if the user has a wallet
-    user_id_exists = db.query(Wallet).filter(Wallet.user_id == new_user.id).first()
-    user_phone_number_exists = db.query(Wallet).filter(Wallet.user_phone_number == new_user.phone_number).first()
+    user_id_exists = await db.scalar(select(Wallet).where(Wallet.user_id == new_user.id))
+    user_phone_number_exists = await db.scalar(
+        select(Wallet).where(Wallet.user_phone_number == new_user.phone_number))
 
     if user_id_exists and user_phone_number_exists:
         return 400, {"message": "User already has a wallet"}
@@ -67,18 +71,18 @@ def create_user(user_to_be_created: UserRequest, db: Session, user: dict):
     db.add(new_user_wallet)
 
     # Commit both the user and the wallet in a single transaction
-    db.commit()
+    await db.commit()
 
     return 201, {"message": "User and wallet created successfully"}
 
 
 # Update user data
-def update_user_data(user_to_be_updated: UserUpdateRequest,
-                     user_id: int, user: dict, db: Session):
+async def update_user_data(user_to_be_updated: UserUpdateRequest,
+                     user_id: int, user: dict, db: AsyncSession):
     if check_admin_user(user) is None:
         return 401, {"message": "You do not have enough permission to update users"}
 
-    user_data = get_user(db, user_id)
+    user_data = await get_user(db, user_id)
     if user_data is None:
         return 404, {"message": "User not found"}
 
@@ -88,13 +92,14 @@ def update_user_data(user_to_be_updated: UserUpdateRequest,
         user_data.is_active = user_to_be_updated.is_active
 
     db.add(user_data)
-    db.commit()
+    await db.commit()
+    invalidate_principal(user_data.username)
     return 200, {"message": "User role updated successfully"}
 
 
 # Delete user
-def delete_user(user: dict, db: Session, user_id: int):
-    user_to_be_deleted = get_user(db, user_id)
+async def delete_user(user: dict, db: AsyncSession, user_id: int):
+    user_to_be_deleted = await get_user(db, user_id)
     if user_to_be_deleted is None:
         return 404, {"message": "User not found"}
     if user.get("role") == "USER":
@@ -106,5 +111,6 @@ def delete_user(user: dict, db: Session, user_id: int):
     if user.get("role") in ["SYS_ADMIN", "ADMIN"] and user_to_be_deleted.role == "USER":
         user_to_be_deleted.is_active = False
         db.add(user_to_be_deleted)
-        db.commit()
+        await db.commit()
+        invalidate_principal(user_to_be_deleted.username)
     return 200, {"message": "User deleted successfully"}
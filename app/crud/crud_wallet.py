@@ -1,14 +1,67 @@
+import uuid
 from typing import Union
 
-from sqlalchemy import and_, or_
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.crud.crud_outbox import add_events, outbox_event
+from app.enums.OutboxEventEnum import OutboxEventEnum
 from app.models.Wallet import Wallet
 from app.schemas.WalletSchemas import WalletCreationRequest, WalletUpdateRequest
 from app.utilities.check_role import check_admin_user
+from app.utilities.money import from_minor_units
 
 no_read_permission = "You do not have enough permission to read wallets"
 
+# Wallet details already read, stored under the wallet id, user id and phone number
+wallet_cache = TTLCache(settings.wallet_cache_size, settings.wallet_cache_ttl_seconds)
+
+
+def wallet_cache_keys(wallet_id, user_id, phone_number):
+    return [("id", str(wallet_id)), ("user_id", user_id), ("phone_number", phone_number)]
+
+
+# Drop a cached wallet after it changed, call once the change is committed
+def invalidate_wallet(wallet_id, user_id, phone_number):
+    for key in wallet_cache_keys(wallet_id, user_id, phone_number):
+        wallet_cache.invalidate(key)
+
+
+def cache_wallet(wallet_response: dict):
+    for key in wallet_cache_keys(wallet_response["id"], wallet_response["user_id"],
+                                 wallet_response["user_phone_number"]):
+        wallet_cache.set(key, wallet_response)
+
+
+# Look a wallet up by the first identifier given, wallet id first, then user id, then phone number
+def cached_wallet(user_id, wallet_id, phone_number):
+    if wallet_id:
+        return wallet_cache.get(("id", str(wallet_id)))
+    if user_id:
+        return wallet_cache.get(("user_id", user_id))
+    return wallet_cache.get(("phone_number", phone_number))
+
+
+# Query a wallet through the unique index of the first identifier given, in the same order as the cache
+def wallet_lookup_query(user_id: Union[int, None], wallet_id: Union[uuid.UUID, None],
+                        phone_number: Union[str, None]):
+    if wallet_id:
+        condition = Wallet.id == wallet_id
+    elif user_id:
+        condition = Wallet.user_id == user_id
+    else:
+        condition = Wallet.user_phone_number == phone_number
+    return select(Wallet).where(condition, Wallet.is_deleted == False)
+
+
+# Check every identifier given belongs to the wallet found
+def wallet_matches(wallet_response: dict, user_id, wallet_id, phone_number):
+    return ((not wallet_id or wallet_response["id"] == str(wallet_id))
+            and (not user_id or wallet_response["user_id"] == user_id)
+            and (not phone_number or wallet_response["user_phone_number"] == phone_number))
+
 
 # Check if user is an admin or wallet owner
 def is_admin_or_wallet_owner(user: dict, user_id: int):
@@ -25,12 +78,13 @@ def is_admin_or_wallet_owner(user: dict, user_id: int):
 
 
 # Create wallet
-def create_wallet(db: Session, user: dict, wallet: WalletCreationRequest):
+async def create_wallet(db: AsyncSession, user: dict, wallet: WalletCreationRequest):
     if check_admin_user(user) is None:
         return 401, {"message": "You do not have enough permission to create wallets"}
 
-    user_id_exists = db.query(Wallet).filter(Wallet.user_id == wallet.user_id).first()
-    user_phone_number_exists = db.query(Wallet).filter(Wallet.user_phone_number == wallet.user_phone_number).first()
+    user_id_exists = await db.scalar(select(Wallet).where(Wallet.user_id == wallet.user_id))
+    user_phone_number_exists = await db.scalar(
+        select(Wallet).where(Wallet.user_phone_number == wallet.user_phone_number))
 
     if user_id_exists and user_phone_number_exists:
         return 400, {"message": "User already has a wallet"}
@@ -42,12 +96,26 @@ def create_wallet(db: Session, user: dict, wallet: WalletCreationRequest):
     )
 
     db.add(request)
-    db.commit()
+    await db.commit()
     return 201, {"message": "Wallet created successfully"}
 
 
+# Build the response of a wallet
+def wallet_to_response(wallet: Wallet):
+    return {
+        "id": str(wallet.id),  # Convert UUID to string
+        "user_id": wallet.user_id,
+        "user_phone_number": wallet.user_phone_number,
+        "balance": from_minor_units(wallet.balance),
+        "is_blocked": wallet.is_blocked,
+        "is_deleted": wallet.is_deleted,
+        "created_at": wallet.created_at.isoformat(timespec='milliseconds') + 'Z',
+        "updated_at": wallet.updated_at.isoformat(timespec='milliseconds') + 'Z'
+    }
+
+
 # Read wallet details
-def read_wallet_details(db: Session, user: dict, user_id: Union[int, None], wallet_id: Union[str, None],
+async def read_wallet_details(db: AsyncSession, user: dict, user_id: Union[int, None], wallet_id: Union[str, None],
                         phone_number: Union[str, None]):
     # Ensure at least one identifier is provided
     if not any([user_id, wallet_id, phone_number]):
@@ -56,66 +124,52 @@ def read_wallet_details(db: Session, user: dict, user_id: Union[int, None], wall
     if not is_admin_or_wallet_owner(user, user_id):
         return 401, {"message": no_read_permission}
 
-    # Build the query with 'or_' to match any of the provided parameters
-    wallet_info = db.query(Wallet).filter(
-        Wallet.is_deleted == False,
-        or_(
-            Wallet.user_id == user_id,
-            Wallet.id == wallet_id,
-            Wallet.user_phone_number == phone_number
-        )
-    ).first()
-
-    if wallet_info is None:
+    try:
+        wallet_id = uuid.UUID(str(wallet_id)) if wallet_id else None
+    except ValueError:
         return 404, {"message": "User wallet details not found"}
 
-    wallet_blocked = wallet_info.is_blocked is True
+    wallet_info_response = cached_wallet(user_id, wallet_id, phone_number)
+
+    if wallet_info_response is None:
+        wallet_info = await db.scalar(wallet_lookup_query(user_id, wallet_id, phone_number))
+
+        if wallet_info is None:
+            return 404, {"message": "User wallet details not found"}
+
+        wallet_info_response = wallet_to_response(wallet_info)
+        cache_wallet(wallet_info_response)
+
+    # The other identifiers given must point at the same wallet
+    if not wallet_matches(wallet_info_response, user_id, wallet_id, phone_number):
+        return 404, {"message": "User wallet details not found"}
+
+    wallet_blocked = wallet_info_response["is_blocked"] is True
 
     if wallet_blocked:
         return 403, {"message": "Wallet is blocked. Please contact support for more information"}
 
-    wallet_info_response = {
-        "id": str(wallet_info.id),
-        "user_id": wallet_info.user_id,
-        "user_phone_number": wallet_info.user_phone_number,
-        "balance": wallet_info.balance,
-        "is_blocked": wallet_info.is_blocked,
-        "is_deleted": wallet_info.is_deleted,
-        "created_at": wallet_info.created_at.isoformat(timespec='milliseconds') + 'Z',
-        "updated_at": wallet_info.updated_at.isoformat(timespec='milliseconds') + 'Z'
-    }
-
     return 200, wallet_info_response
 
 
 # Read all wallets
-def read_all_wallet(db: Session, user: dict, limit: int = 10, offset: int = 0):
+async def read_all_wallet(db: AsyncSession, user: dict, limit: int = 10, offset: int = 0):
     if check_admin_user(user) is None:
         return 401, {"message": no_read_permission}
 
-    wallets_info = db.query(Wallet).filter(Wallet.is_deleted == False).offset(offset).limit(limit).all()
-
-    wallets_info_response = [
-        {
-            "id": str(wallet.id), # Convert UUID to string
-            "user_id": wallet.user_id,
-            "user_phone_number": wallet.user_phone_number,
-            "balance": wallet.balance,
-            "is_blocked": wallet.is_blocked,
-            "is_deleted": wallet.is_deleted,
-            "created_at": wallet.created_at.isoformat(timespec='milliseconds') + 'Z',
-            "updated_at": wallet.updated_at.isoformat(timespec='milliseconds') + 'Z'
-        } for wallet in wallets_info
-    ]
+    wallets_info = (await db.scalars(
+        select(Wallet).where(Wallet.is_deleted == False).order_by(Wallet.id).offset(offset).limit(limit))).all()
+
+    wallets_info_response = [wallet_to_response(wallet) for wallet in wallets_info]
     return 200, wallets_info_response
 
 
 # Block or unblock wallet
-def block_user_wallet(user: dict, db: Session, wallet_id: str, wallet_update: WalletUpdateRequest):
+async def block_user_wallet(user: dict, db: AsyncSession, wallet_id: str, wallet_update: WalletUpdateRequest):
     if not check_admin_user(user):
         return 401, {"message": "You do not have enough permission to block wallets"}
 
-    user_wallet = db.query(Wallet).filter(and_(Wallet.id == wallet_id, Wallet.is_deleted == False)).first()
+    user_wallet = await db.scalar(select(Wallet).where(and_(Wallet.id == wallet_id, Wallet.is_deleted == False)))
 
     if user_wallet is None:
         return 404, {"message": "User wallet not found"}
@@ -127,7 +181,10 @@ def block_user_wallet(user: dict, db: Session, wallet_id: str, wallet_update: Wa
     user_wallet.is_blocked = wallet_update.is_blocked
 
     db.add(user_wallet)
-    db.commit()
+    event_type = OutboxEventEnum.WALLET_BLOCKED if wallet_update.is_blocked else OutboxEventEnum.WALLET_UNBLOCKED
+    await add_events(db, [outbox_event(event_type, {"wallet_id": str(user_wallet.id), "user_id": user_wallet.user_id})])
+    await db.commit()
+    invalidate_wallet(user_wallet.id, user_wallet.user_id, user_wallet.user_phone_number)
 
     wallet_block_state = "blocked" if wallet_update.is_blocked else "unblocked"
 
@@ -135,11 +192,11 @@ def block_user_wallet(user: dict, db: Session, wallet_id: str, wallet_update: Wa
 
 
 # Delete wallet
-def delete_user_wallet(db: Session, user: dict, wallet_id: str):
+async def delete_user_wallet(db: AsyncSession, user: dict, wallet_id: str):
     if check_admin_user(user) is None:
         return 401, {"message": "You do not have enough permission to delete wallets"}
 
-    user_wallet = db.query(Wallet).filter(and_(Wallet.id == wallet_id, Wallet.is_deleted == False)).first()
+    user_wallet = await db.scalar(select(Wallet).where(and_(Wallet.id == wallet_id, Wallet.is_deleted == False)))
 
     if user_wallet is None:
         return 404, {"message": "User wallet not found"}
@@ -147,6 +204,7 @@ def delete_user_wallet(db: Session, user: dict, wallet_id: str):
     user_wallet.is_deleted = True
 
     db.add(user_wallet)
-    db.commit()
+    await db.commit()
+    invalidate_wallet(user_wallet.id, user_wallet.user_id, user_wallet.user_phone_number)
 
     return 200, {"message": "Wallet deleted successfully"}
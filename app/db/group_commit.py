@@ -0,0 +1,188 @@
+import asyncio
+import logging
+
+from .session import SessionLocal, mark_recent_write
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class DeferredCommitSession:
+    """Session handed to an operation whose caller owns the transaction.
+
+    The operation keeps calling commit as usual, but commit only flushes, so
+    the caller can add its own writes and commit everything at once. Work that
+    must wait for the real commit, such as cache invalidation, is registered
+    with after_commit and run by the caller once it committed.
+    """
+
+    def __init__(self, db):
+        self._db = db
+        self.post_commit = []
+
+    def __getattr__(self, name):
+        return getattr(self._db, name)
+
+    def after_commit(self, callback):
+        self.post_commit.append(callback)
+
+    async def commit(self):
+        await self._db.flush()
+
+
+class GroupSession(DeferredCommitSession):
+    """Session handed to the operations of a group.
+
+    Besides committing only by flushing, rollback undoes what the operation
+    did so far, and an operation that fails or returns an error status has its
+    savepoint rolled back once it returns.
+    """
+
+    def __init__(self, db):
+        super().__init__(db)
+        self._savepoint = None
+        self._callbacks_start = 0
+
+    async def begin_operation(self):
+        self._savepoint = await self._db.begin_nested()
+        self._callbacks_start = len(self.post_commit)
+
+    async def end_operation(self, keep: bool):
+        if keep:
+            await self._savepoint.commit()
+        else:
+            await self._discard()
+
+    async def _discard(self):
+        await self._savepoint.rollback()
+        del self.post_commit[self._callbacks_start:]
+
+    async def rollback(self):
+        # Carry on in a fresh savepoint, so the operation can still read and write after rolling back
+        await self._discard()
+        self._savepoint = await self._db.begin_nested()
+
+
+class GroupCommitter:
+    """Applies mutations that arrive within a short window in one database
+    transaction, each inside its own savepoint, and commits them together.
+
+    While a group is being committed the next requests queue up, so under load
+    every commit (and its fsync) is shared by many requests.
+    """
+
+    def __init__(self, session_factory, window: float, max_batch: int):
+        self.session_factory = session_factory
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = []
+        self._worker = None
+        self.requests = 0
+        self.commits = 0
+        self.fallbacks = 0
+
+    # Queue an operation taking a session and returning (status_code, response)
+    async def submit(self, operation, principal=None):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((operation, principal, future))
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.ensure_future(self._run())
+        return await future
+
+    async def _run(self):
+        await asyncio.sleep(self.window)
+        while self._pending:
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+            await self._apply(batch)
+
+    async def _apply(self, batch):
+        outcomes = []
+        try:
+            async with self.session_factory() as db:
+                session = GroupSession(db)
+                for operation, _, _ in batch:
+                    await session.begin_operation()
+                    try:
+                        outcome = await operation(session)
+                    except Exception as error:
+                        await session.end_operation(keep=False)
+                        outcomes.append((None, error))
+                        continue
+                    await session.end_operation(keep=outcome[0] < 400)
+                    outcomes.append((outcome, None))
+                await db.commit()
+        except Exception:
+            # Nothing of the group was committed, so every operation can run again on its own
+            await self._apply_one_by_one(batch)
+            return
+
+        for callback in session.post_commit:
+            try:
+                callback()
+            except Exception:
+                logger.exception("Running a callback after the group commit failed")
+
+        self.requests += len(batch)
+        self.commits += 1
+        for (_, principal, future), (outcome, error) in zip(batch, outcomes):
+            mark_recent_write(principal)
+            self._resolve(future, outcome, error)
+
+    async def _apply_one_by_one(self, batch):
+        self.fallbacks += 1
+        for operation, principal, future in batch:
+            outcome, error = None, None
+            try:
+                async with self.session_factory(info={"principal": principal}) as db:
+                    outcome = await operation(db)
+            except Exception as exc:
+                error = exc
+            self.requests += 1
+            self.commits += 1
+            self._resolve(future, outcome, error)
+
+    @staticmethod
+    def _resolve(future, outcome, error):
+        if future.cancelled():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(outcome)
+
+    def stats(self):
+        return {
+            "enabled": settings.group_commit_enabled,
+            "window_ms": self.window * 1000,
+            "max_batch": self.max_batch,
+            "queued": len(self._pending),
+            "requests": self.requests,
+            "commits": self.commits,
+            "fallbacks": self.fallbacks,
+            "requests_per_commit": round(self.requests / self.commits, 2) if self.commits else 0.0,
+        }
+
+
+group_committer = GroupCommitter(SessionLocal, settings.group_commit_window_ms / 1000,
+                                 settings.group_commit_max_batch)
+
+
+# Run a callback once the session's changes are committed. Crud calls it right after committing,
+# a session whose commit is deferred holds the callback until the real commit
+def after_commit(db, callback, *args):
+    if isinstance(db, DeferredCommitSession):
+        db.after_commit(lambda: callback(*args))
+    else:
+        callback(*args)
+
+
+# Run a crud mutation on the request's session, or queue it for the next group commit when enabled
+async def execute_mutation(db, operation, *args):
+    if not settings.group_commit_enabled:
+        return await operation(db, *args)
+
+    # Hand the request's pooled connection back while the request waits for its group
+    principal = db.info.get("principal")
+    await db.close()
+    return await group_committer.submit(lambda session: operation(session, *args), principal)
@@ -0,0 +1,181 @@
+import asyncio
+import json
+import logging
+import urllib.request
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_, select, update
+
+from .session import SessionLocal
+from ..core.config import settings
+from ..core.executor import blocking_executor
+from ..models.OutboxEvent import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+
+class MemorySink:
+    """Keeps every batch it receives, for subscribers living in the same process such as tests."""
+
+    def __init__(self):
+        self.events = []
+
+    async def send(self, events: list):
+        self.events.extend(events)
+
+
+class FileSink:
+    """Appends each event as a line of json to a file."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _append(self, lines: str):
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write(lines)
+
+    async def send(self, events: list):
+        await blocking_executor.run(self._append, "".join(json.dumps(event) + "\n" for event in events))
+
+
+class WebhookSink:
+    """Posts each batch as a json array, any status other than 2xx fails the batch."""
+
+    def __init__(self, url: str, timeout: float):
+        self.url = url
+        self.timeout = timeout
+
+    def _post(self, body: bytes):
+        request = urllib.request.Request(self.url, data=body, method="POST",
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            if not 200 <= response.status < 300:
+                raise RuntimeError(f"Webhook answered with status {response.status}")
+
+    async def send(self, events: list):
+        await blocking_executor.run(self._post, json.dumps(events).encode())
+
+
+def configured_sinks():
+    sinks = []
+    if settings.outbox_webhook_url:
+        sinks.append(WebhookSink(settings.outbox_webhook_url, settings.outbox_webhook_timeout_seconds))
+    if settings.outbox_file_path:
+        sinks.append(FileSink(settings.outbox_file_path))
+    return sinks
+
+
+def event_message(event: OutboxEvent):
+    return {
+        "id": event.id,
+        "type": event.event_type,
+        "payload": json.loads(event.payload),
+        "created_at": event.created_at.isoformat(timespec='milliseconds') + 'Z',
+    }
+
+
+class OutboxDispatcher:
+    """Drains the outbox table in id order and hands each batch to every sink.
+
+    Delivery is at least once: an event is marked dispatched only after all
+    sinks accepted it. When a batch fails each of its events records the
+    attempt and waits an exponential backoff before it is retried, and events
+    that failed before go out one at a time, so a bad event only holds back
+    itself. After max_attempts an event is dead lettered and left alone.
+    Claimed rows are locked with SKIP LOCKED, so a second dispatcher never
+    sends the same batch at the same time.
+    """
+
+    def __init__(self, session_factory, sinks: list, batch_size: int, interval: float, max_attempts: int = 10,
+                 retry_backoff: float = 1, max_retry_backoff: float = 300):
+        self.session_factory = session_factory
+        self.sinks = sinks
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+        self.dispatched = 0
+        self.failures = 0
+        self.dead_lettered = 0
+
+    # Record a failed attempt on each event, delaying its next one or giving up on it
+    def _retry_later(self, events: list, error: Exception, now: datetime):
+        for event in events:
+            event.attempts += 1
+            event.last_error = repr(error)
+            if event.attempts >= self.max_attempts:
+                event.dead_lettered_at = now
+                self.dead_lettered += 1
+            else:
+                backoff = min(self.retry_backoff * 2 ** (event.attempts - 1), self.max_retry_backoff)
+                event.next_attempt_at = now + timedelta(seconds=backoff)
+
+    # Send one batch of due events, returns how many were dispatched
+    async def dispatch_once(self):
+        async with self.session_factory() as db:
+            now = datetime.now()
+            events = (await db.scalars(
+                select(OutboxEvent)
+                .where(OutboxEvent.dispatched_at.is_(None), OutboxEvent.dead_lettered_at.is_(None),
+                       or_(OutboxEvent.next_attempt_at.is_(None), OutboxEvent.next_attempt_at <= now))
+                .order_by(OutboxEvent.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )).all()
+            if not events:
+                return 0
+
+            # Retries are sent alone and the pass stops at the first failure, so a sink that is down costs one call
+            batches = [[event] for event in events if event.attempts]
+            batches.append([event for event in events if not event.attempts])
+            dispatched = 0
+            for batch in filter(None, batches):
+                try:
+                    messages = [event_message(event) for event in batch]
+                    for sink in self.sinks:
+                        await sink.send(messages)
+                except Exception as error:
+                    self.failures += 1
+                    self._retry_later(batch, error, now)
+                    await db.commit()
+                    self.dispatched += dispatched
+                    raise
+
+                await db.execute(
+                    update(OutboxEvent)
+                    .where(OutboxEvent.id.in_([event.id for event in batch]))
+                    .values(dispatched_at=datetime.now(), attempts=OutboxEvent.attempts + 1, last_error=None,
+                            next_attempt_at=None)
+                )
+                dispatched += len(batch)
+
+            await db.commit()
+            self.dispatched += dispatched
+            return dispatched
+
+    async def run(self):
+        while True:
+            try:
+                dispatched = await self.dispatch_once()
+            except Exception:
+                logger.exception("Dispatching outbox events failed")
+                dispatched = 0
+            # Keep draining while full batches come back, otherwise wait for new events
+            if dispatched < self.batch_size:
+                await asyncio.sleep(self.interval)
+
+    def stats(self):
+        return {
+            "sinks": [type(sink).__name__ for sink in self.sinks],
+            "batch_size": self.batch_size,
+            "interval_seconds": self.interval,
+            "dispatched": self.dispatched,
+            "failures": self.failures,
+            "dead_lettered": self.dead_lettered,
+        }
+
+
+outbox_dispatcher = OutboxDispatcher(SessionLocal, configured_sinks(), settings.outbox_batch_size,
+                                     settings.outbox_poll_interval_seconds, settings.outbox_max_attempts,
+                                     settings.outbox_retry_backoff_seconds, settings.outbox_retry_max_backoff_seconds)
@@ -0,0 +1,84 @@
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Upper bounds (in milliseconds) of the checkout wait time histogram buckets
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+class PoolWaitStats:
+    """Histogram of how long callers waited to check a connection out."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def observe(self, waited: float):
+        waited_ms = waited * 1000
+        index = next((i for i, bound in enumerate(WAIT_BUCKETS_MS) if waited_ms <= bound), len(WAIT_BUCKETS_MS))
+        with self._lock:
+            self._buckets[index] += 1
+            self.checkouts += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def histogram(self):
+        labels = [f"le_{bound}ms" for bound in WAIT_BUCKETS_MS] + ["gt_%sms" % WAIT_BUCKETS_MS[-1]]
+        with self._lock:
+            return dict(zip(labels, self._buckets))
+
+
+class ObservedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records checkout wait times and pool timeouts."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.wait_stats.record_timeout()
+            raise
+        finally:
+            self.wait_stats.observe(time.perf_counter() - started)
+
+
+# Live statistics for a connection pool
+def pool_status(pool):
+    if not isinstance(pool, QueuePool):
+        return {"pool": type(pool).__name__, "status": pool.status()}
+
+    status = {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": pool._max_overflow,
+        "timeout": pool.timeout(),
+    }
+
+    wait_stats = getattr(pool, "wait_stats", None)
+    if wait_stats is not None:
+        checkouts = wait_stats.checkouts
+        status.update({
+            "checkouts": checkouts,
+            "timeouts": wait_stats.timeouts,
+            "avg_wait_ms": round(wait_stats.total_wait / checkouts * 1000, 3) if checkouts else 0.0,
+            "max_wait_ms": round(wait_stats.max_wait * 1000, 3),
+            "wait_histogram": wait_stats.histogram(),
+        })
+    return status
@@ -1,17 +1,93 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import itertools
+import time
 
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from .pool import ObservedQueuePool
 from ..core.config import settings
 
-engine = create_engine(settings.database_url)
+# Async drivers used for each supported database backend
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+# Callers that wrote recently, mapped to when their read-your-writes window ends
+recent_writes = {}
+MAX_TRACKED_WRITERS = 10000
+
+
+# Swap the sync driver in the database url for its async counterpart
+def get_async_database_url(database_url: str):
+    url = make_url(database_url)
+    async_driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if async_driver is None:
+        return url
+    return url.set(drivername=async_driver)
+
+
+# Pool settings for the engine, in-memory SQLite keeps its single shared connection
+def get_engine_options(url):
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "poolclass": ObservedQueuePool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "pool_use_lifo": settings.db_pool_use_lifo,
+    }
+
+
+def create_engine_for(database_url: str):
+    url = get_async_database_url(database_url)
+    return create_async_engine(url, **get_engine_options(url))
+
+
+engine = create_engine_for(settings.database_url)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+replica_engines = [create_engine_for(replica_url) for replica_url in settings.database_replica_urls]
+replica_cycle = itertools.cycle(replica_engines)
+
+SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+
+# Start the read-your-writes window of a caller
+def mark_recent_write(principal):
+    if not principal or settings.read_your_writes_seconds <= 0:
+        return
+    now = time.monotonic()
+    if len(recent_writes) >= MAX_TRACKED_WRITERS:
+        for expired in [key for key, expires_at in recent_writes.items() if expires_at <= now]:
+            recent_writes.pop(expired, None)
+    recent_writes[principal] = now + settings.read_your_writes_seconds
+
+
+def has_recent_write(principal):
+    expires_at = recent_writes.get(principal)
+    return expires_at is not None and expires_at > time.monotonic()
+
+
+@event.listens_for(Session, "after_commit")
+def receive_after_commit(session):
+    mark_recent_write(session.info.get("principal"))
 
 
 # Get DB Session
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db(request: Request):
+    async with SessionLocal(info={"principal": request.headers.get("authorization")}) as db:
+        yield db
+
+
+# Get a read only DB Session, served by a replica unless the caller wrote recently
+async def get_read_db(request: Request):
+    principal = request.headers.get("authorization")
+    bind = engine if not replica_engines or has_recent_write(principal) else next(replica_cycle)
+    async with SessionLocal(bind=bind, info={"principal": principal}) as db:
         yield db
-    finally:
-        db.close()
@@ -0,0 +1,4 @@
+from sqlalchemy.dialects import postgresql, sqlite
+
+# INSERT constructs supporting ON CONFLICT, per database backend
+UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
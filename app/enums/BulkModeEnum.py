@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class BulkModeEnum(str, Enum):
+    ALL_OR_NOTHING = "all_or_nothing"
+    BEST_EFFORT = "best_effort"
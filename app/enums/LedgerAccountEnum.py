@@ -0,0 +1,9 @@
+from enum import Enum
+
+
+class LedgerAccountEnum(str, Enum):
+    TOP_UPS = "system:top_ups"
+    PAYMENTS = "system:payments"
+    TRANSFERS = "system:transfers"
+    LOYALTY = "system:loyalty"
+    FEES = "system:fees"
@@ -0,0 +1,11 @@
+from enum import Enum
+
+
+class OutboxEventEnum(str, Enum):
+    WALLET_TOPPED_UP = "wallet.topped_up"
+    WALLET_DEBITED = "wallet.debited"
+    WALLET_BLOCKED = "wallet.blocked"
+    WALLET_UNBLOCKED = "wallet.unblocked"
+    TRANSFER_COMPLETED = "transfer.completed"
+    TRANSACTION_REFUNDED = "transaction.refunded"
+    LOYALTY_REDEEMED = "loyalty.redeemed"
@@ -5,4 +5,4 @@ class TransactionEnum(str, Enum):
     CREDIT = "credit"
     BALANCE = "balance"
     DEBIT = "debit"
-    REFUND = "refund"
\ No newline at end of file
+    REFUND = "refund"
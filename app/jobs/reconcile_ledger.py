@@ -0,0 +1,80 @@
+"""Check every wallet balance against the signed sum of its transactions.
+
+Usage:
+    python -m app.jobs.reconcile_ledger [--workers 4] [--chunk-size 1000] [--run-id ID]
+    python -m app.jobs.reconcile_ledger --partitions 8 --partition 3 --run-id ID
+
+Wallets are read in id order, one chunk at a time, so memory stays bounded whatever the size of the
+transaction table. --workers splits the wallet id space across local processes; --partitions/--partition
+runs a single slice, so the same run can be spread over several machines. Mismatches are written to the
+reconciliation_mismatches table under the run id.
+"""
+import argparse
+import asyncio
+import uuid
+
+import app.main  # registers every model on the metadata
+from app.core.config import settings
+from app.core.executor import ProcessExecutor
+from app.crud.crud_reconciliation import reconcile_wallets, wallet_id_ranges
+from app.db.base import Base
+from app.db.session import SessionLocal, engine
+
+
+async def reconcile_range(run_id: str, lower, upper, chunk_size: int):
+    try:
+        async with SessionLocal() as db:
+            return await reconcile_wallets(db, run_id, lower, upper, chunk_size)
+    finally:
+        await engine.dispose()
+
+
+# Entry point of a worker process, with its own event loop and connections
+def reconcile_partition(run_id: str, lower, upper, chunk_size: int):
+    return asyncio.run(reconcile_range(run_id, lower, upper, chunk_size))
+
+
+async def create_report_table():
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    await engine.dispose()
+
+
+async def run_workers(run_id: str, workers: int, chunk_size: int):
+    executor = ProcessExecutor(workers, "reconciliation")
+    try:
+        return await asyncio.gather(*(executor.run(reconcile_partition, run_id, lower, upper, chunk_size)
+                                      for lower, upper in wallet_id_ranges(workers)))
+    finally:
+        executor.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--partitions", type=int, default=1)
+    parser.add_argument("--partition", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=settings.reconciliation_chunk_size)
+    parser.add_argument("--run-id", default=None)
+    args = parser.parse_args()
+    if not 0 <= args.partition < args.partitions:
+        parser.error("--partition must be between 0 and --partitions - 1")
+    if args.workers > 1 and args.partitions > 1:
+        parser.error("--workers splits the whole wallet id space and cannot be combined with --partitions")
+
+    run_id = args.run_id or uuid.uuid4().hex
+    asyncio.run(create_report_table())
+
+    if args.workers > 1:
+        results = asyncio.run(run_workers(run_id, args.workers, args.chunk_size))
+    else:
+        lower, upper = wallet_id_ranges(args.partitions)[args.partition]
+        results = [reconcile_partition(run_id, lower, upper, args.chunk_size)]
+
+    wallets = sum(result["wallets"] for result in results)
+    mismatches = sum(result["mismatches"] for result in results)
+    print(f"run {run_id}: checked {wallets} wallets, found {mismatches} mismatches")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,43 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
-from app.api.v1.endpoints import auth, health, user, wallet, transaction, loyalty
+from app.api.v1.endpoints import auth, health, user, wallet, transaction, loyalty, ledger
+from app.core.config import settings
+from app.core.executor import password_executor
+from app.crud.crud_balance import run_balance_checkpointer
+from app.crud.crud_change_feed import run_transaction_sequencer
+from app.crud.crud_idempotency import run_expired_keys_sweeper
 from app.db.base import Base
-from app.db.session import engine
+from app.db.outbox import outbox_dispatcher
+from app.db.session import engine, SessionLocal
 from app.utilities.custom_openapi import custom_openapi
 
-app = FastAPI()
-Base.metadata.create_all(engine)
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    sweeper = asyncio.create_task(
+        run_expired_keys_sweeper(SessionLocal, settings.idempotency_sweep_interval_seconds))
+    checkpointer = asyncio.create_task(
+        run_balance_checkpointer(SessionLocal, settings.balance_checkpoint_interval_seconds,
+                                 settings.balance_checkpoint_lag_seconds))
+    sequencer = asyncio.create_task(
+        run_transaction_sequencer(SessionLocal, settings.change_feed_sequencer_interval_seconds))
+    dispatcher = asyncio.create_task(outbox_dispatcher.run()) if outbox_dispatcher.sinks else None
+    yield
+    sweeper.cancel()
+    checkpointer.cancel()
+    sequencer.cancel()
+    if dispatcher is not None:
+        dispatcher.cancel()
+    password_executor.shutdown()
+    await engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(health.router)
 app.include_router(auth.router)
@@ -14,6 +45,7 @@ app.include_router(user.router)
 app.include_router(wallet.router)
 app.include_router(transaction.router)
 app.include_router(loyalty.router)
+app.include_router(ledger.router)
 
 # Use the custom OpenAPI schema generator
 app.openapi = lambda: custom_openapi(app)
@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from sqlalchemy import Column, ForeignKey, BigInteger, Integer, DateTime, Index
+from sqlalchemy.dialects.postgresql import UUID as pgUUID
+
+from app.db.base import Base
+
+
+class BalanceCheckpoint(Base):
+    __tablename__ = "balance_checkpoints"
+
+    id = Column(Integer, primary_key=True)
+    wallet_id = Column(pgUUID(as_uuid=True), ForeignKey("wallet.id"), nullable=False)
+    as_of = Column(DateTime, nullable=False)
+    balance = Column(BigInteger, nullable=False)  # minor units, every transaction up to the marker included
+    # Newest transaction included in the balance, empty while the wallet had none
+    last_transaction_created_at = Column(DateTime, nullable=True)
+    last_transaction_id = Column(pgUUID(as_uuid=True), nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
+
+    __table_args__ = (
+        # Nearest checkpoint of a wallet at or before a timestamp
+        Index("ix_balance_checkpoints_wallet_id_as_of", "wallet_id", "as_of"),
+    )
@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index
+
+from app.db.base import Base
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    id = Column(Integer, primary_key=True)
+    scope = Column(String, nullable=False)  # caller and operation the key belongs to
+    key = Column(String, nullable=False)
+    request_hash = Column(String, nullable=False)
+    status_code = Column(Integer, nullable=True)  # empty until the operation finished
+    response = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        Index("ix_idempotency_keys_scope_key", "scope", "key", unique=True),
+    )
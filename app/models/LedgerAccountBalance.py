@@ -0,0 +1,15 @@
+from datetime import datetime
+
+from sqlalchemy import Column, BigInteger, Integer, DateTime, String
+
+from app.db.base import Base
+
+
+class LedgerAccountBalance(Base):
+    __tablename__ = "ledger_account_balances"
+
+    # Busy system accounts keep their running total over several shards, so postings do not queue on one row
+    account = Column(String, primary_key=True)
+    shard = Column(Integer, primary_key=True, default=0)
+    balance = Column(BigInteger, default=0, nullable=False)  # minor units, credits minus debits
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
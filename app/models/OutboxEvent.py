@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index, text
+
+from app.db.base import Base
+
+
+class OutboxEvent(Base):
+    __tablename__ = "outbox_events"
+
+    id = Column(Integer, primary_key=True)  # events are delivered in id order
+    event_type = Column(String, nullable=False)
+    payload = Column(Text, nullable=False)  # json
+    created_at = Column(DateTime, default=datetime.now)
+    dispatched_at = Column(DateTime, nullable=True)  # empty until every sink accepted the event
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text, nullable=True)
+    next_attempt_at = Column(DateTime, nullable=True)  # a failed event waits until then before it is retried
+    dead_lettered_at = Column(DateTime, nullable=True)  # set once the event ran out of attempts, it is not retried
+
+    __table_args__ = (
+        # Only the events still waiting for delivery are indexed, so draining stays fast as the table grows
+        Index("ix_outbox_events_pending", "id",
+              postgresql_where=text("dispatched_at IS NULL AND dead_lettered_at IS NULL"),
+              sqlite_where=text("dispatched_at IS NULL AND dead_lettered_at IS NULL")),
+    )
@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from sqlalchemy import Column, ForeignKey, BigInteger, Integer, Enum, DateTime, String, Index
+from sqlalchemy.dialects.postgresql import UUID as pgUUID
+
+from app.db.base import Base
+
+
+class Posting(Base):
+    __tablename__ = "postings"
+
+    id = Column(Integer, primary_key=True)
+    # Transaction whose journal the posting belongs to, the postings of a journal balance out
+    journal_id = Column(pgUUID(as_uuid=True), ForeignKey("transaction.id"), index=True, nullable=False)
+    account = Column(String, nullable=False)  # wallet:<wallet id> or one of the system accounts
+    direction = Column(Enum("debit", "credit", name="posting_direction"), nullable=False)
+    amount = Column(BigInteger, nullable=False)  # minor units
+    created_at = Column(DateTime, default=datetime.now)
+
+    __table_args__ = (
+        Index("ix_postings_account_created_at", "account", "created_at"),
+    )
@@ -0,0 +1,18 @@
+from datetime import datetime
+
+from sqlalchemy import Column, ForeignKey, BigInteger, Integer, DateTime, String
+from sqlalchemy.dialects.postgresql import UUID as pgUUID
+
+from app.db.base import Base
+
+
+class ReconciliationMismatch(Base):
+    __tablename__ = "reconciliation_mismatches"
+
+    id = Column(Integer, primary_key=True)
+    run_id = Column(String, index=True, nullable=False)
+    wallet_id = Column(pgUUID(as_uuid=True), ForeignKey("wallet.id"), nullable=False)
+    wallet_balance = Column(BigInteger, nullable=False)  # minor units
+    ledger_balance = Column(BigInteger, nullable=False)  # minor units, signed sum of the wallet transactions
+    difference = Column(BigInteger, nullable=False)  # wallet_balance - ledger_balance
+    created_at = Column(DateTime, default=datetime.now)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Float, Enum, DateTime, String, event
+from sqlalchemy import Column, ForeignKey, BigInteger, Enum, DateTime, String, event, Index, text
 from sqlalchemy.dialects.postgresql import UUID as pgUUID
 from datetime import datetime
 import uuid
@@ -9,15 +9,34 @@ from app.db.base import Base
 class Transaction(Base):
     __tablename__ = "transaction"
 
-    id = Column(pgUUID(as_uuid=True), primary_key=True, index=True, default=uuid.uuid4)
-    wallet_id = Column(pgUUID(as_uuid=True), ForeignKey("wallet.id"), index=True, nullable=False)
-    amount = Column(Float, nullable=False)
+    id = Column(pgUUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    wallet_id = Column(pgUUID(as_uuid=True), ForeignKey("wallet.id"), nullable=False)
+    amount = Column(BigInteger, nullable=False)  # minor units
     type = Column(Enum("credit", "balance", "debit", "refund", name="transaction_type"), nullable=False)
     description = Column(String, nullable=True)
     source = Column(String, nullable=True)
+    # Debit a refund is paid back against, and how much of a debit was refunded so far
+    original_transaction_id = Column(pgUUID(as_uuid=True), ForeignKey("transaction.id"), index=True, nullable=True)
+    refunded_amount = Column(BigInteger, default=0, server_default="0", nullable=False)  # minor units
+    # Position in the change feed, numbered by the sequencer once the row is committed
+    sequence = Column(BigInteger, nullable=True)
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
+    __table_args__ = (
+        # Keyset pagination of history pages, newest first. INCLUDE covers the balance and reconciliation sums
+        # only, history pages select whole rows and still read the table
+        Index("ix_transaction_wallet_history", "wallet_id", "created_at", "id", postgresql_include=["type", "amount"]),
+        Index("ix_transaction_created_at_id", "created_at", "id"),
+        # History filtered by type or source
+        Index("ix_transaction_type_created_at_id", "type", "created_at", "id"),
+        Index("ix_transaction_source_created_at_id", "source", "created_at", "id"),
+        Index("ix_transaction_sequence", "sequence", unique=True),
+        # Rows still waiting for a sequence number, in the order they get one
+        Index("ix_transaction_unsequenced", "created_at", "id", postgresql_where=text("sequence IS NULL"),
+              sqlite_where=text("sequence IS NULL")),
+    )
+
 
 @event.listens_for(Transaction, "before_update")
 def receive_before_update(mapper, connection, target):
@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Column, Integer, ForeignKey, Float, DateTime, event, String, Boolean
+from sqlalchemy import Column, Integer, ForeignKey, BigInteger, DateTime, event, String, Boolean, Index, text
 from sqlalchemy.dialects.postgresql import UUID as pgUUID
 
 from app.db.base import Base
@@ -10,15 +10,21 @@ from app.db.base import Base
 class Wallet(Base):
     __tablename__ = "wallet"
 
-    id = Column(pgUUID(as_uuid=True), primary_key=True, index=True, default=uuid.uuid4)
+    id = Column(pgUUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(Integer, ForeignKey("users.id"), unique=True, nullable=False)
     user_phone_number = Column(String, ForeignKey("users.phone_number"), unique=True, index=True, nullable=False)
-    balance = Column(Float, default=0.0)
+    balance = Column(BigInteger, default=0, nullable=False)  # minor units
     is_blocked = Column(Boolean, default=False)
     is_deleted = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
+    __table_args__ = (
+        # Pages of wallets that are not deleted, in id order
+        Index("ix_wallet_active_id", "id", postgresql_where=text("is_deleted = false"),
+              sqlite_where=text("is_deleted = false")),
+    )
+
 
 @event.listens_for(Wallet, 'before_update')
 def receive_before_update(mapper, connection, target):
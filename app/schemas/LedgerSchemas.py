@@ -0,0 +1,23 @@
+from typing import Dict
+
+from pydantic import BaseModel
+
+
+class TrialBalanceResponse(BaseModel):
+    accounts: Dict[str, float]
+    total: float
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "accounts": {
+                    "system:top_ups": -1500.0,
+                    "system:payments": 400.0,
+                    "system:transfers": 0.0,
+                    "system:loyalty": -2.5,
+                    "system:fees": 0.0,
+                    "wallets": 1102.5
+                },
+                "total": 0.0
+            }
+        }
@@ -1,12 +1,26 @@
-from pydantic import BaseModel
+from datetime import datetime
+from decimal import Decimal
+from typing import List, Union
+
+from pydantic import BaseModel, Field
+
+from app.core.config import settings
+from app.enums.BulkModeEnum import BulkModeEnum
+from app.enums.TransactionEnum import TransactionEnum
+
+from app.utilities.money import to_minor_units
 
 
 class TransactionRequest(BaseModel):
-    amount: float
+    amount: Decimal = Field(gt=0, decimal_places=2)
     source: str
     destination: str
     type: str
 
+    @property
+    def amount_minor(self) -> int:
+        return to_minor_units(self.amount)
+
     class Config:
         json_schema_extra = {
             "example": {
@@ -18,6 +32,97 @@ class TransactionRequest(BaseModel):
         }
 
 
+class TransferRequest(BaseModel):
+    amount: Decimal = Field(gt=0, decimal_places=2)
+    source: str = Field(description="Phone number of the wallet to debit")
+    destination: str = Field(description="Phone number of the wallet to credit")
+
+    @property
+    def amount_minor(self) -> int:
+        return to_minor_units(self.amount)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "amount": 100.0,
+                "source": "2348012345678",
+                "destination": "2348087654321"
+            }
+        }
+
+
+class RefundRequest(BaseModel):
+    amount: Decimal = Field(gt=0, decimal_places=2)
+    description: Union[str, None] = None
+
+    @property
+    def amount_minor(self) -> int:
+        return to_minor_units(self.amount)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "amount": 25.0,
+                "description": "Refund of disputed charge"
+            }
+        }
+
+
+class BulkTransactionRequest(BaseModel):
+    transactions: List[TransactionRequest] = Field(min_length=1, max_length=settings.bulk_transaction_max_items)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "transactions": [
+                    {"amount": 100.0, "source": "PAYROLL", "type": "credit", "destination": "2348012345678"},
+                    {"amount": 250.5, "source": "PAYROLL", "type": "credit", "destination": "2348087654321"}
+                ]
+            }
+        }
+
+
+class BulkDebitRequest(BulkTransactionRequest):
+    mode: BulkModeEnum = BulkModeEnum.BEST_EFFORT
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "mode": "all_or_nothing",
+                "transactions": [
+                    {"amount": 100.0, "source": "SETTLEMENT", "type": "debit", "destination": "2348012345678"},
+                    {"amount": 250.5, "source": "SETTLEMENT", "type": "debit", "destination": "2348087654321"}
+                ]
+            }
+        }
+
+
+class BulkTransactionResult(BaseModel):
+    index: int
+    destination: str
+    status_code: int
+    message: str
+
+
+class BulkTransactionResponse(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[BulkTransactionResult]
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "succeeded": 1,
+                "failed": 1,
+                "results": [
+                    {"index": 0, "destination": "2348012345678", "status_code": 200,
+                     "message": "Wallet topped up successfully"},
+                    {"index": 1, "destination": "2348087654321", "status_code": 404, "message": "Wallet not found"}
+                ]
+            }
+        }
+
+
 class TransactionResponse(BaseModel):
     id: str
     wallet_id: str
@@ -25,6 +130,9 @@ class TransactionResponse(BaseModel):
     type: str
     description: str
     source: str
+    original_transaction_id: Union[str, None] = None
+    refunded_amount: float = 0
+    sequence: Union[int, None] = None
     created_at: str
     updated_at: str
 
@@ -37,7 +145,25 @@ class TransactionResponse(BaseModel):
                 "type": "credit",
                 "description": "Top up wallet by System Admin: admin",
                 "source": "wallet",
+                "original_transaction_id": None,
+                "refunded_amount": 0.0,
+                "sequence": 1042,
                 "created_at": "2021-09-01T12:00:00Z",
                 "updated_at": "2021-09-01T12:00:00Z"
             }
         }
+
+
+class TransactionFilters(BaseModel):
+    wallet_id: Union[str, None] = None
+    created_from: Union[datetime, None] = Field(None, description="Only transactions created at or after this time")
+    created_to: Union[datetime, None] = Field(None, description="Only transactions created before this time")
+    type: Union[TransactionEnum, None] = None
+    source: Union[str, None] = None
+    amount_min: Union[Decimal, None] = Field(None, ge=0, decimal_places=2)
+    amount_max: Union[Decimal, None] = Field(None, ge=0, decimal_places=2)
+
+
+class TransactionChangesResponse(BaseModel):
+    changes: List[TransactionResponse]
+    next_after: int = Field(description="Sequence to pass as `after` to read the next batch")
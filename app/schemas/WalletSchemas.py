@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseModel
 from sqlalchemy import true, false
 
@@ -19,7 +21,7 @@ class WalletInfoResponse(BaseModel):
     id: str
     user_id: int
     user_phone_number: str
-    balance: int
+    balance: float
     is_blocked: bool
     is_deleted: bool
     created_at: str
@@ -33,7 +35,7 @@ class WalletInfoResponse(BaseModel):
                 "user_phone_number": "string",
                 "is_blocked": True,
                 "is_deleted": False,
-                "balance": 0,
+                "balance": 0.0,
                 "created_at": "2024-08-23T04:57:22.403Z",
                 "updated_at": "2024-08-23T04:57:22.403Z"
             }
@@ -49,3 +51,20 @@ class WalletUpdateRequest(BaseModel):
                 "is_blocked": True,
             }
         }
+
+
+class WalletBalanceResponse(BaseModel):
+    wallet_id: str
+    at: str
+    balance: float
+    checkpoint_as_of: Optional[str] = None
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "wallet_id": "string",
+                "at": "2024-08-31T23:59:59.999Z",
+                "balance": 0.0,
+                "checkpoint_as_of": "2024-08-31T00:00:00.000Z"
+            }
+        }
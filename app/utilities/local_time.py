@@ -0,0 +1,6 @@
+from datetime import datetime
+
+
+# Rows are stamped with naive local times, so aware datetimes are converted to that before comparing
+def local_time(value: datetime) -> datetime:
+    return value.astimezone().replace(tzinfo=None) if value.tzinfo is not None else value
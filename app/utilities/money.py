@@ -0,0 +1,14 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+# Money is stored as integer minor units (cents), 100 minor units make one unit of currency
+MINOR_UNITS = 100
+
+
+# Convert an amount in currency units to integer minor units
+def to_minor_units(amount) -> int:
+    return int((Decimal(str(amount)) * MINOR_UNITS).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+# Convert integer minor units back to an amount in currency units
+def from_minor_units(value: int) -> float:
+    return value / MINOR_UNITS
@@ -0,0 +1,21 @@
+import base64
+import binascii
+import json
+import uuid
+from datetime import datetime
+
+
+# Encode the (created_at, id) position of a row into an opaque cursor
+def encode_cursor(created_at: datetime, row_id: uuid.UUID) -> str:
+    position = json.dumps({"created_at": created_at.isoformat(), "id": str(row_id)})
+    return base64.urlsafe_b64encode(position.encode()).decode().rstrip("=")
+
+
+# Decode a cursor back into its (created_at, id) position
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(position["created_at"]), uuid.UUID(position["id"])
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
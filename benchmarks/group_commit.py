@@ -0,0 +1,109 @@
+"""Compare commits/sec and requests/sec of concurrent top ups with and without group commit.
+
+Usage:
+    python -m benchmarks.group_commit [--requests 2000] [--concurrency 100] [--database-url URL]
+
+Without --database-url a throwaway SQLite file is used, so every commit pays for a real fsync.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+import app.main  # registers every model on the metadata
+from app.crud.crud_transaction import top_wallet
+from app.db.base import Base
+from app.db.group_commit import GroupCommitter
+from app.db.session import create_engine_for
+from app.models.User import User
+from app.models.Wallet import Wallet
+from app.schemas.TransactionSchemas import TransactionRequest
+
+ADMIN = {"user_id": 0, "username": "benchmark", "role": "SYS_ADMIN"}
+WALLETS = 50
+
+
+async def seed(engine):
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+        await connection.run_sync(Base.metadata.create_all)
+        await connection.execute(insert(User), [
+            {"id": index, "username": f"user-{index}", "email": f"user-{index}@example.com",
+             "phone_number": f"234{index:010d}", "hash_password": "-", "role": "USER", "is_active": True}
+            for index in range(1, WALLETS + 1)
+        ])
+        await connection.execute(insert(Wallet), [
+            {"user_id": index, "user_phone_number": f"234{index:010d}", "balance": 0}
+            for index in range(1, WALLETS + 1)
+        ])
+
+
+def top_up_request(index):
+    return TransactionRequest(amount=1, source="BENCHMARK", type="credit",
+                              destination=f"234{index % WALLETS + 1:010d}")
+
+
+async def run(label, engine, submit, requests, concurrency):
+    commits = []
+
+    def listener(_connection):
+        commits.append(1)
+
+    event.listen(engine.sync_engine, "commit", listener)
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(index):
+        async with limit:
+            return await submit(top_up_request(index))
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*[one(index) for index in range(requests)])
+    elapsed = time.perf_counter() - started
+    event.remove(engine.sync_engine, "commit", listener)
+
+    failed = sum(1 for code, _ in results if code != 200)
+    print(f"{label:<14} {requests:>9} {failed:>7} {elapsed:>9.2f} {requests / elapsed:>13.1f} "
+          f"{len(commits):>8} {len(commits) / elapsed:>12.1f}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--window-ms", type=float, default=2)
+    parser.add_argument("--max-batch", type=int, default=100)
+    parser.add_argument("--database-url")
+    arguments = parser.parse_args()
+
+    database_url = arguments.database_url or f"sqlite:///{tempfile.mkdtemp()}/group_commit.db"
+    engine = create_engine_for(database_url)
+    session_factory = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+    async def per_request(request):
+        async with session_factory() as db:
+            return await top_wallet(db, ADMIN, request)
+
+    committer = GroupCommitter(session_factory, arguments.window_ms / 1000, arguments.max_batch)
+
+    async def grouped(request):
+        return await committer.submit(lambda db: top_wallet(db, ADMIN, request))
+
+    print(f"{'mode':<14} {'requests':>9} {'failed':>7} {'seconds':>9} {'requests/sec':>13} "
+          f"{'commits':>8} {'commits/sec':>12}")
+    for label, submit in (("per-request", per_request), ("group-commit", grouped)):
+        await seed(engine)
+        await run(label, engine, submit, arguments.requests, arguments.concurrency)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,145 @@
+"""Compare query latency of the hot read paths under the old and the tuned index set.
+
+Usage:
+    python -m benchmarks.indexes [--wallets 500] [--transactions 200000] [--repeat 200] [--database-url URL]
+
+Without --database-url a throwaway SQLite file is used. The same data is queried twice, first with the
+single column indexes the tables used to have, then with the composite, covering and partial ones.
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+from sqlalchemy import Index, insert, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+import app.main  # registers every model on the metadata
+from app.crud.crud_balance import balance_at
+from app.db.base import Base
+from app.db.session import create_engine_for
+from app.models.Transaction import Transaction
+from app.models.User import User
+from app.models.Wallet import Wallet
+
+SOURCES = ["TOP UP", "TRANSFER", "LOYALTY_REDEMPTION", "CARD"]
+TYPES = ["credit", "credit", "debit", "debit", "refund"]
+PAGE_SIZE = 20
+
+# Indexes the tables had before they were tuned, the first two being what index=True on the keys created
+OLD_INDEXES = [
+    Index("ix_wallet_id", Wallet.id),
+    Index("ix_transaction_id", Transaction.id),
+    Index("ix_transaction_wallet_id", Transaction.wallet_id),
+    Index("ix_transaction_wallet_id_created_at_id", Transaction.wallet_id, Transaction.created_at, Transaction.id),
+]
+NEW_INDEX_NAMES = ["ix_wallet_active_id", "ix_transaction_wallet_history", "ix_transaction_type_created_at_id",
+                   "ix_transaction_source_created_at_id"]
+NEW_INDEXES = [index for table in (Wallet.__table__, Transaction.__table__) for index in table.indexes
+               if index.name in NEW_INDEX_NAMES]
+
+
+async def seed(engine, wallets, transactions):
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+        await connection.run_sync(Base.metadata.create_all)
+        await connection.execute(insert(User), [
+            {"id": index, "username": f"user-{index}", "email": f"user-{index}@example.com",
+             "phone_number": f"234{index:010d}", "hash_password": "-", "role": "USER", "is_active": True}
+            for index in range(1, wallets + 1)
+        ])
+        # One wallet in ten is deleted, so the partial index has something to leave out
+        wallet_ids = [uuid.uuid4() for _ in range(wallets)]
+        await connection.execute(insert(Wallet), [
+            {"id": wallet_id, "user_id": index, "user_phone_number": f"234{index:010d}", "balance": 0,
+             "is_deleted": index % 10 == 0}
+            for index, wallet_id in enumerate(wallet_ids, start=1)
+        ])
+
+        started = datetime.now() - timedelta(days=365)
+        rows = [
+            {"id": uuid.uuid4(), "wallet_id": random.choice(wallet_ids), "amount": random.randint(100, 100000),
+             "type": random.choice(TYPES), "source": random.choice(SOURCES), "refunded_amount": 0,
+             "created_at": started + timedelta(seconds=index * 60)}
+            for index in range(transactions)
+        ]
+        for offset in range(0, len(rows), 10000):
+            await connection.execute(insert(Transaction), rows[offset:offset + 10000])
+    return wallet_ids
+
+
+async def use_indexes(engine, drop, create):
+    async with engine.begin() as connection:
+        for index in drop:
+            await connection.run_sync(lambda sync_connection: index.drop(sync_connection, checkfirst=True))
+        for index in create:
+            await connection.run_sync(lambda sync_connection: index.create(sync_connection, checkfirst=True))
+        await connection.execute(text("ANALYZE"))
+
+
+def newest_first(query):
+    return query.order_by(Transaction.created_at.desc(), Transaction.id.desc()).limit(PAGE_SIZE)
+
+
+def queries(wallet_ids, wallets):
+    return {
+        "wallet history page": lambda db: db.scalars(newest_first(
+            select(Transaction).where(Transaction.wallet_id == random.choice(wallet_ids)))),
+        "wallet balance": lambda db: balance_at(db, random.choice(wallet_ids), datetime.now()),
+        "type filtered page": lambda db: db.scalars(newest_first(
+            select(Transaction).where(Transaction.type == "refund"))),
+        "source filtered page": lambda db: db.scalars(newest_first(
+            select(Transaction).where(Transaction.source == "LOYALTY_REDEMPTION"))),
+        "active wallets page": lambda db: db.scalars(
+            select(Wallet).where(Wallet.is_deleted == False).order_by(Wallet.id)
+            .offset(random.randrange(max(wallets - 50, 1))).limit(50)),
+    }
+
+
+async def time_queries(session_factory, wallet_ids, wallets, repeat):
+    timings = {}
+    async with session_factory() as db:
+        for label, query in queries(wallet_ids, wallets).items():
+            await query(db)  # warm up
+            started = time.perf_counter()
+            for _ in range(repeat):
+                await query(db)
+            timings[label] = (time.perf_counter() - started) / repeat * 1000
+    return timings
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--wallets", type=int, default=500)
+    parser.add_argument("--transactions", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--database-url")
+    arguments = parser.parse_args()
+
+    database_url = arguments.database_url or f"sqlite:///{tempfile.mkdtemp()}/indexes.db"
+    engine = create_engine_for(database_url)
+    session_factory = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    wallet_ids = await seed(engine, arguments.wallets, arguments.transactions)
+
+    await use_indexes(engine, drop=NEW_INDEXES, create=OLD_INDEXES)
+    before = await time_queries(session_factory, wallet_ids, arguments.wallets, arguments.repeat)
+    await use_indexes(engine, drop=OLD_INDEXES, create=NEW_INDEXES)
+    after = await time_queries(session_factory, wallet_ids, arguments.wallets, arguments.repeat)
+
+    print(f"{'query':<22} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+    for label in before:
+        print(f"{label:<22} {before[label]:>10.3f} {after[label]:>10.3f} {before[label] / after[label]:>7.1f}x")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
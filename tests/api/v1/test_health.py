@@ -1,7 +1,32 @@
 from fastapi import status
 
 
-def test_health_route(test_client):
-    response = test_client.get('/health')
+async def test_health_route(test_client):
+    response = await test_client.get('/health')
     assert response.status_code == status.HTTP_200_OK
     assert response.json() == {"status": "System Healthy"}
+
+
+async def test_executor_health_route(test_client):
+    response = await test_client.get('/health/executor')
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json().get("name") == "blocking"
+    assert "queued" in response.json()
+
+
+async def test_db_pool_health_route(test_client):
+    response = await test_client.get('/health/db-pool')
+    assert response.status_code == status.HTTP_200_OK
+    assert "pool" in response.json()
+
+
+async def test_caches_health_route(test_client):
+    response = await test_client.get('/health/caches')
+    assert response.status_code == status.HTTP_200_OK
+    assert "hits" in response.json().get("principals")
+
+
+async def test_outbox_health_route(test_client):
+    response = await test_client.get('/health/outbox')
+    assert response.status_code == status.HTTP_200_OK
+    assert "dispatched" in response.json()
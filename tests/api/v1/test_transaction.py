@@ -1,145 +1,295 @@
+import csv
+import io
+import json
+
+from sqlalchemy import select
+
+from app.crud.crud_change_feed import assign_sequence_numbers
+from app.models.Loyalty import Loyalty
 from app.models.Transaction import Transaction
 from app.models.User import User
 from app.models.Wallet import Wallet
 from app.schemas.WalletSchemas import WalletCreationRequest
 
 
-def get_token(client, user):
-    client.post('/auth/create', json=user)
-    response = client.post('/auth/token',
-                           data={"username": user.get('email'), "password": user.get('password')})
+async def get_token(client, user):
+    await client.post('/auth/create', json=user)
+    response = await client.post('/auth/token',
+                                 data={"username": user.get('email'), "password": user.get('password')})
 
     return response.json().get('access_token')
 
 
-def create_user(client, user, token):
-    return client.post('/users/add', headers={"Authorization": f"Bearer {token}"}, json=user)
+async def create_user(client, user, token):
+    return await client.post('/users/add', headers={"Authorization": f"Bearer {token}"}, json=user)
 
 
-def test_top_wallet(test_client, db_session, sys_user_payload, normal_user_payload, credit_transaction_payload):
+async def test_top_wallet(test_client, db_session, sys_user_payload, normal_user_payload, credit_transaction_payload):
     # create superuser & authenticate superuser
-    token = get_token(test_client, sys_user_payload)
+    token = await get_token(test_client, sys_user_payload)
 
     # create normal user
-    test_client.post('/users/add', headers={"Authorization": f"Bearer {token}"}, json=normal_user_payload)
+    await test_client.post('/users/add', headers={"Authorization": f"Bearer {token}"}, json=normal_user_payload)
 
     # top up wallet
-    response = test_client.post('/transactions/top-wallet', headers={"Authorization": f"Bearer {token}"},
-                                json=credit_transaction_payload)
+    response = await test_client.post('/transactions/top-wallet', headers={"Authorization": f"Bearer {token}"},
+                                      json=credit_transaction_payload)
 
     assert response.status_code == 201
     assert response.json().get('message') == "Wallet topped up successfully"
 
 
-def test_top_up_by_normal_user(test_client, db_session, sys_user_payload, normal_user_payload, user_payload,
+async def test_bulk_top_up_wallets(test_client, db_session, sys_user_payload, normal_user_payload,
+                                   credit_transaction_payload):
+    # create superuser & authenticate superuser
+    token = await get_token(test_client, sys_user_payload)
+
+    # create normal user
+    await test_client.post('/users/add', headers={"Authorization": f"Bearer {token}"}, json=normal_user_payload)
+
+    # top up wallets
+    response = await test_client.post('/transactions/top-wallet/bulk', headers={"Authorization": f"Bearer {token}"},
+                                      json={"transactions": [credit_transaction_payload, credit_transaction_payload]})
+
+    assert response.status_code == 200
+    assert response.json().get('succeeded') == 2
+    assert response.json().get('failed') == 0
+
+
+async def test_bulk_top_up_rejects_non_positive_amounts(test_client, db_session, sys_user_payload,
+                                                       normal_user_payload, credit_transaction_payload):
+    # create superuser & authenticate superuser
+    token = await get_token(test_client, sys_user_payload)
+
+    # create normal user
+    await test_client.post('/users/add', headers={"Authorization": f"Bearer {token}"}, json=normal_user_payload)
+
+    for amount in (0, -500):
+        response = await test_client.post(
+            '/transactions/top-wallet/bulk', headers={"Authorization": f"Bearer {token}"},
+            json={"transactions": [credit_transaction_payload, {**credit_transaction_payload, "amount": amount}]})
+        assert response.status_code == 422
+
+    wallet = await db_session.scalar(select(Wallet).where(
+        Wallet.user_phone_number == normal_user_payload["phone_number"]))
+    assert wallet.balance == 0
+
+
+async def test_bulk_debit_wallets(test_client, db_session, sys_user_payload, normal_user_payload,
+                                  credit_transaction_payload, debit_transaction_payload):
+    # create superuser & authenticate superuser
+    token = await get_token(test_client, sys_user_payload)
+
+    # create normal user and top up wallet
+    await test_client.post('/users/add', headers={"Authorization": f"Bearer {token}"}, json=normal_user_payload)
+    await test_client.post('/transactions/top-wallet', headers={"Authorization": f"Bearer {token}"},
+                           json=credit_transaction_payload)
+
+    # debit wallets
+    response = await test_client.post('/transactions/debit-wallet/bulk', headers={"Authorization": f"Bearer {token}"},
+                                      json={"mode": "best_effort",
+                                            "transactions": [debit_transaction_payload, debit_transaction_payload]})
+
+    assert response.status_code == 200
+    assert response.json().get('succeeded') == 1
+    assert response.json().get('results')[1].get('message') == "Insufficient balance"
+
+
+async def test_bulk_debit_rejects_non_positive_amounts(test_client, db_session, sys_user_payload, normal_user_payload,
+                                                      credit_transaction_payload, debit_transaction_payload):
+    # create superuser & authenticate superuser
+    token = await get_token(test_client, sys_user_payload)
+
+    # create normal user and top up wallet
+    await test_client.post('/users/add', headers={"Authorization": f"Bearer {token}"}, json=normal_user_payload)
+    await test_client.post('/transactions/top-wallet', headers={"Authorization": f"Bearer {token}"},
+                           json=credit_transaction_payload)
+
+    for amount in (0, -500):
+        response = await test_client.post(
+            '/transactions/debit-wallet/bulk', headers={"Authorization": f"Bearer {token}"},
+            json={"mode": "best_effort", "transactions": [{**debit_transaction_payload, "amount": amount}]})
+        assert response.status_code == 422
+
+    wallet = await db_session.scalar(select(Wallet).where(
+        Wallet.user_phone_number == normal_user_payload["phone_number"]))
+    loyalty = await db_session.scalar(select(Loyalty).where(Loyalty.user_id == wallet.user_id))
+    assert wallet.balance == 10000
+    assert loyalty is None
+
+
+async def test_transfer_between_wallets(test_client, db_session, sys_user_payload, normal_user_payload, user_payload,
+                                        credit_transaction_payload):
+    # create superuser & authenticate superuser
+    token = await get_token(test_client, sys_user_payload)
+
+    # create two users and top up the normal user's wallet
+    await test_client.post('/users/add', headers={"Authorization": f"Bearer {token}"}, json=normal_user_payload)
+    await test_client.post('/users/add', headers={"Authorization": f"Bearer {token}"}, json=user_payload)
+    await test_client.post('/transactions/top-wallet', headers={"Authorization": f"Bearer {token}"},
+                           json=credit_transaction_payload)
+
+    # transfer
+    response = await test_client.post('/transactions/transfer', headers={"Authorization": f"Bearer {token}"},
+                                      json={"amount": 25, "source": normal_user_payload["phone_number"],
+                                            "destination": user_payload["phone_number"]})
+
+    assert response.status_code == 201
+    assert response.json().get('message') == "Transfer completed successfully"
+
+
+async def test_refund_transaction(test_client, db_session, sys_user_payload, normal_user_payload,
+                                  credit_transaction_payload, debit_transaction_payload):
+    # create superuser & authenticate superuser
+    token = await get_token(test_client, sys_user_payload)
+
+    # create normal user, top up and debit wallet
+    await test_client.post('/users/add', headers={"Authorization": f"Bearer {token}"}, json=normal_user_payload)
+    await test_client.post('/transactions/top-wallet', headers={"Authorization": f"Bearer {token}"},
+                           json=credit_transaction_payload)
+    await test_client.post('/transactions/debit-wallet', headers={"Authorization": f"Bearer {token}"},
+                           json=debit_transaction_payload)
+    debit = await db_session.scalar(select(Transaction).where(Transaction.type == "debit"))
+
+    # refund
+    response = await test_client.post(f'/transactions/{debit.id}/refund',
+                                      headers={"Authorization": f"Bearer {token}"}, json={"amount": 30})
+
+    assert response.status_code == 201
+    assert response.json().get('message') == "Transaction refunded successfully"
+
+
+async def test_top_wallet_with_idempotency_key(test_client, db_session, sys_user_payload, normal_user_payload,
+                                               credit_transaction_payload):
+    # create superuser & authenticate superuser
+    token = await get_token(test_client, sys_user_payload)
+
+    # create normal user
+    await test_client.post('/users/add', headers={"Authorization": f"Bearer {token}"}, json=normal_user_payload)
+
+    # the retried top up is answered from the stored response
+    headers = {"Authorization": f"Bearer {token}", "Idempotency-Key": "payroll-2026-10-001"}
+    first = await test_client.post('/transactions/top-wallet', headers=headers, json=credit_transaction_payload)
+    retry = await test_client.post('/transactions/top-wallet', headers=headers, json=credit_transaction_payload)
+
+    wallet = await db_session.scalar(
+        select(Wallet).where(Wallet.user_phone_number == normal_user_payload["phone_number"]))
+    await db_session.refresh(wallet)
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.json() == first.json()
+    assert wallet.balance == credit_transaction_payload["amount"] * 100
+
+
+async def test_top_up_by_normal_user(test_client, db_session, sys_user_payload, normal_user_payload, user_payload,
                                credit_transaction_payload):
     # create superuser & authenticate superuser
-    token_super_user = get_token(test_client, sys_user_payload)
+    token_super_user = await get_token(test_client, sys_user_payload)
 
     # create & authenticate normal user
-    token_normal_user = get_token(test_client, normal_user_payload)
+    token_normal_user = await get_token(test_client, normal_user_payload)
 
     # create user
-    test_client.post('/users/add', headers={"Authorization": f"Bearer {token_super_user}"}, json=user_payload)
+    await test_client.post('/users/add', headers={"Authorization": f"Bearer {token_super_user}"}, json=user_payload)
 
     # top wallet by normal user
-    response = test_client.post('/transactions/top-wallet', headers={"Authorization": f"Bearer {token_normal_user}"},
-                                json=credit_transaction_payload)
+    response = await test_client.post('/transactions/top-wallet', headers={"Authorization": f"Bearer {token_normal_user}"},
+                                      json=credit_transaction_payload)
 
     assert response.status_code == 403
     assert response.json().get('detail') == "Unauthorized access"
 
 
-def test_top_up_non_existing_wallet(test_client, db_session, sys_user_payload, credit_transaction_payload):
+async def test_top_up_non_existing_wallet(test_client, db_session, sys_user_payload, credit_transaction_payload):
     # create superuser & authenticate superuser
-    token = get_token(test_client, sys_user_payload)
+    token = await get_token(test_client, sys_user_payload)
 
     # top wallet by normal user
-    response = test_client.post('/transactions/top-wallet', headers={"Authorization": f"Bearer {token}"},
-                                json=credit_transaction_payload)
+    response = await test_client.post('/transactions/top-wallet', headers={"Authorization": f"Bearer {token}"},
+                                      json=credit_transaction_payload)
 
     assert response.status_code == 404
     assert response.json().get('detail') == "Wallet not found"
 
 
-def test_debit_wallet_by_normal_user(test_client, db_session, sys_user_payload, normal_user_payload, user_payload,
+async def test_debit_wallet_by_normal_user(test_client, db_session, sys_user_payload, normal_user_payload, user_payload,
                                      debit_transaction_payload):
     # create superuser & authenticate superuser
-    token_super_user = get_token(test_client, sys_user_payload)
+    token_super_user = await get_token(test_client, sys_user_payload)
 
     # create & authenticate normal user
-    token_normal_user = get_token(test_client, normal_user_payload)
+    token_normal_user = await get_token(test_client, normal_user_payload)
 
     # create user
-    test_client.post('/users/add', headers={"Authorization": f"Bearer {token_super_user}"}, json=user_payload)
+    await test_client.post('/users/add', headers={"Authorization": f"Bearer {token_super_user}"}, json=user_payload)
 
     # top wallet by normal user
-    response = test_client.post('/transactions/debit-wallet', headers={"Authorization": f"Bearer {token_normal_user}"},
-                                json=debit_transaction_payload)
+    response = await test_client.post('/transactions/debit-wallet', headers={"Authorization": f"Bearer {token_normal_user}"},
+                                      json=debit_transaction_payload)
 
     assert response.status_code == 403
     assert response.json().get('detail') == "Unauthorized access"
 
 
-def test_debit_non_existing_wallet(test_client, db_session, sys_user_payload, debit_transaction_payload):
+async def test_debit_non_existing_wallet(test_client, db_session, sys_user_payload, debit_transaction_payload):
     # create superuser & authenticate superuser
-    token = get_token(test_client, sys_user_payload)
+    token = await get_token(test_client, sys_user_payload)
 
     # top wallet by normal user
-    response = test_client.post('/transactions/debit-wallet', headers={"Authorization": f"Bearer {token}"},
-                                json=debit_transaction_payload)
+    response = await test_client.post('/transactions/debit-wallet', headers={"Authorization": f"Bearer {token}"},
+                                      json=debit_transaction_payload)
 
     assert response.status_code == 404
     assert response.json().get('detail') == "Wallet not found"
 
 
-def test_debiting_blocked_wallet(test_client, db_session, sys_user_payload, normal_user_payload,
+async def test_debiting_blocked_wallet(test_client, db_session, sys_user_payload, normal_user_payload,
                                  debit_transaction_payload,
                                  credit_transaction_payload, block_wallet_request):
     # create superuser & authenticate superuser
-    token_super_user = get_token(test_client, sys_user_payload)
+    token_super_user = await get_token(test_client, sys_user_payload)
 
     # create normal user
-    test_client.post('/users/add', headers={"Authorization": f"Bearer {token_super_user}"}, json=normal_user_payload, )
+    await test_client.post('/users/add', headers={"Authorization": f"Bearer {token_super_user}"}, json=normal_user_payload, )
 
     # top wallet by normal user
-    test_client.post('/transactions/top-wallet', headers={"Authorization": f"Bearer {token_super_user}"},
-                     json=credit_transaction_payload)
+    await test_client.post('/transactions/top-wallet', headers={"Authorization": f"Bearer {token_super_user}"},
+                           json=credit_transaction_payload)
 
     # block normal user wallet
-    wallet = db_session.query(Wallet).filter(
-        Wallet.user_phone_number == normal_user_payload.get('phone_number')).first()
+    wallet = (await db_session.scalar(select(Wallet).where(
+        Wallet.user_phone_number == normal_user_payload.get('phone_number'))))
     wallet.is_blocked = True
-    db_session.commit()
+    await db_session.commit()
 
-    response = test_client.post('/transactions/debit-wallet', headers={"Authorization": f"Bearer {token_super_user}"},
-                                json=debit_transaction_payload)
+    response = await test_client.post('/transactions/debit-wallet', headers={"Authorization": f"Bearer {token_super_user}"},
+                                      json=debit_transaction_payload)
 
     assert response.status_code == 403
     assert response.json().get('detail') == "Wallet is blocked"
 
 
-def test_debiting_insufficient_fund_wallet(test_client, db_session, sys_user_payload, normal_user_payload,
+async def test_debiting_insufficient_fund_wallet(test_client, db_session, sys_user_payload, normal_user_payload,
                                            debit_transaction_payload):
     # create superuser & authenticate superuser
-    token_super_user = get_token(test_client, sys_user_payload)
+    token_super_user = await get_token(test_client, sys_user_payload)
 
     # create normal user
-    test_client.post('/users/add', headers={"Authorization": f"Bearer {token_super_user}"}, json=normal_user_payload, )
+    await test_client.post('/users/add', headers={"Authorization": f"Bearer {token_super_user}"}, json=normal_user_payload, )
 
-    response = test_client.post('/transactions/debit-wallet', headers={"Authorization": f"Bearer {token_super_user}"},
-                                json=debit_transaction_payload)
+    response = await test_client.post('/transactions/debit-wallet', headers={"Authorization": f"Bearer {token_super_user}"},
+                                      json=debit_transaction_payload)
 
     assert response.status_code == 400
     assert response.json().get('detail') == "Insufficient balance"
 
 
-def test_debiting_self_wallet(test_client, db_session, sys_user_payload, sys_user_debit_transaction_payload):
+async def test_debiting_self_wallet(test_client, db_session, sys_user_payload, sys_user_debit_transaction_payload):
     # create superuser & authenticate superuser
-    token_super_user = get_token(test_client, sys_user_payload)
+    token_super_user = await get_token(test_client, sys_user_payload)
 
     # Get superuser id
-    system_user_id = db_session.query(User).filter(User.email == sys_user_payload.get('email')).first().id
+    system_user_id = (await db_session.scalar(select(User).where(User.email == sys_user_payload.get('email')))).id
 
     wallet_creation_request = {
         "user_id": system_user_id,
@@ -147,85 +297,230 @@ def test_debiting_self_wallet(test_client, db_session, sys_user_payload, sys_use
     }
 
     # create wallet for superuser
-    test_client.post('/wallets', headers={"Authorization": f"Bearer {token_super_user}"},
-                     json=wallet_creation_request, )
+    await test_client.post('/wallets', headers={"Authorization": f"Bearer {token_super_user}"},
+                           json=wallet_creation_request, )
 
-    response = test_client.post('/transactions/debit-wallet', headers={"Authorization": f"Bearer {token_super_user}"},
-                                json=sys_user_debit_transaction_payload)
+    response = await test_client.post('/transactions/debit-wallet', headers={"Authorization": f"Bearer {token_super_user}"},
+                                      json=sys_user_debit_transaction_payload)
 
     assert response.status_code == 400
     assert response.json().get('detail') == "You cannot debit your own wallet"
 
 
-def test_debiting_wallet(test_client, db_session, sys_user_payload, normal_user_payload, debit_transaction_payload,
+async def test_debiting_wallet(test_client, db_session, sys_user_payload, normal_user_payload, debit_transaction_payload,
                          credit_transaction_payload):
     # create superuser & authenticate superuser
-    token_super_user = get_token(test_client, sys_user_payload)
+    token_super_user = await get_token(test_client, sys_user_payload)
 
     # create normal user
-    test_client.post('/users/add', headers={"Authorization": f"Bearer {token_super_user}"}, json=normal_user_payload, )
+    await test_client.post('/users/add', headers={"Authorization": f"Bearer {token_super_user}"}, json=normal_user_payload, )
 
     # top wallet by normal user
-    test_client.post('/transactions/top-wallet', headers={"Authorization": f"Bearer {token_super_user}"},
-                     json=credit_transaction_payload)
+    await test_client.post('/transactions/top-wallet', headers={"Authorization": f"Bearer {token_super_user}"},
+                           json=credit_transaction_payload)
 
     # debit wallet
-    response = test_client.post('/transactions/debit-wallet', headers={"Authorization": f"Bearer {token_super_user}"},
-                                json=debit_transaction_payload)
+    response = await test_client.post('/transactions/debit-wallet', headers={"Authorization": f"Bearer {token_super_user}"},
+                                      json=debit_transaction_payload)
 
     assert response.status_code == 201
     assert response.json().get('message') == "Wallet debited successfully"
 
 
-def test_get_all_transaction_history(test_client, db_session, sys_user_payload, normal_user_payload,
+async def test_get_all_transaction_history(test_client, db_session, sys_user_payload, normal_user_payload,
                                      debit_transaction_payload,
                                      credit_transaction_payload):
     # create superuser & authenticate superuser
-    token_super_user = get_token(test_client, sys_user_payload)
+    token_super_user = await get_token(test_client, sys_user_payload)
 
     # create normal user
-    test_client.post('/users/add', headers={"Authorization": f"Bearer {token_super_user}"}, json=normal_user_payload, )
+    await test_client.post('/users/add', headers={"Authorization": f"Bearer {token_super_user}"}, json=normal_user_payload, )
 
     # top wallet by normal user
-    test_client.post('/transactions/top-wallet', headers={"Authorization": f"Bearer {token_super_user}"},
-                     json=credit_transaction_payload)
+    await test_client.post('/transactions/top-wallet', headers={"Authorization": f"Bearer {token_super_user}"},
+                           json=credit_transaction_payload)
 
     # debit wallet
-    test_client.post('/transactions/debit-wallet', headers={"Authorization": f"Bearer {token_super_user}"},
-                     json=debit_transaction_payload)
+    await test_client.post('/transactions/debit-wallet', headers={"Authorization": f"Bearer {token_super_user}"},
+                           json=debit_transaction_payload)
 
-    response = test_client.get('/transactions', headers={"Authorization": f"Bearer {token_super_user}"})
+    response = await test_client.get('/transactions', headers={"Authorization": f"Bearer {token_super_user}"})
 
     assert response.status_code == 200
     assert len(response.json()) == 2
 
 
-def test_get_user_transactions_history(test_client, db_session, sys_user_payload, normal_user_payload,
+async def test_get_user_transactions_history(test_client, db_session, sys_user_payload, normal_user_payload,
                                        debit_transaction_payload,
                                        credit_transaction_payload):
     # create superuser & authenticate superuser
-    token_super_user = get_token(test_client, sys_user_payload)
+    token_super_user = await get_token(test_client, sys_user_payload)
 
     # create normal user
-    test_client.post('/users/add', headers={"Authorization": f"Bearer {token_super_user}"}, json=normal_user_payload, )
+    await test_client.post('/users/add', headers={"Authorization": f"Bearer {token_super_user}"}, json=normal_user_payload, )
 
     # top wallet by normal user
-    test_client.post('/transactions/top-wallet', headers={"Authorization": f"Bearer {token_super_user}"},
-                     json=credit_transaction_payload)
+    await test_client.post('/transactions/top-wallet', headers={"Authorization": f"Bearer {token_super_user}"},
+                           json=credit_transaction_payload)
 
     # debit wallet
-    test_client.post('/transactions/debit-wallet', headers={"Authorization": f"Bearer {token_super_user}"},
-                     json=debit_transaction_payload)
+    await test_client.post('/transactions/debit-wallet', headers={"Authorization": f"Bearer {token_super_user}"},
+                           json=debit_transaction_payload)
 
     # Get normal user id
     normal_user_id = (
-        db_session.query(User).filter(User.phone_number == normal_user_payload.get('phone_number')).first()
+        (await db_session.scalar(select(User).where(User.phone_number == normal_user_payload.get('phone_number'))))
         .id)
 
-    response = test_client.get(f'/transactions/user/{normal_user_id}',
-                               headers={"Authorization": f"Bearer {token_super_user}"})
+    response = await test_client.get(f'/transactions/user/{normal_user_id}',
+                                     headers={"Authorization": f"Bearer {token_super_user}"})
 
     assert response.status_code == 200
     assert len(response.json()) == 2
 
 
+
+
+async def test_transaction_history_next_cursor(test_client, db_session, sys_user_payload, normal_user_payload,
+                                               credit_transaction_payload):
+    # create superuser & authenticate superuser
+    token_super_user = await get_token(test_client, sys_user_payload)
+
+    # create normal user
+    await test_client.post('/users/add', headers={"Authorization": f"Bearer {token_super_user}"},
+                           json=normal_user_payload)
+
+    # top wallet three times
+    for _ in range(3):
+        await test_client.post('/transactions/top-wallet', headers={"Authorization": f"Bearer {token_super_user}"},
+                               json=credit_transaction_payload)
+
+    first_page = await test_client.get('/transactions/', params={"limit": 2},
+                                       headers={"Authorization": f"Bearer {token_super_user}"})
+    next_cursor = first_page.headers.get("X-Next-Cursor")
+    second_page = await test_client.get('/transactions/', params={"limit": 2, "cursor": next_cursor},
+                                        headers={"Authorization": f"Bearer {token_super_user}"})
+
+    assert len(first_page.json()) == 2
+    assert next_cursor is not None
+    assert len(second_page.json()) == 1
+    assert "X-Next-Cursor" not in second_page.headers
+
+
+async def test_transaction_history_rejects_non_positive_limit(test_client, db_session, sys_user_payload,
+                                                              normal_user_payload, credit_transaction_payload):
+    # create superuser & authenticate superuser
+    token_super_user = await get_token(test_client, sys_user_payload)
+
+    # create normal user and top up wallet
+    await test_client.post('/users/add', headers={"Authorization": f"Bearer {token_super_user}"},
+                           json=normal_user_payload)
+    await test_client.post('/transactions/top-wallet', headers={"Authorization": f"Bearer {token_super_user}"},
+                           json=credit_transaction_payload)
+
+    for limit in (0, -1):
+        response = await test_client.get('/transactions/', params={"limit": limit},
+                                         headers={"Authorization": f"Bearer {token_super_user}"})
+        assert response.status_code == 422
+
+
+async def test_filtering_transaction_history(test_client, db_session, sys_user_payload, normal_user_payload,
+                                             credit_transaction_payload, debit_transaction_payload):
+    # create superuser & authenticate superuser
+    token_super_user = await get_token(test_client, sys_user_payload)
+
+    # create normal user
+    await test_client.post('/users/add', headers={"Authorization": f"Bearer {token_super_user}"},
+                           json=normal_user_payload)
+
+    # top up and debit wallet
+    await test_client.post('/transactions/top-wallet', headers={"Authorization": f"Bearer {token_super_user}"},
+                           json=credit_transaction_payload)
+    await test_client.post('/transactions/debit-wallet', headers={"Authorization": f"Bearer {token_super_user}"},
+                           json={**debit_transaction_payload, "amount": 30})
+
+    normal_user_id = (
+        (await db_session.scalar(select(User).where(User.phone_number == normal_user_payload.get('phone_number'))))
+        .id)
+
+    debits = await test_client.get('/transactions/', params={"type": "debit"},
+                                   headers={"Authorization": f"Bearer {token_super_user}"})
+    large = await test_client.get(f'/transactions/user/{normal_user_id}', params={"amount_min": 50},
+                                  headers={"Authorization": f"Bearer {token_super_user}"})
+    exported = await test_client.get('/transactions/export', params={"source": "SERVICE", "amount_max": 30},
+                                     headers={"Authorization": f"Bearer {token_super_user}"})
+    inverted = await test_client.get('/transactions/', params={"amount_min": 50, "amount_max": 10},
+                                     headers={"Authorization": f"Bearer {token_super_user}"})
+    too_precise = [await test_client.get(path, params={parameter: "1.234"},
+                                         headers={"Authorization": f"Bearer {token_super_user}"})
+                   for path in ('/transactions/', f'/transactions/user/{normal_user_id}', '/transactions/export')
+                   for parameter in ("amount_min", "amount_max")]
+
+    assert debits.status_code == 200
+    assert [transaction["type"] for transaction in debits.json()] == ["debit"]
+    assert large.status_code == 200
+    assert [transaction["amount"] for transaction in large.json()] == [100.0]
+    assert [json.loads(line)["amount"] for line in exported.text.splitlines()] == [30.0]
+    assert inverted.status_code == 400
+    assert [response.status_code for response in too_precise] == [422] * 6
+
+
+async def test_export_transactions(test_client, db_session, sys_user_payload, normal_user_payload,
+                                   credit_transaction_payload, debit_transaction_payload):
+    # create superuser & authenticate superuser
+    token_super_user = await get_token(test_client, sys_user_payload)
+
+    # create normal user
+    await test_client.post('/users/add', headers={"Authorization": f"Bearer {token_super_user}"},
+                           json=normal_user_payload)
+
+    # top up and debit wallet
+    await test_client.post('/transactions/top-wallet', headers={"Authorization": f"Bearer {token_super_user}"},
+                           json=credit_transaction_payload)
+    await test_client.post('/transactions/debit-wallet', headers={"Authorization": f"Bearer {token_super_user}"},
+                           json=debit_transaction_payload)
+
+    ndjson = await test_client.get('/transactions/export', headers={"Authorization": f"Bearer {token_super_user}"})
+    debits = await test_client.get('/transactions/export', params={"format": "csv", "type": "debit"},
+                                   headers={"Authorization": f"Bearer {token_super_user}"})
+
+    rows = [json.loads(line) for line in ndjson.text.splitlines()]
+    csv_rows = list(csv.DictReader(io.StringIO(debits.text)))
+
+    assert ndjson.status_code == 200
+    assert ndjson.headers["content-type"] == "application/x-ndjson"
+    assert [row["type"] for row in rows] == ["credit", "debit"]
+    assert debits.status_code == 200
+    assert [row["type"] for row in csv_rows] == ["debit"]
+    assert float(csv_rows[0]["amount"]) == debit_transaction_payload["amount"]
+
+
+async def test_export_transactions_by_normal_user(test_client, db_session, normal_user_payload):
+    # create & authenticate normal user
+    token_normal_user = await get_token(test_client, normal_user_payload)
+
+    response = await test_client.get('/transactions/export', headers={"Authorization": f"Bearer {token_normal_user}"})
+
+    assert response.status_code == 403
+    assert response.json().get('detail') == "Unauthorized access"
+
+
+async def test_transaction_changes(test_client, db_session, sys_user_payload, normal_user_payload,
+                                   credit_transaction_payload):
+    # create superuser & authenticate superuser
+    token = await get_token(test_client, sys_user_payload)
+
+    # create normal user
+    await test_client.post('/users/add', headers={"Authorization": f"Bearer {token}"}, json=normal_user_payload)
+
+    for _ in range(3):
+        await test_client.post('/transactions/top-wallet', headers={"Authorization": f"Bearer {token}"},
+                               json=credit_transaction_payload)
+    await assign_sequence_numbers(db_session)
+
+    response = await test_client.get('/transactions/changes?after=1&limit=5',
+                                     headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 200
+    assert [change["sequence"] for change in response.json()["changes"]] == [2, 3]
+    assert response.json()["next_after"] == 3
@@ -1,81 +1,83 @@
 import uuid
 
+from sqlalchemy import select
+
 from app.models.User import User
 from app.models.Wallet import Wallet
 
 
-def get_token(client, user):
-    client.post('/auth/create', json=user)
-    response = client.post('/auth/token',
-                           data={"username": user.get('email'), "password": user.get('password')})
+async def get_token(client, user):
+    await client.post('/auth/create', json=user)
+    response = await client.post('/auth/token',
+                                 data={"username": user.get('email'), "password": user.get('password')})
 
     return response.json().get('access_token')
 
 
-def create_user(client, user, token):
-    return client.post('/users/add', headers={"Authorization": f"Bearer {token}"}, json=user)
+async def create_user(client, user, token):
+    return await client.post('/users/add', headers={"Authorization": f"Bearer {token}"}, json=user)
 
 
-def test_create_wallet(test_client, user_payload, normal_user_payload, db_session):
-    token = get_token(test_client, user_payload)
+async def test_create_wallet(test_client, user_payload, normal_user_payload, db_session):
+    token = await get_token(test_client, user_payload)
 
-    test_client.post('/auth/create', json=normal_user_payload)
+    await test_client.post('/auth/create', json=normal_user_payload)
 
-    normal_user_id = db_session.query(User).filter(User.email == normal_user_payload.get("email")).first().id
+    normal_user_id = (await db_session.scalar(select(User).where(User.email == normal_user_payload.get("email")))).id
 
     wallet_payload = {
         "user_id": normal_user_id,
         "user_phone_number": normal_user_payload.get('phone_number')
     }
 
-    response = test_client.post('/wallets/', headers={"Authorization": f"Bearer {token}"}, json=wallet_payload)
+    response = await test_client.post('/wallets/', headers={"Authorization": f"Bearer {token}"}, json=wallet_payload)
 
     assert response.status_code == 201
     assert response.json().get("message") == "Wallet created successfully"
 
 
-def test_creating_wallet_for_existing_user(test_client, user_payload, normal_user_payload, db_session):
-    token = get_token(test_client, user_payload)
+async def test_creating_wallet_for_existing_user(test_client, user_payload, normal_user_payload, db_session):
+    token = await get_token(test_client, user_payload)
 
-    create_user(test_client, normal_user_payload, token)
+    await create_user(test_client, normal_user_payload, token)
 
-    normal_user_id = db_session.query(User).filter(User.email == normal_user_payload.get("email")).first().id
+    normal_user_id = (await db_session.scalar(select(User).where(User.email == normal_user_payload.get("email")))).id
 
     wallet_payload = {
         "user_id": normal_user_id,
         "user_phone_number": normal_user_payload.get('phone_number')
     }
 
-    test_client.post('/wallets/', headers={"Authorization": f"Bearer {token}"}, json=wallet_payload)
+    await test_client.post('/wallets/', headers={"Authorization": f"Bearer {token}"}, json=wallet_payload)
 
-    response = test_client.post('/wallets/', headers={"Authorization": f"Bearer {token}"}, json=wallet_payload)
+    response = await test_client.post('/wallets/', headers={"Authorization": f"Bearer {token}"}, json=wallet_payload)
 
     assert response.status_code == 400
     assert response.json().get("detail") == "User already has a wallet"
 
 
-def test_creating_wallet_by_normal_user(test_client, normal_user_payload):
-    token = get_token(test_client, normal_user_payload)
+async def test_creating_wallet_by_normal_user(test_client, normal_user_payload):
+    token = await get_token(test_client, normal_user_payload)
 
     wallet_payload = {
         "user_id": 10,
         "user_phone_number": "2349069943111"
     }
 
-    response = test_client.post('/wallets/', headers={"Authorization": f"Bearer {token}"}, json=wallet_payload)
+    response = await test_client.post('/wallets/', headers={"Authorization": f"Bearer {token}"}, json=wallet_payload)
 
     assert response.status_code == 401
     assert response.json().get("detail") == "You do not have enough permission to create wallets"
 
 
-def test_read_all_wallets(test_client, user_payload, normal_user_payload, admin_user_payload, db_session):
-    token = get_token(test_client, user_payload)
+async def test_read_all_wallets(test_client, user_payload, normal_user_payload, admin_user_payload, db_session):
+    token = await get_token(test_client, user_payload)
 
-    create_user(test_client, normal_user_payload, token)
-    create_user(test_client, admin_user_payload, token)
+    await create_user(test_client, normal_user_payload, token)
+    await create_user(test_client, admin_user_payload, token)
 
-    normal_user_id = db_session.query(User).filter(User.email == normal_user_payload.get("email")).first().id
-    admin_user_payload = db_session.query(User).filter(User.email == admin_user_payload.get("email")).first().id
+    normal_user_id = (await db_session.scalar(select(User).where(User.email == normal_user_payload.get("email")))).id
+    admin_user_payload = (await db_session.scalar(select(User).where(User.email == admin_user_payload.get("email")))).id
 
     normal_user_wallet_payload = {
         "user_id": normal_user_id,
@@ -87,100 +89,129 @@ def test_read_all_wallets(test_client, user_payload, normal_user_payload, admin_
         "user_phone_number": normal_user_payload.get('phone_number')
     }
 
-    test_client.post('/wallets/', headers={"Authorization": f"Bearer {token}"}, json=normal_user_wallet_payload)
-    test_client.post('/wallets/', headers={"Authorization": f"Bearer {token}"}, json=admin_wallet_payload)
+    await test_client.post('/wallets/', headers={"Authorization": f"Bearer {token}"}, json=normal_user_wallet_payload)
+    await test_client.post('/wallets/', headers={"Authorization": f"Bearer {token}"}, json=admin_wallet_payload)
 
-    response = test_client.get('/wallets/', headers={"Authorization": f"Bearer {token}"})
+    response = await test_client.get('/wallets/', headers={"Authorization": f"Bearer {token}"})
 
     assert response.status_code == 200
     assert len(response.json()) == 2
 
 
-def test_reading_all_wallet_by_normal_user(test_client, normal_user_payload):
-    token = get_token(test_client, normal_user_payload)
+async def test_reading_all_wallet_by_normal_user(test_client, normal_user_payload):
+    token = await get_token(test_client, normal_user_payload)
 
-    response = test_client.get('/wallets/', headers={"Authorization": f"Bearer {token}"})
+    response = await test_client.get('/wallets/', headers={"Authorization": f"Bearer {token}"})
 
     assert response.status_code == 401
     assert response.json().get("detail") == "You do not have enough permission to read wallets"
 
 
-def test_reading_wallet_details(test_client, user_payload, normal_user_payload, db_session):
-    token = get_token(test_client, user_payload)
+async def test_reading_wallet_details(test_client, user_payload, normal_user_payload, db_session):
+    token = await get_token(test_client, user_payload)
 
-    create_user(test_client, normal_user_payload, token)
+    await create_user(test_client, normal_user_payload, token)
 
-    normal_user_id = db_session.query(User).filter(User.email == normal_user_payload.get("email")).first().id
+    normal_user_id = (await db_session.scalar(select(User).where(User.email == normal_user_payload.get("email")))).id
 
     wallet_payload = {
         "user_id": normal_user_id,
         "user_phone_number": normal_user_payload.get('phone_number')
     }
 
-    test_client.post('/wallets/', headers={"Authorization": f"Bearer {token}"}, json=wallet_payload)
+    await test_client.post('/wallets/', headers={"Authorization": f"Bearer {token}"}, json=wallet_payload)
 
-    response = test_client.get(f'/wallets/details?user_id={normal_user_id}',
-                               headers={"Authorization": f"Bearer {token}"})
+    response = await test_client.get(f'/wallets/details?user_id={normal_user_id}',
+                                     headers={"Authorization": f"Bearer {token}"})
 
     assert response.status_code == 200
     assert response.json().get("user_id") == normal_user_id
     assert response.json().get("user_phone_number") == normal_user_payload.get('phone_number')
 
 
-def test_reading_wallet_details_by_normal_user(test_client, normal_user_payload, db_session, user_payload):
-    token = get_token(test_client, normal_user_payload)
+async def test_reading_wallet_details_by_normal_user(test_client, normal_user_payload, db_session, user_payload):
+    token = await get_token(test_client, normal_user_payload)
 
-    test_client.post('/auth/create', json=user_payload)
+    await test_client.post('/auth/create', json=user_payload)
 
-    user_id = db_session.query(User).filter(User.email == user_payload.get("email")).first().id
+    user_id = (await db_session.scalar(select(User).where(User.email == user_payload.get("email")))).id
 
-    response = test_client.get(f'/wallets/details?user_id={user_id}', headers={"Authorization": f"Bearer {token}"})
+    response = await test_client.get(f'/wallets/details?user_id={user_id}', headers={"Authorization": f"Bearer {token}"})
 
     assert response.status_code == 401
     assert response.json().get("detail") == "You do not have enough permission to read wallets"
 
 
-def test_reading_wallet_details_with_no_query_params(test_client, user_payload):
-    token = get_token(test_client, user_payload)
+async def test_reading_wallet_details_with_no_query_params(test_client, user_payload):
+    token = await get_token(test_client, user_payload)
 
-    response = test_client.get('/wallets/details', headers={"Authorization": f"Bearer {token}"})
+    response = await test_client.get('/wallets/details', headers={"Authorization": f"Bearer {token}"})
 
     assert response.status_code == 400
     assert response.json().get("detail") == "At least one of user_id, wallet_id, or phone_number must be provided"
 
 
-def test_reading_wallet_details_with_invalid_user_id(test_client, user_payload):
-    token = get_token(test_client, user_payload)
+async def test_reading_wallet_details_with_invalid_user_id(test_client, user_payload):
+    token = await get_token(test_client, user_payload)
 
-    response = test_client.get('/wallets/details?user_id=100', headers={"Authorization": f"Bearer {token}"})
+    response = await test_client.get('/wallets/details?user_id=100', headers={"Authorization": f"Bearer {token}"})
 
     assert response.status_code == 404
     assert response.json().get("detail") == "User wallet details not found"
 
 
-def test_reading_blocked_wallet_details(test_client, user_payload, normal_user_payload, db_session):
-    token = get_token(test_client, user_payload)
+async def test_reading_blocked_wallet_details(test_client, user_payload, normal_user_payload, db_session):
+    token = await get_token(test_client, user_payload)
 
-    create_user(test_client, normal_user_payload, token)
+    await create_user(test_client, normal_user_payload, token)
 
-    normal_user_id = db_session.query(User).filter(User.email == normal_user_payload.get("email")).first().id
+    normal_user_id = (await db_session.scalar(select(User).where(User.email == normal_user_payload.get("email")))).id
 
     wallet_payload = {
         "user_id": normal_user_id,
         "user_phone_number": normal_user_payload.get('phone_number'),
     }
 
-    test_client.post('/wallets/', headers={"Authorization": f"Bearer {token}"}, json=wallet_payload)
+    await test_client.post('/wallets/', headers={"Authorization": f"Bearer {token}"}, json=wallet_payload)
 
-    wallet = db_session.query(Wallet).filter(Wallet.user_id == normal_user_id).first()
+    wallet = await db_session.scalar(select(Wallet).where(Wallet.user_id == normal_user_id))
     wallet.is_blocked = True
-    db_session.commit()
+    await db_session.commit()
 
 
-    response = test_client.get(f'/wallets/details?user_id={normal_user_id}',
-                               headers={"Authorization": f"Bearer {token}"})
+    response = await test_client.get(f'/wallets/details?user_id={normal_user_id}',
+                                     headers={"Authorization": f"Bearer {token}"})
 
     assert response.status_code == 403
     assert response.json().get("detail") == "Wallet is blocked. Please contact support for more information"
 
 
+
+
+async def test_reading_wallet_balance_at_timestamp(test_client, user_payload, normal_user_payload, db_session):
+    token = await get_token(test_client, user_payload)
+
+    await create_user(test_client, normal_user_payload, token)
+
+    normal_user_id = (await db_session.scalar(select(User).where(User.email == normal_user_payload.get("email")))).id
+
+    wallet_payload = {
+        "user_id": normal_user_id,
+        "user_phone_number": normal_user_payload.get('phone_number')
+    }
+
+    await test_client.post('/wallets/', headers={"Authorization": f"Bearer {token}"}, json=wallet_payload)
+    await test_client.post('/transactions/top-wallet', headers={"Authorization": f"Bearer {token}"},
+                           json={"amount": 25.5, "destination": normal_user_payload.get('phone_number'),
+                                 "source": "TOP UP", "type": "credit"})
+
+    wallet = await db_session.scalar(select(Wallet).where(Wallet.user_id == normal_user_id))
+
+    response = await test_client.get(f'/wallets/{wallet.id}/balance', headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.json().get("balance") == 25.5
+
+    response = await test_client.get(f'/wallets/{wallet.id}/balance?at=2000-01-01T00:00:00Z',
+                                     headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.json().get("balance") == 0.0
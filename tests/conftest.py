@@ -1,60 +1,92 @@
 import pytest
 from fastapi import HTTPException
-from sqlalchemy import create_engine, StaticPool
-from sqlalchemy.orm import sessionmaker
-from fastapi.testclient import TestClient
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import StaticPool, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 
-from app.crud.crud_auth import get_current_user
+from app.crud.crud_auth import get_current_user, principal_cache
+from app.crud.crud_idempotency import idempotency_cache
+from app.crud.crud_wallet import wallet_cache
 from app.db.base import Base
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
 from app.main import app
+from app.models.Wallet import Wallet
+from app.schemas.TransactionSchemas import TransactionRequest
 
 # SQL DB for testing
-SQL_LITE_DB_URL = 'sqlite:///./testdb.db'
+SQL_LITE_DB_URL = 'sqlite+aiosqlite://'
 
 # Create a SQLAlchemy engine
-engine = create_engine(SQL_LITE_DB_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+engine = create_async_engine(SQL_LITE_DB_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+
+
+# Let SQLAlchemy emit BEGIN itself, so rolling back to a savepoint works with pysqlite
+@event.listens_for(engine.sync_engine, "connect")
+def do_connect(dbapi_connection, _connection_record):
+    dbapi_connection.isolation_level = None
+
+
+@event.listens_for(engine.sync_engine, "begin")
+def do_begin(connection):
+    connection.exec_driver_sql("BEGIN")
+
 
 # Create a session maker to manage sessions
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+TestingSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False, bind=engine)
 
-# Create tables in the database
-Base.metadata.create_all(bind=engine)
+
+@pytest.fixture(scope="session", autouse=True)
+async def create_tables():
+    """Create tables in the database"""
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    yield
+    await engine.dispose()
+
+
+@pytest.fixture(scope="function", autouse=True)
+def clear_caches():
+    """Forget entries cached by a previous test, whose rows were rolled back."""
+    yield
+    principal_cache.clear()
+    wallet_cache.clear()
+    idempotency_cache.clear()
 
 
 @pytest.fixture(scope="function")
-def db_session():
+async def db_session():
     """Create a new database session with a rollback at the end of the test."""
-    connection = engine.connect()
-    transaction = connection.begin()
-    session = TestingSessionLocal(bind=connection)
+    connection = await engine.connect()
+    transaction = await connection.begin()
+    session = TestingSessionLocal(bind=connection, join_transaction_mode="create_savepoint")
     yield session
-    session.close()
-    transaction.rollback()
-    connection.close()
+    await session.close()
+    await transaction.rollback()
+    await connection.close()
 
 
 @pytest.fixture(scope="function")
-def test_client(db_session):
+async def test_client(db_session):
     """Create a test client that uses the override_get_db fixture to return a session."""
 
-    def override_get_db():
-        try:
-            yield db_session
-        finally:
-            db_session.close()
+    async def override_get_db():
+        yield db_session
 
     app.dependency_overrides[get_db] = override_get_db
-    with TestClient(app) as test_client:
+    app.dependency_overrides[get_read_db] = override_get_db
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test",
+                           follow_redirects=True) as test_client:
         yield test_client
+    app.dependency_overrides.pop(get_db, None)
+    app.dependency_overrides.pop(get_read_db, None)
 
 
 @pytest.fixture(scope="function")
 def override_get_current_user(db_session):
     """Override the get_current_user dependency to use the db_session."""
 
-    def _override_get_current_user(token: str, db=db_session):
-        status_code, user = get_current_user(token, db)
+    async def _override_get_current_user(token: str, db=db_session):
+        status_code, user = await get_current_user(token, db)
         if status_code != 200:
             raise HTTPException(status_code=status_code, detail=user["message"])
         return user
@@ -240,3 +272,30 @@ def debit_transaction_payload_for_loyalty():
           "type": "debit"
     }
 
+
+
+@pytest.fixture()
+def sys_admin():
+    """Principal of a system admin, as get_current_user returns it"""
+    return {"user_id": 1, "username": "John Doe", "role": "SYS_ADMIN"}
+
+
+@pytest.fixture()
+def make_wallet():
+    """Factory adding an empty wallet, without creating its user"""
+    async def make(db, user_id=2, phone_number="2349069943113"):
+        wallet = Wallet(user_id=user_id, user_phone_number=phone_number, balance=0)
+        db.add(wallet)
+        await db.commit()
+        return wallet
+
+    return make
+
+
+@pytest.fixture()
+def transaction_request():
+    """Factory building a transaction request"""
+    def make(amount, transaction_type="credit", destination="2349069943113", source="TOP UP"):
+        return TransactionRequest(amount=amount, destination=destination, source=source, type=transaction_type)
+
+    return make
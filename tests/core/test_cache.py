@@ -0,0 +1,35 @@
+import time
+
+from app.core.cache import TTLCache
+
+
+# Test the least recently used entry is evicted once the cache is full
+def test_evicts_least_recently_used():
+    cache = TTLCache(2, 60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+# Test entries are not served once their time to live has passed
+def test_expired_entry_is_a_miss():
+    cache = TTLCache(2, 0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+    assert cache.stats() == {"size": 0, "max_size": 2, "ttl_seconds": 0.01, "hits": 0, "misses": 1}
+
+
+# Test invalidated entries are looked up again
+def test_invalidate():
+    cache = TTLCache(2, 60)
+    cache.set("a", 1)
+    cache.invalidate("a")
+
+    assert cache.get("a") is None
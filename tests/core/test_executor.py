@@ -0,0 +1,53 @@
+import asyncio
+import os
+import threading
+
+from app.core.executor import BoundedExecutor, ProcessExecutor
+
+
+# Test blocking calls run off the event loop thread
+async def test_run_blocking_call():
+    executor = BoundedExecutor(2, "test")
+
+    result = await executor.run(lambda value: (value, threading.current_thread().name), 10)
+
+    assert result[0] == 10
+    assert result[1].startswith("test")
+    assert executor.stats()["completed"] == 1
+
+
+# Test queued calls are reported while the pool is saturated
+async def test_saturated_pool_stats():
+    executor = BoundedExecutor(1, "test")
+    release = threading.Event()
+
+    first = asyncio.ensure_future(executor.run(release.wait))
+    second = asyncio.ensure_future(executor.run(lambda: "done"))
+    await asyncio.sleep(0.05)
+
+    stats = executor.stats()
+    assert stats["running"] == 1
+    assert stats["queued"] == 1
+
+    release.set()
+    assert await second == "done"
+    await first
+
+    stats = executor.stats()
+    assert stats["queued"] == 0
+    assert stats["completed"] == 2
+    assert stats["max_wait_ms"] > 0
+
+
+# Test calls run in a separate worker process
+async def test_process_executor():
+    executor = ProcessExecutor(1, "test")
+
+    try:
+        assert await executor.run(os.getpid) != os.getpid()
+        assert executor.stats()["completed"] == 1
+        assert executor.stats()["pending"] == 0
+    finally:
+        executor.shutdown()
+
+    assert executor.stats()["started"] is False
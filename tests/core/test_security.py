@@ -1,6 +1,9 @@
 import pytest
 
-from app.core.security import encrypt_password, validate_password, create_token, SECRET_KEY, decode_token
+from passlib.context import CryptContext
+
+from app.core.security import encrypt_password, validate_password, create_token, SECRET_KEY, decode_token, \
+    verify_and_update_password
 
 
 # Test password encryption
@@ -12,6 +15,18 @@ def test_password_encryption():
     assert validate_password("wrong_password", hash_password) is False
 
 
+# Test hashes made with fewer rounds are upgraded
+def test_verify_and_update_password():
+    weak_hash = CryptContext(schemes="bcrypt", bcrypt__rounds=4).hash("test_password")
+
+    valid, new_hash = verify_and_update_password("test_password", weak_hash)
+
+    assert valid is True
+    assert validate_password("test_password", new_hash) is True
+    assert verify_and_update_password("test_password", new_hash) == (True, None)
+    assert verify_and_update_password("wrong_password", weak_hash) == (False, None)
+
+
 # Test token creation and decoding
 def test_token_creation_and_decoding():
     user = "test user"
@@ -1,73 +1,104 @@
 from fastapi.security import OAuth2PasswordRequestForm
+from passlib.context import CryptContext
+from sqlalchemy import select
 
 from app.core.security import create_token
-from app.crud.crud_auth import create_new_user, authenticate_user, get_current_user
+from app.crud.crud_auth import create_new_user, authenticate_user, get_current_user, principal_cache
 from app.models.User import User
 from app.schemas.UserSchemas import UserRequest
 
 
-def creating_user(user_data, db):
+async def creating_user(user_data, db):
     user_request = UserRequest(**user_data)
-    return create_new_user(user_request, db)
+    return await create_new_user(user_request, db)
 
 
-def test_creating_new_user(db_session, user_payload):
-    status_code, response = creating_user(user_payload, db_session)
+async def test_creating_new_user(db_session, user_payload):
+    status_code, response = await creating_user(user_payload, db_session)
 
     assert status_code == 201
     assert response["message"] == "User created successfully"
 
-    new_user = db_session.query(User).filter(User.username == user_payload["username"]).first()
+    new_user = await db_session.scalar(select(User).where(User.username == user_payload["username"]))
     assert new_user is not None
     assert new_user.username == user_payload["username"]
 
 
-def test_authenticate_user(db_session, user_payload):
-    creating_user(user_payload, db_session)
+async def test_authenticate_user(db_session, user_payload):
+    await creating_user(user_payload, db_session)
 
     form_data = OAuth2PasswordRequestForm(username=user_payload.get('email'), password=user_payload.get('password'))
-    status_code, response = authenticate_user(form_data, db_session)
+    status_code, response = await authenticate_user(form_data, db_session)
 
     assert status_code == 200
     assert "access_token" in response
 
 
-def test_unknown_authenticate_user(db_session, user_payload):
-    creating_user(user_payload, db_session)
+async def test_authenticate_user_rehashes_outdated_hash(db_session, user_payload):
+    await creating_user(user_payload, db_session)
+    user = await db_session.scalar(select(User).where(User.email == user_payload.get('email')))
+    user.hash_password = CryptContext(schemes="bcrypt", bcrypt__rounds=4).hash(user_payload.get('password'))
+    await db_session.commit()
+
+    form_data = OAuth2PasswordRequestForm(username=user_payload.get('email'), password=user_payload.get('password'))
+    status_code, _ = await authenticate_user(form_data, db_session)
+
+    assert status_code == 200
+    assert not user.hash_password.startswith("$2b$04$")
+
+
+async def test_unknown_authenticate_user(db_session, user_payload):
+    await creating_user(user_payload, db_session)
 
     form_data = OAuth2PasswordRequestForm(username="wrong_username", password="wrong_password")
-    status_code, response = authenticate_user(form_data, db_session)
+    status_code, response = await authenticate_user(form_data, db_session)
 
     assert status_code == 404
     assert response.get("message") == "User not found"
 
 
-def test_wrong_authenticate_user(db_session, user_payload):
-    creating_user(user_payload, db_session)
+async def test_wrong_authenticate_user(db_session, user_payload):
+    await creating_user(user_payload, db_session)
 
     form_data = OAuth2PasswordRequestForm(username=user_payload.get("email"), password="wrong_password")
-    status_code, response = authenticate_user(form_data, db_session)
+    status_code, response = await authenticate_user(form_data, db_session)
 
     assert status_code == 401
     assert response.get("message") == "Wrong Credentials"
 
 
-def test_get_current_user(db_session, user_payload):
-    creating_user(user_payload, db_session)
+async def test_get_current_user(db_session, user_payload):
+    await creating_user(user_payload, db_session)
 
     form_data = OAuth2PasswordRequestForm(username=user_payload.get("email"), password=user_payload.get("password"))
-    _, response = authenticate_user(form_data, db_session)
+    _, response = await authenticate_user(form_data, db_session)
 
     token = response.get("access_token")
-    status_code, response = get_current_user(token, db_session)
+    status_code, response = await get_current_user(token, db_session)
 
     assert status_code == 200
     assert user_payload.get("username") == response.get("username")
 
 
-def test_get_current_user_invalid_token(db_session, user_payload):
+async def test_get_current_user_invalid_token(db_session, user_payload):
     invalid_token = create_token("test@mail.com", 1, "ADMIN")
-    status_code, response = get_current_user(invalid_token, db_session)
+    status_code, response = await get_current_user(invalid_token, db_session)
 
     assert status_code != 200
     assert response.get("message") == "Invalid token"
+
+
+async def test_get_current_user_is_cached(db_session, user_payload):
+    await creating_user(user_payload, db_session)
+
+    form_data = OAuth2PasswordRequestForm(username=user_payload.get("email"), password=user_payload.get("password"))
+    _, response = await authenticate_user(form_data, db_session)
+    token = response.get("access_token")
+
+    await get_current_user(token, db_session)
+    status_code, response = await get_current_user(token, db_session)
+
+    assert status_code == 200
+    assert response.get("username") == user_payload.get("username")
+    assert principal_cache.stats()["misses"] == 1
+    assert principal_cache.stats()["hits"] == 1
@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from app.crud.crud_balance import balance_at, create_balance_checkpoints, read_wallet_balance_at
+from app.models.BalanceCheckpoint import BalanceCheckpoint
+from app.models.Transaction import Transaction
+
+start = datetime(2026, 1, 1)
+
+
+async def wallet_with_transactions(db, make_wallet, user_id=2):
+    wallet = await make_wallet(db, user_id=user_id, phone_number=f"23490699431{user_id:02d}")
+
+    # One transaction a day: +100, -30, +50 refund, +100, -30, ...
+    moves = [("credit", 10000), ("debit", 3000), ("refund", 5000)] * 3
+    for day, (transaction_type, amount) in enumerate(moves):
+        db.add(Transaction(wallet_id=wallet.id, amount=amount, type=transaction_type,
+                           created_at=start + timedelta(days=day)))
+    await db.commit()
+    return wallet
+
+
+async def test_balance_at_without_checkpoint(db_session, make_wallet):
+    wallet = await wallet_with_transactions(db_session, make_wallet)
+
+    assert await balance_at(db_session, wallet.id, start - timedelta(days=1)) == (0, None)
+    assert (await balance_at(db_session, wallet.id, start + timedelta(days=1)))[0] == 7000
+    assert (await balance_at(db_session, wallet.id, start + timedelta(days=30)))[0] == 36000
+
+
+async def test_checkpoints_give_the_same_balances(db_session, make_wallet):
+    wallet = await wallet_with_transactions(db_session, make_wallet)
+    expected = [(await balance_at(db_session, wallet.id, start + timedelta(days=day, hours=12)))[0]
+                for day in range(10)]
+
+    assert await create_balance_checkpoints(db_session, start + timedelta(days=4), batch_size=1) == 1
+    checkpointed = [await balance_at(db_session, wallet.id, start + timedelta(days=day, hours=12))
+                    for day in range(10)]
+
+    assert [balance for balance, _ in checkpointed] == expected
+    assert checkpointed[3][1] is None
+    assert checkpointed[4][1].balance == 19000
+    assert checkpointed[4][1].as_of == start + timedelta(days=4)
+
+
+async def test_unchanged_wallets_are_not_checkpointed_again(db_session, make_wallet):
+    await wallet_with_transactions(db_session, make_wallet, user_id=2)
+    await wallet_with_transactions(db_session, make_wallet, user_id=3)
+
+    assert await create_balance_checkpoints(db_session, start + timedelta(days=30), batch_size=1) == 2
+    assert await create_balance_checkpoints(db_session, start + timedelta(days=31)) == 0
+    assert await db_session.scalar(select(func.count()).select_from(BalanceCheckpoint)) == 2
+
+
+async def test_only_changed_wallets_are_checkpointed(db_session, make_wallet):
+    first = await wallet_with_transactions(db_session, make_wallet, user_id=2)
+    second = await wallet_with_transactions(db_session, make_wallet, user_id=3)
+    await make_wallet(db_session, user_id=4, phone_number="2349069943104")
+
+    # The empty wallet gets no checkpoint
+    assert await create_balance_checkpoints(db_session, start + timedelta(days=4), batch_size=2) == 2
+
+    db_session.add(Transaction(wallet_id=second.id, amount=700, type="credit", created_at=start + timedelta(days=20)))
+    await db_session.commit()
+    assert await create_balance_checkpoints(db_session, start + timedelta(days=30), batch_size=2) == 2
+
+    assert await create_balance_checkpoints(db_session, start + timedelta(days=30), batch_size=2) == 0
+    checkpoints = (await db_session.scalars(
+        select(BalanceCheckpoint).where(BalanceCheckpoint.as_of == start + timedelta(days=30))
+        .order_by(BalanceCheckpoint.balance))).all()
+    assert [(checkpoint.wallet_id, checkpoint.balance) for checkpoint in checkpoints] == [
+        (first.id, 36000), (second.id, 36700)]
+    assert checkpoints[1].last_transaction_created_at == start + timedelta(days=20)
+
+
+async def test_read_wallet_balance_at(db_session, sys_admin, make_wallet):
+    wallet = await wallet_with_transactions(db_session, make_wallet)
+
+    status_code, response = await read_wallet_balance_at(db_session, sys_admin, str(wallet.id),
+                                                             start + timedelta(days=2))
+    assert status_code == 200
+    assert response["balance"] == 120.0
+    assert response["checkpoint_as_of"] is None
+
+    owner = {"user_id": 2, "username": "Paul Doe", "role": "USER"}
+    assert (await read_wallet_balance_at(db_session, owner, str(wallet.id)))[0] == 200
+
+    other_user = {"user_id": 5, "username": "Jack Doe", "role": "USER"}
+    assert (await read_wallet_balance_at(db_session, other_user, str(wallet.id)))[0] == 401
+    assert (await read_wallet_balance_at(db_session, sys_admin, "not-a-wallet"))[0] == 404
@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from app.crud.crud_change_feed import assign_sequence_numbers, transaction_changes
+from app.models.Transaction import Transaction
+
+start = datetime(2026, 1, 1)
+
+
+async def add_transactions(db, wallet_id, count, first_day=0):
+    db.add_all([Transaction(wallet_id=wallet_id, amount=100 * (index + 1), type="credit",
+                            created_at=start + timedelta(days=first_day + index)) for index in range(count)])
+    await db.commit()
+
+
+async def test_sequence_numbers_follow_creation_order(db_session, make_wallet):
+    wallet = await make_wallet(db_session)
+    await add_transactions(db_session, wallet.id, 5)
+
+    assert await assign_sequence_numbers(db_session, batch_size=3) == 3
+    assert await assign_sequence_numbers(db_session, batch_size=3) == 2
+    assert await assign_sequence_numbers(db_session) == 0
+
+    transactions = (await db_session.scalars(select(Transaction).order_by(Transaction.created_at))).all()
+    assert [transaction.sequence for transaction in transactions] == [1, 2, 3, 4, 5]
+
+
+async def test_numbering_keeps_updated_at(db_session, make_wallet):
+    wallet = await make_wallet(db_session)
+    db_session.add(Transaction(wallet_id=wallet.id, amount=100, type="credit", created_at=start, updated_at=start))
+    await db_session.commit()
+
+    await assign_sequence_numbers(db_session)
+
+    assert (await db_session.execute(select(Transaction.sequence, Transaction.updated_at))).all() == [(1, start)]
+
+
+async def test_changes_continue_after_a_sequence(db_session, sys_admin, make_wallet):
+    wallet = await make_wallet(db_session)
+    await add_transactions(db_session, wallet.id, 3)
+    await assign_sequence_numbers(db_session)
+
+    status_code, response = await transaction_changes(db_session, sys_admin, after=0, limit=2)
+    assert status_code == 200
+    assert [change["sequence"] for change in response["changes"]] == [1, 2]
+    assert response["next_after"] == 2
+
+    # Rows committed later are numbered after everything already read
+    await add_transactions(db_session, wallet.id, 2, first_day=-5)
+    await assign_sequence_numbers(db_session)
+
+    _, response = await transaction_changes(db_session, sys_admin, after=response["next_after"], limit=10)
+    assert [change["sequence"] for change in response["changes"]] == [3, 4, 5]
+    assert [change["amount"] for change in response["changes"]] == [3.0, 1.0, 2.0]
+
+    _, response = await transaction_changes(db_session, sys_admin, after=5)
+    assert response == {"changes": [], "next_after": 5}
+
+
+async def test_changes_require_an_admin(db_session):
+    assert (await transaction_changes(db_session, {"user_id": 2, "role": "USER"}))[0] == 403
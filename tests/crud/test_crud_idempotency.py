@@ -0,0 +1,96 @@
+import json
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import func, select
+
+from app.crud import crud_idempotency
+from app.crud.crud_idempotency import run_idempotently, sweep_expired_keys, idempotency_cache, idempotent_mutation
+from app.crud.crud_transaction import top_wallet
+from app.models.IdempotencyKey import IdempotencyKey
+from app.models.Transaction import Transaction
+from app.schemas.TransactionSchemas import TransactionRequest
+
+
+def counting_operation(outcome):
+    calls = []
+
+    async def operation(db):
+        calls.append(1)
+        return outcome
+
+    return operation, calls
+
+
+async def test_replay_returns_stored_response(db_session, sys_admin, credit_transaction_payload):
+    request = TransactionRequest(**credit_transaction_payload)
+    operation, calls = counting_operation((200, {"message": "Wallet topped up successfully"}))
+
+    first = await run_idempotently(db_session, sys_admin, "key-1", "top-wallet", request, operation)
+    idempotency_cache.clear()
+    replayed = await run_idempotently(db_session, sys_admin, "key-1", "top-wallet", request, operation)
+    cached = await run_idempotently(db_session, sys_admin, "key-1", "top-wallet", request, operation)
+
+    assert first == replayed == cached == (200, {"message": "Wallet topped up successfully"})
+    assert len(calls) == 1
+
+
+async def test_key_reused_with_different_request(db_session, sys_admin, credit_transaction_payload):
+    operation, calls = counting_operation((200, {"message": "Wallet topped up successfully"}))
+    await run_idempotently(db_session, sys_admin, "key-1", "top-wallet",
+                           TransactionRequest(**credit_transaction_payload), operation)
+
+    other_request = TransactionRequest(**{**credit_transaction_payload, "amount": 5})
+    status_code, response = await run_idempotently(db_session, sys_admin, "key-1", "top-wallet", other_request,
+                                                   operation)
+
+    assert status_code == 422
+    assert response["message"] == "Idempotency-Key was already used with a different request"
+    assert len(calls) == 1
+
+
+async def test_rejected_operation_releases_key(db_session, sys_admin, credit_transaction_payload):
+    request = TransactionRequest(**credit_transaction_payload)
+    rejected, _ = counting_operation((404, {"message": "Wallet not found"}))
+    succeeded, calls = counting_operation((200, {"message": "Wallet topped up successfully"}))
+
+    assert await run_idempotently(db_session, sys_admin, "key-1", "top-wallet", request, rejected) == (
+        404, {"message": "Wallet not found"})
+    assert (await run_idempotently(db_session, sys_admin, "key-1", "top-wallet", request, succeeded))[0] == 200
+    assert len(calls) == 1
+
+
+async def test_mutation_rolls_back_when_response_is_not_stored(db_session, monkeypatch, sys_admin, make_wallet,
+                                                               credit_transaction_payload):
+    wallet = await make_wallet(db_session, phone_number=credit_transaction_payload["destination"])
+
+    def failing_dumps(value):
+        raise RuntimeError("storing the response failed")
+
+    monkeypatch.setattr(crud_idempotency, "json", SimpleNamespace(dumps=failing_dumps, loads=json.loads))
+    request = TransactionRequest(**credit_transaction_payload)
+    with pytest.raises(RuntimeError):
+        await idempotent_mutation(db_session, sys_admin, "key-1", "top-wallet", request, top_wallet)
+    await db_session.rollback()
+
+    await db_session.refresh(wallet)
+    assert wallet.balance == 0
+    assert await db_session.scalar(select(func.count()).select_from(Transaction)) == 0
+    assert await db_session.scalar(select(func.count()).select_from(IdempotencyKey)) == 0
+
+
+async def test_sweep_expired_keys(db_session):
+    now = datetime.now()
+    db_session.add_all([
+        IdempotencyKey(scope="1:top-wallet", key=f"expired-{index}", request_hash="hash",
+                       expires_at=now - timedelta(minutes=1))
+        for index in range(5)
+    ] + [IdempotencyKey(scope="1:top-wallet", key="live", request_hash="hash", expires_at=now + timedelta(hours=1))])
+    await db_session.commit()
+
+    swept = await sweep_expired_keys(db_session, batch_size=2)
+    keys = (await db_session.scalars(select(IdempotencyKey.key))).all()
+
+    assert swept == 5
+    assert keys == ["live"]
@@ -0,0 +1,97 @@
+from sqlalchemy import func, select
+
+from app.crud.crud_ledger import trial_balance, wallet_account
+from app.crud.crud_loyalty import redeem_loyalty_points
+from app.crud.crud_transaction import top_wallet, debit_wallet, top_wallets, transfer_funds, refund_transaction
+from app.models.LedgerAccountBalance import LedgerAccountBalance
+from app.models.Loyalty import Loyalty
+from app.models.Posting import Posting
+from app.models.Transaction import Transaction
+from app.schemas.LoyaltySchemas import LoyaltyRedeemSchema
+from app.schemas.TransactionSchemas import TransferRequest, RefundRequest
+
+
+async def create_wallets(db, make_wallet):
+    return [await make_wallet(db), await make_wallet(db, user_id=3, phone_number="2349069943114")]
+
+
+async def account_balance(db, account):
+    return await db.scalar(select(func.sum(LedgerAccountBalance.balance))
+                           .where(LedgerAccountBalance.account == account))
+
+
+async def test_every_transaction_is_posted_twice(db_session, sys_admin, make_wallet, transaction_request):
+    first, second = await create_wallets(db_session, make_wallet)
+
+    await top_wallet(db_session, sys_admin, transaction_request(100, destination=first.user_phone_number))
+    await debit_wallet(db_session, sys_admin, transaction_request(30, "debit", destination=first.user_phone_number))
+    await top_wallets(db_session, sys_admin, [transaction_request(10, destination=second.user_phone_number)] * 3)
+    await transfer_funds(db_session, sys_admin, TransferRequest(source=first.user_phone_number,
+                                                                destination=second.user_phone_number, amount=20))
+    debit = await db_session.scalar(select(Transaction).where(Transaction.type == "debit")
+                                    .order_by(Transaction.created_at).limit(1))
+    await refund_transaction(db_session, sys_admin, str(debit.id), RefundRequest(amount=5))
+
+    transactions = await db_session.scalar(select(func.count()).select_from(Transaction))
+    postings = (await db_session.scalars(select(Posting))).all()
+    assert len(postings) == 2 * transactions
+    assert {posting.journal_id for posting in postings} == set(
+        (await db_session.scalars(select(Transaction.id))).all())
+
+    # Each journal balances out
+    for journal_id in {posting.journal_id for posting in postings}:
+        lines = [posting for posting in postings if posting.journal_id == journal_id]
+        assert sorted(posting.direction for posting in lines) == ["credit", "debit"]
+        assert lines[0].amount == lines[1].amount
+
+
+async def test_running_totals_match_wallets(db_session, sys_admin, make_wallet, transaction_request):
+    first, second = await create_wallets(db_session, make_wallet)
+
+    await top_wallet(db_session, sys_admin, transaction_request(100, destination=first.user_phone_number))
+    await debit_wallet(db_session, sys_admin, transaction_request(30, "debit", destination=first.user_phone_number))
+    await transfer_funds(db_session, sys_admin, TransferRequest(source=first.user_phone_number,
+                                                                destination=second.user_phone_number, amount=20.5))
+
+    for wallet in (first, second):
+        await db_session.refresh(wallet)
+        assert await account_balance(db_session, wallet_account(wallet.id)) == wallet.balance
+
+    assert await account_balance(db_session, "system:top_ups") == -10000
+    assert await account_balance(db_session, "system:payments") == 3000
+    assert await account_balance(db_session, "system:transfers") == 0
+
+
+async def test_loyalty_redemption_is_posted(db_session, sys_admin, make_wallet):
+    wallet, _ = await create_wallets(db_session, make_wallet)
+    db_session.add(Loyalty(user_id=wallet.user_id, points=500))
+    await db_session.commit()
+
+    status_code, _ = await redeem_loyalty_points(db_session, sys_admin,
+                                                 LoyaltyRedeemSchema(user_id=wallet.user_id, quantity=200))
+
+    assert status_code == 201
+    assert await account_balance(db_session, "system:loyalty") == -200
+    assert await account_balance(db_session, wallet_account(wallet.id)) == 200
+
+
+async def test_trial_balance(db_session, sys_admin, make_wallet, transaction_request):
+    first, second = await create_wallets(db_session, make_wallet)
+    await top_wallets(db_session, sys_admin, [transaction_request(40, destination=first.user_phone_number),
+                                              transaction_request(60, destination=second.user_phone_number)])
+    await debit_wallet(db_session, sys_admin, transaction_request(15, "debit", destination=second.user_phone_number))
+
+    status_code, response = await trial_balance(db_session, sys_admin)
+
+    assert status_code == 200
+    assert response["accounts"] == {
+        "system:top_ups": -100.0,
+        "system:payments": 15.0,
+        "system:transfers": 0.0,
+        "system:loyalty": 0.0,
+        "system:fees": 0.0,
+        "wallets": 85.0,
+    }
+    assert response["total"] == 0.0
+
+    assert (await trial_balance(db_session, {"user_id": 2, "role": "USER"}))[0] == 403
@@ -0,0 +1,52 @@
+import json
+
+from sqlalchemy import select
+
+from app.crud.crud_loyalty import redeem_loyalty_points
+from app.crud.crud_transaction import top_wallet, debit_wallet, debit_wallets
+from app.crud.crud_wallet import block_user_wallet
+from app.enums.BulkModeEnum import BulkModeEnum
+from app.models.Loyalty import Loyalty
+from app.models.OutboxEvent import OutboxEvent
+from app.schemas.LoyaltySchemas import LoyaltyRedeemSchema
+from app.schemas.WalletSchemas import WalletUpdateRequest
+
+
+async def outbox(db):
+    events = (await db.scalars(select(OutboxEvent).order_by(OutboxEvent.id))).all()
+    return [(event.event_type, json.loads(event.payload)) for event in events]
+
+
+async def test_wallet_changes_write_events(db_session, sys_admin, make_wallet, transaction_request):
+    wallet = await make_wallet(db_session)
+    db_session.add(Loyalty(user_id=wallet.user_id, points=100))
+    await db_session.commit()
+
+    await top_wallet(db_session, sys_admin, transaction_request(50))
+    await debit_wallet(db_session, sys_admin, transaction_request(20, "debit"))
+    await redeem_loyalty_points(db_session, sys_admin, LoyaltyRedeemSchema(user_id=wallet.user_id, quantity=100))
+    await block_user_wallet(sys_admin, db_session, wallet.id, WalletUpdateRequest(is_blocked=True))
+
+    events = await outbox(db_session)
+    assert [event_type for event_type, _ in events] == [
+        "wallet.topped_up", "wallet.debited", "loyalty.redeemed", "wallet.blocked"]
+    assert events[0][1]["wallet_id"] == str(wallet.id)
+    assert events[0][1]["amount"] == 50.0
+    assert events[2][1]["points"] == 100
+    assert events[3][1] == {"wallet_id": str(wallet.id), "user_id": wallet.user_id}
+
+
+async def test_rejected_changes_write_no_events(db_session, sys_admin, make_wallet, transaction_request):
+    await make_wallet(db_session)
+    await top_wallet(db_session, sys_admin, transaction_request(5))
+
+    assert (await top_wallet(db_session, sys_admin, transaction_request(50, destination="000")))[0] == 404
+    assert (await debit_wallet(db_session, sys_admin, transaction_request(20, "debit")))[0] == 400
+
+    # The first debit passes its checks, but the batch is rolled back with its events
+    status_code, response = await debit_wallets(
+        db_session, sys_admin, [transaction_request(0.5, "debit"), transaction_request(10, "debit")],
+        BulkModeEnum.ALL_OR_NOTHING)
+    assert status_code == 200 and response["failed"] == 2
+
+    assert [event_type for event_type, _ in await outbox(db_session)] == ["wallet.topped_up"]
@@ -0,0 +1,70 @@
+import uuid
+
+from sqlalchemy import select
+
+from app.crud.crud_reconciliation import reconcile_wallets, wallet_id_ranges
+from app.models.ReconciliationMismatch import ReconciliationMismatch
+from app.models.Transaction import Transaction
+from app.models.Wallet import Wallet
+
+
+async def seed_wallets(db, count=12):
+    wallets = []
+    for index in range(count):
+        # Every third wallet holds 1.00 more than its history adds up to
+        wallet = Wallet(user_id=index + 1, user_phone_number=f"2349069943{index:03d}",
+                        balance=7000 + (100 if index % 3 == 0 else 0))
+        db.add(wallet)
+        await db.flush()
+        db.add_all([
+            Transaction(wallet_id=wallet.id, amount=10000, type="credit"),
+            Transaction(wallet_id=wallet.id, amount=5000, type="debit"),
+            Transaction(wallet_id=wallet.id, amount=2000, type="refund"),
+        ])
+        wallets.append(wallet)
+    await db.commit()
+    return wallets
+
+
+def test_wallet_id_ranges_cover_the_id_space():
+    ranges = wallet_id_ranges(3)
+
+    assert len(ranges) == 3
+    assert ranges[0][0] is None and ranges[-1][1] is None
+    assert all(upper == next_lower for (_, upper), (next_lower, _) in zip(ranges, ranges[1:]))
+    assert wallet_id_ranges(1) == [(None, None)]
+
+
+async def test_reconcile_wallets_records_mismatches(db_session):
+    wallets = await seed_wallets(db_session)
+
+    result = await reconcile_wallets(db_session, "run-1", chunk_size=5)
+
+    assert result == {"run_id": "run-1", "wallets": 12, "mismatches": 4}
+    mismatches = (await db_session.scalars(
+        select(ReconciliationMismatch).where(ReconciliationMismatch.run_id == "run-1"))).all()
+    assert {mismatch.wallet_id for mismatch in mismatches} == {wallet.id for wallet in wallets[::3]}
+    assert all((mismatch.wallet_balance, mismatch.ledger_balance, mismatch.difference) == (7100, 7000, 100)
+               for mismatch in mismatches)
+
+
+async def test_reconcile_wallets_by_range(db_session):
+    await seed_wallets(db_session)
+    db_session.add(Wallet(user_id=100, user_phone_number="2349069943999", balance=0))
+    await db_session.commit()
+
+    results = [await reconcile_wallets(db_session, "run-2", lower, upper, chunk_size=2)
+               for lower, upper in wallet_id_ranges(4)]
+
+    assert sum(result["wallets"] for result in results) == 13
+    assert sum(result["mismatches"] for result in results) == 4
+
+
+async def test_wallet_without_transactions(db_session):
+    wallet_id = uuid.uuid4()
+    db_session.add(Wallet(id=wallet_id, user_id=1, user_phone_number="2349069943000", balance=2500))
+    await db_session.commit()
+
+    assert await reconcile_wallets(db_session, "run-3") == {"run_id": "run-3", "wallets": 1, "mismatches": 1}
+    mismatch = await db_session.scalar(select(ReconciliationMismatch).where(ReconciliationMismatch.run_id == "run-3"))
+    assert (mismatch.wallet_id, mismatch.ledger_balance, mismatch.difference) == (wallet_id, 0, 2500)
@@ -1,303 +1,658 @@
+from datetime import datetime, timedelta
+
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import select, update
 
+from app.core.config import settings
 from app.crud.crud_auth import create_new_user, authenticate_user, get_current_user
 from app.crud.crud_transaction import top_wallet, debit_wallet, transaction_all_history, transaction_user_history, \
-    transaction_by_id
+    transaction_by_id, top_wallets, debit_wallets, transfer_funds, refund_transaction
 from app.crud.crud_user import create_user
 from app.crud.crud_wallet import block_user_wallet, create_wallet
+from app.enums.BulkModeEnum import BulkModeEnum
+from app.models.Loyalty import Loyalty
 from app.models.Transaction import Transaction
 from app.models.User import User
 from app.models.Wallet import Wallet
-from app.schemas.TransactionSchemas import TransactionRequest
+from app.schemas.TransactionSchemas import TransactionRequest, TransferRequest, RefundRequest, TransactionFilters
 from app.schemas.UserSchemas import UserRequest
 from app.schemas.WalletSchemas import WalletUpdateRequest, WalletCreationRequest
 
 
-def creating_user(user_data, db):
+async def creating_user(user_data, db):
     user_request = UserRequest(**user_data)
-    return create_new_user(user_request, db)
+    return await create_new_user(user_request, db)
 
 
-def authenticating_user(user, db):
+async def authenticating_user(user, db):
     form_data = OAuth2PasswordRequestForm(username=user.get("email"), password=user.get("password"))
-    _, response = authenticate_user(form_data, db)
-    _, user_info = get_current_user(response.get("access_token"), db)
+    _, response = await authenticate_user(form_data, db)
+    _, user_info = await get_current_user(response.get("access_token"), db)
     return user_info
 
 
-def test_top_wallet(db_session, sys_user_payload, normal_user_payload, credit_transaction_payload):
+async def test_top_wallet(db_session, sys_user_payload, normal_user_payload, credit_transaction_payload):
     # create superuser
-    creating_user(sys_user_payload, db_session)
+    await creating_user(sys_user_payload, db_session)
     # authenticate superuser
-    super_user_info = authenticating_user(sys_user_payload, db_session)
+    super_user_info = await authenticating_user(sys_user_payload, db_session)
 
     # create normal user with wallet
-    create_user(UserRequest(**normal_user_payload), db_session, super_user_info)
+    await create_user(UserRequest(**normal_user_payload), db_session, super_user_info)
 
     # top up wallet
-    status_code, response = top_wallet(db_session, super_user_info, TransactionRequest(**credit_transaction_payload))
+    status_code, response = await top_wallet(db_session, super_user_info, TransactionRequest(**credit_transaction_payload))
 
     assert status_code == 200
     assert response["message"] == "Wallet topped up successfully"
 
 
-def test_top_by_normal_user(db_session, normal_user_payload, user_payload, credit_transaction_payload):
+async def test_top_by_normal_user(db_session, normal_user_payload, user_payload, credit_transaction_payload):
     # create normal user
-    creating_user(normal_user_payload, db_session)
+    await creating_user(normal_user_payload, db_session)
     # authenticate normal user
-    token = authenticating_user(normal_user_payload, db_session)
+    token = await authenticating_user(normal_user_payload, db_session)
 
     # create user with wallet
-    create_user(UserRequest(**user_payload), db_session, token)
+    await create_user(UserRequest(**user_payload), db_session, token)
 
     # top up wallet
-    status_code, response = top_wallet(db_session, token,
-                                       TransactionRequest(**credit_transaction_payload))
+    status_code, response = await top_wallet(db_session, token,
+                                             TransactionRequest(**credit_transaction_payload))
 
     assert status_code == 403
     assert response["message"] == "Unauthorized access"
 
 
-def test_top_up_non_existing_wallet(db_session, normal_user_payload, user_payload, credit_transaction_payload):
+async def test_top_up_non_existing_wallet(db_session, normal_user_payload, user_payload, credit_transaction_payload):
     # create user
-    creating_user(user_payload, db_session)
+    await creating_user(user_payload, db_session)
     # authenticate  user
-    token = authenticating_user(user_payload, db_session)
+    token = await authenticating_user(user_payload, db_session)
 
     # top up wallet
-    status_code, response = top_wallet(db_session, token,
-                                       TransactionRequest(**credit_transaction_payload))
+    status_code, response = await top_wallet(db_session, token,
+                                             TransactionRequest(**credit_transaction_payload))
 
     assert status_code == 404
     assert response["message"] == "Wallet not found"
 
 
-def test_debit_wallet_by_normal_user(db_session, normal_user_payload, user_payload, debit_transaction_payload):
+async def test_debit_wallet_by_normal_user(db_session, normal_user_payload, user_payload, debit_transaction_payload):
     # create normal user
-    creating_user(normal_user_payload, db_session)
+    await creating_user(normal_user_payload, db_session)
     # authenticate normal user
-    token = authenticating_user(normal_user_payload, db_session)
+    token = await authenticating_user(normal_user_payload, db_session)
 
     # create user with wallet
-    create_user(UserRequest(**user_payload), db_session, token)
+    await create_user(UserRequest(**user_payload), db_session, token)
 
     # top up wallet
-    status_code, response = debit_wallet(db_session, token,
-                                         TransactionRequest(**debit_transaction_payload))
+    status_code, response = await debit_wallet(db_session, token,
+                                               TransactionRequest(**debit_transaction_payload))
 
     assert status_code == 403
     assert response["message"] == "Unauthorized access"
 
 
-def test_debit_non_existing_wallet(db_session, normal_user_payload, user_payload, debit_transaction_payload):
+async def test_debit_non_existing_wallet(db_session, normal_user_payload, user_payload, debit_transaction_payload):
     # create user
-    creating_user(user_payload, db_session)
+    await creating_user(user_payload, db_session)
     # authenticate  user
-    token = authenticating_user(user_payload, db_session)
+    token = await authenticating_user(user_payload, db_session)
 
     # debit wallet
-    status_code, response = top_wallet(db_session, token,
-                                       TransactionRequest(**debit_transaction_payload))
+    status_code, response = await top_wallet(db_session, token,
+                                             TransactionRequest(**debit_transaction_payload))
 
     assert status_code == 404
     assert response["message"] == "Wallet not found"
 
 
-def test_debiting_blocked_wallet(db_session, sys_user_payload, normal_user_payload, debit_transaction_payload,
+async def test_debiting_blocked_wallet(db_session, sys_user_payload, normal_user_payload, debit_transaction_payload,
                                  credit_transaction_payload):
     # create superuser
-    creating_user(sys_user_payload, db_session)
+    await creating_user(sys_user_payload, db_session)
     # authenticate superuser
-    token = authenticating_user(sys_user_payload, db_session)
+    token = await authenticating_user(sys_user_payload, db_session)
 
     # create normal user
-    create_user(UserRequest(**normal_user_payload), db_session, token)
+    await create_user(UserRequest(**normal_user_payload), db_session, token)
 
     # top up wallet
-    top_wallet(db_session, token,
-               TransactionRequest(**credit_transaction_payload))
+    await top_wallet(db_session, token,
+                     TransactionRequest(**credit_transaction_payload))
 
     # block wallet
-    db_session.query(Wallet).filter(
-        Wallet.user_phone_number == normal_user_payload["phone_number"]).update({"is_blocked": True})
-    db_session.commit()
+    await db_session.execute(update(Wallet).where(
+        Wallet.user_phone_number == normal_user_payload["phone_number"]).values(is_blocked=True))
+    await db_session.commit()
 
     # debit wallet
-    status_code, response = debit_wallet(db_session, token,
-                                         TransactionRequest(**debit_transaction_payload))
+    status_code, response = await debit_wallet(db_session, token,
+                                               TransactionRequest(**debit_transaction_payload))
 
     assert status_code == 403
     assert response["message"] == "Wallet is blocked"
 
 
-def test_debiting_insufficient_fund_wallet(db_session, sys_user_payload, normal_user_payload,
+async def test_debiting_insufficient_fund_wallet(db_session, sys_user_payload, normal_user_payload,
                                            debit_transaction_payload):
     # create superuser
-    creating_user(sys_user_payload, db_session)
+    await creating_user(sys_user_payload, db_session)
     # authenticate superuser
-    token = authenticating_user(sys_user_payload, db_session)
+    token = await authenticating_user(sys_user_payload, db_session)
 
     # create normal user with wallet
-    create_user(UserRequest(**normal_user_payload), db_session, token)
+    await create_user(UserRequest(**normal_user_payload), db_session, token)
 
     # debit wallet
-    status_code, response = debit_wallet(db_session, token,
-                                         TransactionRequest(**debit_transaction_payload))
+    status_code, response = await debit_wallet(db_session, token,
+                                               TransactionRequest(**debit_transaction_payload))
 
     assert status_code == 400
     assert response["message"] == "Insufficient balance"
 
 
-def test_debiting_self_wallet(db_session, sys_user_payload, sys_user_debit_transaction_payload):
+async def test_debiting_self_wallet(db_session, sys_user_payload, sys_user_debit_transaction_payload):
     # create superuser
-    creating_user(sys_user_payload, db_session)
+    await creating_user(sys_user_payload, db_session)
     # authenticate superuser
-    token = authenticating_user(sys_user_payload, db_session)
+    token = await authenticating_user(sys_user_payload, db_session)
 
     # create  superuser with wallet
-    system_user_id = db_session.query(User).filter(User.username == sys_user_payload.get('username')).first().id
+    system_user_id = (await db_session.scalar(select(User).where(User.username == sys_user_payload.get('username')))).id
 
     wallet_creation_request = WalletCreationRequest(
         user_id=system_user_id,
         user_phone_number=sys_user_payload.get('phone_number')
     )
-    create_wallet(db_session, token, wallet_creation_request)
+    await create_wallet(db_session, token, wallet_creation_request)
 
     # debit wallet
-    status_code, response = debit_wallet(db_session, token,
-                                         TransactionRequest(**sys_user_debit_transaction_payload))
+    status_code, response = await debit_wallet(db_session, token,
+                                               TransactionRequest(**sys_user_debit_transaction_payload))
 
     assert status_code == 400
     assert response["message"] == "You cannot debit your own wallet"
 
 
-def test_debiting_wallet(db_session, sys_user_payload, normal_user_payload, debit_transaction_payload,
+async def test_debiting_wallet(db_session, sys_user_payload, normal_user_payload, debit_transaction_payload,
                          credit_transaction_payload):
     # create superuser
-    creating_user(sys_user_payload, db_session)
+    await creating_user(sys_user_payload, db_session)
     # authenticate superuser
-    token = authenticating_user(sys_user_payload, db_session)
+    token = await authenticating_user(sys_user_payload, db_session)
 
     # create normal user
-    create_user(UserRequest(**normal_user_payload), db_session, token)
+    await create_user(UserRequest(**normal_user_payload), db_session, token)
 
     # top up wallet
-    top_wallet(db_session, token,
-               TransactionRequest(**credit_transaction_payload))
+    await top_wallet(db_session, token,
+                     TransactionRequest(**credit_transaction_payload))
 
     # debit wallet
-    status_code, response = debit_wallet(db_session, token,
-                                         TransactionRequest(**debit_transaction_payload))
+    status_code, response = await debit_wallet(db_session, token,
+                                               TransactionRequest(**debit_transaction_payload))
 
     assert status_code == 200
     assert response["message"] == "Wallet debited successfully"
 
 
-def test_get_all_transaction_history(db_session, sys_user_payload, normal_user_payload, debit_transaction_payload,
+async def test_get_all_transaction_history(db_session, sys_user_payload, normal_user_payload, debit_transaction_payload,
                                      credit_transaction_payload):
     # create superuser
-    creating_user(sys_user_payload, db_session)
+    await creating_user(sys_user_payload, db_session)
     # authenticate superuser
-    token = authenticating_user(sys_user_payload, db_session)
+    token = await authenticating_user(sys_user_payload, db_session)
 
     # create normal user
-    create_user(UserRequest(**normal_user_payload), db_session, token)
+    await create_user(UserRequest(**normal_user_payload), db_session, token)
 
     # top up wallet
-    top_wallet(db_session, token,
-               TransactionRequest(**credit_transaction_payload))
+    await top_wallet(db_session, token,
+                     TransactionRequest(**credit_transaction_payload))
 
     # debit wallet
-    debit_wallet(db_session, token, TransactionRequest(**debit_transaction_payload))
+    await debit_wallet(db_session, token, TransactionRequest(**debit_transaction_payload))
 
     # get transaction history
-    status_code, response = transaction_all_history(db_session, token)
+    status_code, response = await transaction_all_history(db_session, token)
 
     assert status_code == 200
-    assert len(response) == 2
+    assert len(response["transactions"]) == 2
 
 
-def test_get_all_transaction_history_by_normal_user(db_session, normal_user_payload, debit_transaction_payload,
+async def test_get_all_transaction_history_by_normal_user(db_session, normal_user_payload, debit_transaction_payload,
                                                     credit_transaction_payload):
     # create normal user
-    creating_user(normal_user_payload, db_session)
+    await creating_user(normal_user_payload, db_session)
     # authenticate normal user
-    token = authenticating_user(normal_user_payload, db_session)
+    token = await authenticating_user(normal_user_payload, db_session)
 
     # get transaction history
-    status_code, response = transaction_all_history(db_session, token)
+    status_code, response = await transaction_all_history(db_session, token)
 
     assert status_code == 403
     assert response.get('message') == "Unauthorized access"
 
 
-def test_get_user_transactions_history(db_session, sys_user_payload, normal_user_payload, debit_transaction_payload,
+async def test_get_user_transactions_history(db_session, sys_user_payload, normal_user_payload, debit_transaction_payload,
                                        credit_transaction_payload):
     # create superuser
-    creating_user(sys_user_payload, db_session)
+    await creating_user(sys_user_payload, db_session)
     # authenticate superuser
-    token = authenticating_user(sys_user_payload, db_session)
+    token = await authenticating_user(sys_user_payload, db_session)
 
     # create normal user
-    create_user(UserRequest(**normal_user_payload), db_session, token)
+    await create_user(UserRequest(**normal_user_payload), db_session, token)
 
     # top up wallet
-    top_wallet(db_session, token,
-               TransactionRequest(**credit_transaction_payload))
+    await top_wallet(db_session, token,
+                     TransactionRequest(**credit_transaction_payload))
 
     # debit wallet
-    debit_wallet(db_session, token, TransactionRequest(**debit_transaction_payload))
+    await debit_wallet(db_session, token, TransactionRequest(**debit_transaction_payload))
 
     # user id
-    user_id = db_session.query(User).filter(User.username == normal_user_payload.get('username')).first().id
+    user_id = (await db_session.scalar(select(User).where(User.username == normal_user_payload.get('username')))).id
 
     # get transaction history
-    status_code, response = transaction_user_history(db_session, token, user_id)
+    status_code, response = await transaction_user_history(db_session, token, user_id)
 
     assert status_code == 200
-    assert len(response) == 2
+    assert len(response["transactions"]) == 2
 
 
-def test_get_user_transactions_history_by_normal_user(db_session, sys_user_payload, normal_user_payload,
+async def test_get_user_transactions_history_by_normal_user(db_session, sys_user_payload, normal_user_payload,
                                                       debit_transaction_payload,
                                                       credit_transaction_payload):
     # create superuser
-    creating_user(normal_user_payload, db_session)
+    await creating_user(normal_user_payload, db_session)
     # authenticate superuser
-    token = authenticating_user(normal_user_payload, db_session)
+    token = await authenticating_user(normal_user_payload, db_session)
 
     # get transaction history
-    status_code, response = transaction_user_history(db_session, token, 1)
+    status_code, response = await transaction_user_history(db_session, token, 1)
 
     assert status_code == 403
     assert response.get('message') == "Unauthorized access"
 
 
-def test_get_transaction_history_by_id(db_session, sys_user_payload, normal_user_payload, debit_transaction_payload,
+async def test_get_transaction_history_by_id(db_session, sys_user_payload, normal_user_payload, debit_transaction_payload,
                                        credit_transaction_payload):
     # create superuser
-    creating_user(sys_user_payload, db_session)
+    await creating_user(sys_user_payload, db_session)
     # authenticate superuser
-    token = authenticating_user(sys_user_payload, db_session)
+    token = await authenticating_user(sys_user_payload, db_session)
 
     # create normal user
-    create_user(UserRequest(**normal_user_payload), db_session, token)
+    await create_user(UserRequest(**normal_user_payload), db_session, token)
 
     # top up wallet
-    top_wallet(db_session, token,
-               TransactionRequest(**credit_transaction_payload))
+    await top_wallet(db_session, token,
+                     TransactionRequest(**credit_transaction_payload))
 
     # user id
-    user_id = db_session.query(User).filter(User.username == normal_user_payload.get('username')).first().id
+    user_id = (await db_session.scalar(select(User).where(User.username == normal_user_payload.get('username')))).id
 
     # user wallet id
-    user_wallet_id = db_session.query(Wallet).filter(Wallet.user_id == user_id).first().id
+    user_wallet_id = (await db_session.scalar(select(Wallet).where(Wallet.user_id == user_id))).id
 
     # transaction id
-    transaction_id = db_session.query(Transaction).filter(Transaction.wallet_id == user_wallet_id).all()[0].id
+    transaction_id = (await db_session.scalars(select(Transaction).where(Transaction.wallet_id == user_wallet_id))).all()[0].id
 
     # get transaction history
-    status_code, response = transaction_by_id(db_session, token, transaction_id)
+    status_code, response = await transaction_by_id(db_session, token, transaction_id)
 
     assert status_code == 200
     assert response.get('id') == str(transaction_id)
+
+
+async def test_debits_never_overdraw_wallet(db_session, sys_user_payload, normal_user_payload,
+                                            credit_transaction_payload, debit_transaction_payload):
+    # create superuser
+    await creating_user(sys_user_payload, db_session)
+    # authenticate superuser
+    token = await authenticating_user(sys_user_payload, db_session)
+
+    # create normal user with wallet and a balance of 100
+    await create_user(UserRequest(**normal_user_payload), db_session, token)
+    await top_wallet(db_session, token, TransactionRequest(**credit_transaction_payload))
+
+    # only the first debit of 100 fits in the balance
+    first_status, _ = await debit_wallet(db_session, token, TransactionRequest(**debit_transaction_payload))
+    second_status, second_response = await debit_wallet(db_session, token,
+                                                        TransactionRequest(**debit_transaction_payload))
+
+    wallet = await db_session.scalar(
+        select(Wallet).where(Wallet.user_phone_number == normal_user_payload["phone_number"]))
+    transactions = (await db_session.scalars(select(Transaction).where(Transaction.wallet_id == wallet.id))).all()
+
+    assert first_status == 200
+    assert second_status == 400
+    assert second_response["message"] == "Insufficient balance"
+    assert wallet.balance == 0
+    assert len(transactions) == 2
+
+
+async def test_paging_transaction_history_with_cursor(db_session, sys_user_payload, normal_user_payload,
+                                                      credit_transaction_payload):
+    # create superuser
+    await creating_user(sys_user_payload, db_session)
+    # authenticate superuser
+    token = await authenticating_user(sys_user_payload, db_session)
+
+    # create normal user with five top ups
+    await create_user(UserRequest(**normal_user_payload), db_session, token)
+    for _ in range(5):
+        await top_wallet(db_session, token, TransactionRequest(**credit_transaction_payload))
+
+    # walk the history two transactions at a time
+    pages = []
+    cursor = None
+    while True:
+        status_code, response = await transaction_all_history(db_session, token, limit=2, cursor=cursor)
+        assert status_code == 200
+        pages.append(response["transactions"])
+        cursor = response["next_cursor"]
+        if cursor is None:
+            break
+
+    transaction_ids = [transaction["id"] for page in pages for transaction in page]
+    created_at = [transaction["created_at"] for page in pages for transaction in page]
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert len(set(transaction_ids)) == 5
+    assert created_at == sorted(created_at, reverse=True)
+
+
+async def test_empty_transaction_history_page(db_session, sys_user_payload, normal_user_payload,
+                                             credit_transaction_payload):
+    # create superuser
+    await creating_user(sys_user_payload, db_session)
+    # authenticate superuser
+    token = await authenticating_user(sys_user_payload, db_session)
+
+    # create normal user with one top up
+    await create_user(UserRequest(**normal_user_payload), db_session, token)
+    await top_wallet(db_session, token, TransactionRequest(**credit_transaction_payload))
+
+    status_code, response = await transaction_all_history(db_session, token, limit=0)
+
+    assert status_code == 200
+    assert response == {"transactions": [], "next_cursor": None}
+
+
+async def test_transaction_history_with_invalid_cursor(db_session, sys_user_payload):
+    # create superuser
+    await creating_user(sys_user_payload, db_session)
+    # authenticate superuser
+    token = await authenticating_user(sys_user_payload, db_session)
+
+    status_code, response = await transaction_all_history(db_session, token, cursor="not-a-cursor")
+
+    assert status_code == 400
+    assert response["message"] == "Invalid cursor"
+
+
+async def test_filtering_transaction_history(db_session, sys_user_payload, normal_user_payload,
+                                             credit_transaction_payload, debit_transaction_payload):
+    # create superuser
+    await creating_user(sys_user_payload, db_session)
+    # authenticate superuser
+    token = await authenticating_user(sys_user_payload, db_session)
+
+    # create normal user, top up twice and debit once
+    await create_user(UserRequest(**normal_user_payload), db_session, token)
+    await top_wallet(db_session, token, TransactionRequest(**credit_transaction_payload))
+    await top_wallet(db_session, token, TransactionRequest(**{**credit_transaction_payload, "amount": 40.5}))
+    await debit_wallet(db_session, token, TransactionRequest(**{**debit_transaction_payload, "amount": 20}))
+    user_id = (await db_session.scalar(select(User).where(User.phone_number == normal_user_payload["phone_number"]))).id
+
+    async def amounts(**filters):
+        status_code, response = await transaction_all_history(db_session, token, filters=TransactionFilters(**filters))
+        assert status_code == 200
+        return sorted(transaction["amount"] for transaction in response["transactions"])
+
+    assert await amounts(type="credit") == [40.5, 100.0]
+    assert await amounts(source="SERVICE") == [20.0]
+    assert await amounts(amount_min=20, amount_max=40.5) == [20.0, 40.5]
+    assert await amounts(type="credit", amount_max=50) == [40.5]
+    assert await amounts(created_from=datetime.now()) == []
+    assert await amounts(created_to=datetime.now() + timedelta(minutes=1)) == [20.0, 40.5, 100.0]
+
+    status_code, response = await transaction_user_history(db_session, token, user_id,
+                                                           filters=TransactionFilters(type="debit"))
+    assert status_code == 200
+    assert [transaction["amount"] for transaction in response["transactions"]] == [20.0]
+
+
+async def test_transaction_history_with_invalid_filters(db_session, sys_user_payload):
+    # create superuser
+    await creating_user(sys_user_payload, db_session)
+    # authenticate superuser
+    token = await authenticating_user(sys_user_payload, db_session)
+
+    now = datetime.now()
+    for filters, message in [
+        (TransactionFilters(created_from=now, created_to=now - timedelta(days=1)),
+         "created_from must not be after created_to"),
+        (TransactionFilters(amount_min=10, amount_max=5), "amount_min must not be greater than amount_max"),
+        (TransactionFilters(wallet_id="not-a-uuid"), "Invalid wallet id"),
+    ]:
+        status_code, response = await transaction_all_history(db_session, token, filters=filters)
+        assert status_code == 400
+        assert response["message"] == message
+
+
+async def test_bulk_top_up_wallets(db_session, monkeypatch, sys_user_payload, normal_user_payload,
+                                   credit_transaction_payload):
+    monkeypatch.setattr(settings, "bulk_transaction_chunk_size", 2)
+    # create superuser
+    await creating_user(sys_user_payload, db_session)
+    # authenticate superuser
+    token = await authenticating_user(sys_user_payload, db_session)
+
+    # create normal user with wallet
+    await create_user(UserRequest(**normal_user_payload), db_session, token)
+
+    requests = [
+        TransactionRequest(**credit_transaction_payload),
+        TransactionRequest(**{**credit_transaction_payload, "destination": "2340000000000"}),
+        TransactionRequest(**credit_transaction_payload),
+    ]
+    status_code, response = await top_wallets(db_session, token, requests)
+
+    wallet = await db_session.scalar(
+        select(Wallet).where(Wallet.user_phone_number == normal_user_payload["phone_number"]))
+    transactions = (await db_session.scalars(select(Transaction).where(Transaction.wallet_id == wallet.id))).all()
+
+    assert status_code == 200
+    assert response["succeeded"] == 2
+    assert response["failed"] == 1
+    assert [result["status_code"] for result in response["results"]] == [200, 404, 200]
+    assert [result["index"] for result in response["results"]] == [0, 1, 2]
+    assert wallet.balance == 2 * TransactionRequest(**credit_transaction_payload).amount_minor
+    assert len(transactions) == 2
+
+
+async def test_bulk_debit_wallets_best_effort(db_session, monkeypatch, sys_user_payload, normal_user_payload,
+                                              credit_transaction_payload, debit_transaction_payload):
+    monkeypatch.setattr(settings, "bulk_transaction_chunk_size", 2)
+    # create superuser
+    await creating_user(sys_user_payload, db_session)
+    # authenticate superuser
+    token = await authenticating_user(sys_user_payload, db_session)
+
+    # create normal user with wallet and a balance of 200
+    await create_user(UserRequest(**normal_user_payload), db_session, token)
+    await top_wallets(db_session, token, [TransactionRequest(**credit_transaction_payload)] * 2)
+
+    # the third debit of 100 no longer fits in the balance
+    requests = [TransactionRequest(**debit_transaction_payload)] * 3 + [
+        TransactionRequest(**{**debit_transaction_payload, "destination": "2340000000000"}),
+        TransactionRequest(**{**debit_transaction_payload, "destination": sys_user_payload["phone_number"]}),
+    ]
+    status_code, response = await debit_wallets(db_session, token, requests)
+
+    wallet = await db_session.scalar(
+        select(Wallet).where(Wallet.user_phone_number == normal_user_payload["phone_number"]))
+    loyalty = await db_session.scalar(select(Loyalty).where(Loyalty.user_id == wallet.user_id))
+
+    assert status_code == 200
+    assert [result["status_code"] for result in response["results"]] == [200, 200, 400, 404, 404]
+    assert response["results"][2]["message"] == "Insufficient balance"
+    assert wallet.balance == 0
+    assert loyalty.points == 2 * int(debit_transaction_payload["amount"] * 0.01)
+
+
+async def test_bulk_debit_wallets_all_or_nothing(db_session, monkeypatch, sys_user_payload, normal_user_payload,
+                                                 credit_transaction_payload, debit_transaction_payload):
+    monkeypatch.setattr(settings, "bulk_transaction_chunk_size", 2)
+    # create superuser
+    await creating_user(sys_user_payload, db_session)
+    # authenticate superuser
+    token = await authenticating_user(sys_user_payload, db_session)
+
+    # create normal user with wallet and a balance of 200
+    await create_user(UserRequest(**normal_user_payload), db_session, token)
+    await top_wallets(db_session, token, [TransactionRequest(**credit_transaction_payload)] * 2)
+
+    requests = [TransactionRequest(**debit_transaction_payload)] * 3
+    status_code, response = await debit_wallets(db_session, token, requests, BulkModeEnum.ALL_OR_NOTHING)
+
+    wallet = await db_session.scalar(
+        select(Wallet).where(Wallet.user_phone_number == normal_user_payload["phone_number"]))
+    await db_session.refresh(wallet)
+    debits = (await db_session.scalars(select(Transaction).where(Transaction.type == "debit"))).all()
+
+    assert status_code == 200
+    assert [result["status_code"] for result in response["results"]] == [424, 424, 400]
+    assert response["succeeded"] == 0
+    assert wallet.balance == 2 * TransactionRequest(**credit_transaction_payload).amount_minor
+    assert debits == []
+
+
+async def test_transfer_funds(db_session, sys_user_payload, normal_user_payload, user_payload,
+                              credit_transaction_payload):
+    # create superuser
+    await creating_user(sys_user_payload, db_session)
+    # authenticate superuser
+    token = await authenticating_user(sys_user_payload, db_session)
+
+    # create two users with wallets and top up the normal user's wallet with 100
+    await create_user(UserRequest(**normal_user_payload), db_session, token)
+    await create_user(UserRequest(**user_payload), db_session, token)
+    await top_wallet(db_session, token, TransactionRequest(**credit_transaction_payload))
+
+    # the wallet owner transfers 40
+    normal_user_token = await authenticating_user(normal_user_payload, db_session)
+    transfer = TransferRequest(amount=40, source=normal_user_payload["phone_number"],
+                               destination=user_payload["phone_number"])
+    status_code, response = await transfer_funds(db_session, normal_user_token, transfer)
+
+    source_wallet = await db_session.scalar(
+        select(Wallet).where(Wallet.user_phone_number == normal_user_payload["phone_number"]))
+    destination_wallet = await db_session.scalar(
+        select(Wallet).where(Wallet.user_phone_number == user_payload["phone_number"]))
+    await db_session.refresh(source_wallet)
+    await db_session.refresh(destination_wallet)
+    ledger = (await db_session.scalars(select(Transaction).where(Transaction.source == "TRANSFER"))).all()
+
+    assert status_code == 200
+    assert response["message"] == "Transfer completed successfully"
+    assert source_wallet.balance == 6000
+    assert destination_wallet.balance == 4000
+    assert sorted((transaction.type, transaction.amount) for transaction in ledger) == [
+        ("credit", 4000), ("debit", 4000)]
+
+
+async def test_transfer_funds_rejections(db_session, sys_user_payload, normal_user_payload, user_payload,
+                                         credit_transaction_payload):
+    # create superuser
+    await creating_user(sys_user_payload, db_session)
+    # authenticate superuser
+    token = await authenticating_user(sys_user_payload, db_session)
+
+    # create two users with wallets and top up the normal user's wallet with 100
+    await create_user(UserRequest(**normal_user_payload), db_session, token)
+    await create_user(UserRequest(**user_payload), db_session, token)
+    await top_wallet(db_session, token, TransactionRequest(**credit_transaction_payload))
+    normal_user_token = await authenticating_user(normal_user_payload, db_session)
+
+    not_owner = await transfer_funds(db_session, normal_user_token, TransferRequest(
+        amount=1, source=user_payload["phone_number"], destination=normal_user_payload["phone_number"]))
+    insufficient = await transfer_funds(db_session, normal_user_token, TransferRequest(
+        amount=101, source=normal_user_payload["phone_number"], destination=user_payload["phone_number"]))
+    same_wallet = await transfer_funds(db_session, normal_user_token, TransferRequest(
+        amount=1, source=normal_user_payload["phone_number"], destination=normal_user_payload["phone_number"]))
+
+    assert not_owner == (403, {"message": "Unauthorized access"})
+    assert insufficient == (400, {"message": "Insufficient balance"})
+    assert same_wallet == (400, {"message": "You cannot transfer to the same wallet"})
+
+
+async def test_refund_transaction(db_session, sys_user_payload, normal_user_payload, credit_transaction_payload,
+                                  debit_transaction_payload):
+    # create superuser
+    await creating_user(sys_user_payload, db_session)
+    # authenticate superuser
+    token = await authenticating_user(sys_user_payload, db_session)
+
+    # create normal user with wallet, top up and debit 100
+    await create_user(UserRequest(**normal_user_payload), db_session, token)
+    await top_wallet(db_session, token, TransactionRequest(**credit_transaction_payload))
+    await debit_wallet(db_session, token, TransactionRequest(**debit_transaction_payload))
+    credit = await db_session.scalar(select(Transaction).where(Transaction.type == "credit"))
+    debit = await db_session.scalar(select(Transaction).where(Transaction.type == "debit"))
+
+    # refunds add up to the debited amount at most
+    first = await refund_transaction(db_session, token, str(debit.id), RefundRequest(amount=60))
+    too_much = await refund_transaction(db_session, token, str(debit.id), RefundRequest(amount=50))
+    rest = await refund_transaction(db_session, token, str(debit.id), RefundRequest(amount=40))
+    of_credit = await refund_transaction(db_session, token, str(credit.id), RefundRequest(amount=1))
+    unknown = await refund_transaction(db_session, token, "not-a-transaction", RefundRequest(amount=1))
+
+    wallet = await db_session.scalar(
+        select(Wallet).where(Wallet.user_phone_number == normal_user_payload["phone_number"]))
+    await db_session.refresh(wallet)
+    await db_session.refresh(debit)
+    refunds = (await db_session.scalars(select(Transaction).where(Transaction.type == "refund"))).all()
+
+    assert first == (200, {"message": "Transaction refunded successfully"})
+    assert too_much == (400, {"message": "Refund exceeds the amount left to refund"})
+    assert rest[0] == 200
+    assert of_credit == (400, {"message": "Only debit transactions can be refunded"})
+    assert unknown == (404, {"message": "Transaction not found"})
+    assert debit.refunded_amount == debit.amount
+    assert wallet.balance == credit.amount
+    assert [refund.original_transaction_id for refund in refunds] == [debit.id, debit.id]
+
+
+async def test_refund_transfer_is_rejected(db_session, sys_user_payload, normal_user_payload, user_payload,
+                                           credit_transaction_payload):
+    # create superuser
+    await creating_user(sys_user_payload, db_session)
+    # authenticate superuser
+    token = await authenticating_user(sys_user_payload, db_session)
+
+    # create two users with wallets, top up the normal user's wallet with 100 and transfer 10
+    await create_user(UserRequest(**normal_user_payload), db_session, token)
+    await create_user(UserRequest(**user_payload), db_session, token)
+    await top_wallet(db_session, token, TransactionRequest(**credit_transaction_payload))
+    await transfer_funds(db_session, token, TransferRequest(amount=10, source=normal_user_payload["phone_number"],
+                                                            destination=user_payload["phone_number"]))
+    transfer_debit = await db_session.scalar(
+        select(Transaction).where(Transaction.source == "TRANSFER", Transaction.type == "debit"))
+
+    status_code, response = await refund_transaction(db_session, token, str(transfer_debit.id),
+                                                     RefundRequest(amount=10))
+
+    source_wallet = await db_session.scalar(
+        select(Wallet).where(Wallet.user_phone_number == normal_user_payload["phone_number"]))
+    await db_session.refresh(source_wallet)
+    await db_session.refresh(transfer_debit)
+    assert (status_code, response) == (400, {"message": "Transfers cannot be refunded"})
+    assert source_wallet.balance == 9000
+    assert transfer_debit.refunded_amount == 0
@@ -0,0 +1,199 @@
+import asyncio
+
+from sqlalchemy import StaticPool, event, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from app.core.config import settings
+from app.crud.crud_idempotency import idempotent_mutation, idempotency_cache
+from app.crud.crud_transaction import top_wallet
+from app.db import group_commit
+from app.db.base import Base
+from app.db.group_commit import GroupCommitter, after_commit, execute_mutation
+from app.models.IdempotencyKey import IdempotencyKey
+from app.models.Loyalty import Loyalty
+from app.models.Transaction import Transaction
+from app.models.Wallet import Wallet
+from app.schemas.TransactionSchemas import TransactionRequest
+
+
+async def make_committer(max_batch=100, database_url="sqlite+aiosqlite://"):
+    if database_url == "sqlite+aiosqlite://":
+        engine = create_async_engine(database_url, poolclass=StaticPool)
+    else:
+        engine = create_async_engine(database_url)
+    commits = []
+
+    # Let SQLAlchemy emit BEGIN itself, so savepoints work with pysqlite
+    @event.listens_for(engine.sync_engine, "connect")
+    def do_connect(dbapi_connection, _connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def do_begin(connection):
+        connection.exec_driver_sql("BEGIN")
+
+    @event.listens_for(engine.sync_engine, "commit")
+    def count_commit(_connection):
+        commits.append(1)
+
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    commits.clear()
+
+    session_factory = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    return GroupCommitter(session_factory, 0.005, max_batch), session_factory, commits
+
+
+def add_loyalty(user_id, status_code=200):
+    async def operation(db):
+        db.add(Loyalty(user_id=user_id, points=user_id))
+        await db.commit()
+        if status_code >= 400:
+            await db.rollback()
+        return status_code, {"user_id": user_id}
+
+    return operation
+
+
+async def failing_operation(db):
+    db.add(Loyalty(user_id=99, points=99))
+    await db.flush()
+    raise RuntimeError("operation failed")
+
+
+# Test concurrent operations share one commit and each caller gets its own result
+async def test_operations_share_one_commit():
+    committer, session_factory, commits = await make_committer()
+
+    results = await asyncio.gather(*[committer.submit(add_loyalty(user_id)) for user_id in range(1, 11)])
+
+    async with session_factory() as db:
+        stored = await db.scalar(select(func.count()).select_from(Loyalty))
+
+    assert results == [(200, {"user_id": user_id}) for user_id in range(1, 11)]
+    assert stored == 10
+    assert len(commits) == 1
+    assert committer.stats()["requests_per_commit"] == 10
+
+
+# Test a failed operation only rolls back its own savepoint
+async def test_failures_stay_isolated():
+    committer, session_factory, commits = await make_committer()
+
+    results = await asyncio.gather(
+        committer.submit(add_loyalty(1)),
+        committer.submit(add_loyalty(2, status_code=404)),
+        committer.submit(failing_operation),
+        committer.submit(add_loyalty(3)),
+        return_exceptions=True,
+    )
+
+    async with session_factory() as db:
+        stored = (await db.scalars(select(Loyalty.user_id).order_by(Loyalty.user_id))).all()
+
+    assert results[0] == (200, {"user_id": 1})
+    assert results[1] == (404, {"user_id": 2})
+    assert isinstance(results[2], RuntimeError)
+    assert results[3] == (200, {"user_id": 3})
+    assert stored == [1, 3]
+    assert len(commits) == 1
+
+
+# Test groups are cut at the maximum batch size
+async def test_groups_are_bounded():
+    committer, _, commits = await make_committer(max_batch=4)
+
+    await asyncio.gather(*[committer.submit(add_loyalty(user_id)) for user_id in range(1, 11)])
+
+    assert len(commits) == 3
+
+
+# Test an operation can roll back a failed flush and carry on in the group
+async def test_rollback_inside_group():
+    committer, session_factory, _ = await make_committer()
+    await committer.submit(add_loyalty(1))
+
+    async def operation(db):
+        db.add(Loyalty(user_id=1, points=1))
+        try:
+            await db.flush()
+        except IntegrityError:
+            await db.rollback()
+        db.add(Loyalty(user_id=2, points=2))
+        await db.commit()
+        return 200, {}
+
+    assert await committer.submit(operation) == (200, {})
+
+    async with session_factory() as db:
+        stored = (await db.scalars(select(Loyalty.user_id).order_by(Loyalty.user_id))).all()
+    assert stored == [1, 2]
+
+
+# Test callbacks run once the group is committed, and only for operations that were kept
+async def test_callbacks_run_after_commit():
+    committer, _, commits = await make_committer()
+    called = []
+
+    def operation(user_id, status_code):
+        async def run(db):
+            db.add(Loyalty(user_id=user_id, points=user_id))
+            await db.commit()
+            after_commit(db, lambda: called.append((user_id, len(commits))))
+            return status_code, {}
+
+        return run
+
+    await asyncio.gather(committer.submit(operation(1, 200)), committer.submit(operation(2, 400)),
+                         committer.submit(operation(3, 200)))
+
+    assert called == [(1, 1), (3, 1)]
+
+
+# Test an Idempotency-Key request goes through the group commit and is applied once
+async def test_idempotent_mutation_in_group(monkeypatch, tmp_path, sys_admin, make_wallet, credit_transaction_payload):
+    committer, session_factory, commits = await make_committer(
+        database_url=f"sqlite+aiosqlite:///{tmp_path}/group_commit.db")
+    monkeypatch.setattr(settings, "group_commit_enabled", True)
+    monkeypatch.setattr(group_commit, "group_committer", committer)
+    idempotency_cache.clear()
+
+    async with session_factory() as db:
+        await make_wallet(db, phone_number=credit_transaction_payload["destination"])
+
+    request = TransactionRequest(**credit_transaction_payload)
+    async with session_factory() as request_db:
+        first, concurrent = await asyncio.gather(
+            execute_mutation(request_db, idempotent_mutation, sys_admin, "key-1", "top-wallet", request, top_wallet),
+            execute_mutation(request_db, idempotent_mutation, sys_admin, "key-1", "top-wallet", request, top_wallet),
+        )
+        idempotency_cache.clear()
+        retried = await execute_mutation(request_db, idempotent_mutation, sys_admin, "key-1", "top-wallet", request,
+                                         top_wallet)
+
+    async with session_factory() as db:
+        wallet = await db.scalar(select(Wallet))
+        top_ups = await db.scalar(select(func.count()).select_from(Transaction))
+        key = await db.scalar(select(IdempotencyKey))
+
+    assert first == concurrent == retried == (200, {"message": "Wallet topped up successfully"})
+    assert wallet.balance == request.amount_minor
+    assert top_ups == 1
+    assert key.status_code == 200
+    assert committer.stats()["fallbacks"] == 0
+
+
+# Test the request's session gives its connection back before waiting for the group
+async def test_request_session_is_released(monkeypatch):
+    committer, session_factory, _ = await make_committer()
+    monkeypatch.setattr(settings, "group_commit_enabled", True)
+    monkeypatch.setattr(group_commit, "group_committer", committer)
+
+    async with session_factory(info={"principal": "Bearer token"}) as request_db:
+        await request_db.scalar(select(func.count()).select_from(Loyalty))
+
+        async def operation(db):
+            return 200, {"request_in_transaction": request_db.in_transaction()}
+
+        assert await execute_mutation(request_db, operation) == (200, {"request_in_transaction": False})
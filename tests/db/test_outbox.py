@@ -0,0 +1,158 @@
+import json
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+from sqlalchemy import StaticPool, select, update
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from app.crud.crud_outbox import add_events, outbox_event
+from app.db.base import Base
+from app.db.outbox import OutboxDispatcher, MemorySink, FileSink, WebhookSink
+from app.enums.OutboxEventEnum import OutboxEventEnum
+from app.models.OutboxEvent import OutboxEvent
+
+
+class FailingSink:
+    async def send(self, events):
+        raise RuntimeError("sink is down")
+
+
+class RejectingSink(MemorySink):
+    """Refuses any batch holding the event with the given sequence"""
+
+    def __init__(self, sequence):
+        super().__init__()
+        self.sequence = sequence
+
+    async def send(self, events):
+        if any(event["payload"]["sequence"] == self.sequence for event in events):
+            raise RuntimeError("event rejected")
+        await super().send(events)
+
+
+async def make_session_factory(events=0):
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    session_factory = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    async with session_factory() as db:
+        await add_events(db, [outbox_event(OutboxEventEnum.WALLET_TOPPED_UP, {"sequence": index})
+                              for index in range(events)])
+        await db.commit()
+    return session_factory
+
+
+async def pending_events(session_factory):
+    async with session_factory() as db:
+        return (await db.scalars(select(OutboxEvent).where(OutboxEvent.dispatched_at.is_(None)))).all()
+
+
+async def test_dispatcher_drains_in_order_and_batches():
+    session_factory = await make_session_factory(events=5)
+    sink = MemorySink()
+    dispatcher = OutboxDispatcher(session_factory, [sink], batch_size=2, interval=0)
+
+    assert [await dispatcher.dispatch_once() for _ in range(4)] == [2, 2, 1, 0]
+    assert [event["payload"]["sequence"] for event in sink.events] == [0, 1, 2, 3, 4]
+    assert {event["type"] for event in sink.events} == {"wallet.topped_up"}
+    assert await pending_events(session_factory) == []
+    assert dispatcher.stats()["dispatched"] == 5
+
+
+async def test_failed_batch_is_retried():
+    session_factory = await make_session_factory(events=3)
+    dispatcher = OutboxDispatcher(session_factory, [FailingSink()], batch_size=10, interval=0, retry_backoff=0)
+
+    with pytest.raises(RuntimeError):
+        await dispatcher.dispatch_once()
+
+    pending = await pending_events(session_factory)
+    assert len(pending) == 3
+    assert all(event.attempts == 1 and "sink is down" in event.last_error for event in pending)
+
+    sink = MemorySink()
+    dispatcher.sinks = [sink]
+    assert await dispatcher.dispatch_once() == 3
+    assert len(sink.events) == 3
+
+
+async def test_failed_event_backs_off_without_blocking_the_others():
+    session_factory = await make_session_factory(events=3)
+    sink = RejectingSink(sequence=1)
+    dispatcher = OutboxDispatcher(session_factory, [sink], batch_size=10, interval=0, retry_backoff=60)
+
+    with pytest.raises(RuntimeError):
+        await dispatcher.dispatch_once()
+    # Still backing off
+    assert await dispatcher.dispatch_once() == 0
+
+    async with session_factory() as db:
+        await db.execute(update(OutboxEvent).values(next_attempt_at=datetime.now() - timedelta(seconds=1)))
+        await db.commit()
+    # The retries go out one at a time, the rejected one stops the pass
+    with pytest.raises(RuntimeError):
+        await dispatcher.dispatch_once()
+    assert await dispatcher.dispatch_once() == 1
+
+    assert [event["payload"]["sequence"] for event in sink.events] == [0, 2]
+    [rejected] = await pending_events(session_factory)
+    assert rejected.attempts == 2
+    assert rejected.next_attempt_at > datetime.now() + timedelta(seconds=100)
+
+
+async def test_event_is_dead_lettered_after_max_attempts():
+    session_factory = await make_session_factory(events=2)
+    sink = RejectingSink(sequence=0)
+    dispatcher = OutboxDispatcher(session_factory, [sink], batch_size=10, interval=0, max_attempts=2,
+                                  retry_backoff=0)
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            await dispatcher.dispatch_once()
+    assert await dispatcher.dispatch_once() == 1
+    assert await dispatcher.dispatch_once() == 0
+
+    [dead] = await pending_events(session_factory)
+    assert dead.attempts == 2
+    assert dead.dead_lettered_at is not None
+    assert [event["payload"]["sequence"] for event in sink.events] == [1]
+    assert dispatcher.stats()["dead_lettered"] == 1
+
+
+async def test_file_sink(tmp_path):
+    path = tmp_path / "events.ndjson"
+    session_factory = await make_session_factory(events=2)
+
+    await OutboxDispatcher(session_factory, [FileSink(str(path))], batch_size=10, interval=0).dispatch_once()
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["payload"] for line in lines] == [{"sequence": 0}, {"sequence": 1}]
+
+
+async def test_webhook_sink():
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            received.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        sink = WebhookSink(f"http://127.0.0.1:{server.server_port}/events", timeout=5)
+        session_factory = await make_session_factory(events=3)
+        assert await OutboxDispatcher(session_factory, [sink], batch_size=10, interval=0).dispatch_once() == 3
+    finally:
+        server.shutdown()
+
+    assert len(received) == 1
+    assert [event["payload"]["sequence"] for event in received[0]] == [0, 1, 2]
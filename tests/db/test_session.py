@@ -0,0 +1,72 @@
+import itertools
+
+from sqlalchemy.ext.asyncio import create_async_engine
+from starlette.requests import Request
+
+from app.core.config import settings
+from app.db import session
+from app.db.session import get_read_db, has_recent_write, mark_recent_write
+
+
+def make_request(token):
+    return Request({"type": "http", "headers": [(b"authorization", f"Bearer {token}".encode())]})
+
+
+async def read_bind(request):
+    dependency = get_read_db(request)
+    db = await dependency.__anext__()
+    bind = db.bind
+    await dependency.aclose()
+    return bind
+
+
+def use_replicas(monkeypatch, replicas):
+    monkeypatch.setattr(session, "replica_engines", replicas)
+    monkeypatch.setattr(session, "replica_cycle", itertools.cycle(replicas))
+
+
+async def test_reads_use_primary_without_replicas(monkeypatch):
+    use_replicas(monkeypatch, [])
+
+    assert await read_bind(make_request("token")) is session.engine
+
+
+async def test_reads_rotate_over_replicas(monkeypatch):
+    replicas = [create_async_engine("sqlite+aiosqlite://"), create_async_engine("sqlite+aiosqlite://")]
+    use_replicas(monkeypatch, replicas)
+
+    binds = [await read_bind(make_request("token")) for _ in range(3)]
+
+    assert binds == [replicas[0], replicas[1], replicas[0]]
+
+
+async def test_recent_writer_reads_from_primary(monkeypatch):
+    use_replicas(monkeypatch, [create_async_engine("sqlite+aiosqlite://")])
+    monkeypatch.setattr(settings, "read_your_writes_seconds", 5)
+    monkeypatch.setattr(session, "recent_writes", {})
+
+    mark_recent_write("Bearer writer")
+
+    assert has_recent_write("Bearer writer")
+    assert await read_bind(make_request("writer")) is session.engine
+    assert await read_bind(make_request("reader")) is not session.engine
+
+
+def test_read_your_writes_disabled(monkeypatch):
+    monkeypatch.setattr(settings, "read_your_writes_seconds", 0)
+    monkeypatch.setattr(session, "recent_writes", {})
+
+    mark_recent_write("Bearer writer")
+
+    assert not has_recent_write("Bearer writer")
+
+
+async def test_commit_starts_read_your_writes_window(monkeypatch):
+    monkeypatch.setattr(settings, "read_your_writes_seconds", 5)
+    monkeypatch.setattr(session, "recent_writes", {})
+
+    async with session.SessionLocal(bind=create_async_engine("sqlite+aiosqlite://"),
+                                    info={"principal": "Bearer writer"}) as db:
+        await db.commit()
+
+    assert has_recent_write("Bearer writer")
@@ -0,0 +1,31 @@
+from decimal import Decimal
+
+import pytest
+from pydantic import ValidationError
+
+from app.schemas.TransactionSchemas import TransactionRequest
+from app.utilities.money import to_minor_units, from_minor_units
+
+
+def test_to_minor_units():
+    assert to_minor_units(100) == 10000
+    assert to_minor_units(0.1) == 10
+    assert to_minor_units(Decimal("19.99")) == 1999
+    assert to_minor_units(0.105) == 11
+
+
+def test_from_minor_units():
+    assert from_minor_units(10000) == 100.0
+    assert from_minor_units(1999) == 19.99
+    assert from_minor_units(0) == 0.0
+
+
+def test_transaction_request_amount_in_minor_units():
+    request = TransactionRequest(amount=19.99, source="TOP UP", destination="234", type="credit")
+
+    assert request.amount_minor == 1999
+
+
+def test_transaction_request_rejects_fractions_of_minor_units():
+    with pytest.raises(ValidationError):
+        TransactionRequest(amount=0.001, source="TOP UP", destination="234", type="credit")